@@ -0,0 +1,156 @@
+"""
+Synthetic specification trees and template repos for the benchmarks.
+
+Everything is derived from a seeded random generator, so the same size and
+seed always produce the same files and results stay comparable across commits.
+"""
+import os
+import random
+from typing import Any, Dict, List, NamedTuple
+
+import yaml
+
+
+class BenchmarkSize(NamedTuple):
+    definitions: int  # data-definition files
+    depth: int  # folder nesting of the data-definition files
+    domains: int  # architecture.domains entries, the mergeFor fan-out
+    types: int  # dataDictionary.types entries, the mergeFrom fan-out
+    properties: int  # properties per data definition and type
+    copies: int  # copies of each merge / mergeFor / mergeFrom template
+
+
+SIZES = {
+    "small": BenchmarkSize(definitions=50, depth=2, domains=50, types=50, properties=10, copies=1),
+    "medium": BenchmarkSize(definitions=500, depth=3, domains=500, types=250, properties=20, copies=2),
+    "large": BenchmarkSize(definitions=3000, depth=5, domains=2000, types=1000, properties=30, copies=3),
+}
+
+# The domain the selector directive picks, passed to the merge as SERVICE_NAME
+SERVICE_NAME = "domain0"
+
+WORDS = ("alpha", "beta", "gamma", "delta", "omega", "sigma", "kappa", "lambda")
+
+README_TEMPLATE = """# {{ architecture.product }}
+{{ architecture.productDescription }}
+
+Service {{ service.name }} reads {{ service.data.sources | length }} sources.
+{% for domain in architecture.domains %}- {{ domain.name }}: {{ domain.description }}
+{% endfor %}"""
+
+DOMAIN_TEMPLATE = """# {{ name }}
+{{ description }}
+{% for source in data.sources %}
+## {{ source.name }} ({{ source.backingService }})
+{% endfor %}
+Owned by {{ architecture.organization }}"""
+
+TYPE_TEMPLATE = """# {{ item.name }}
+```json
+{{ item.content | to_json }}
+```
+```yaml
+{{ item.content | to_yaml }}
+```"""
+
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def _properties(rng: random.Random, count: int) -> Dict[str, Any]:
+    return {
+        f"property{i}": {
+            "description": _words(rng, 8),
+            "type": rng.choice(("word", "count", "date", "identifier")),
+            "required": i % 2 == 0,
+        }
+        for i in range(count)
+    }
+
+
+def _write_yaml(path: str, data: Any) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        yaml.safe_dump(data, file, sort_keys=False)
+
+
+def _write_text(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(text)
+
+
+def generate_specifications(folder: str, size: BenchmarkSize, seed: int = 0) -> None:
+    """Write an architecture, a data dictionary and nested data-definition files to folder."""
+    rng = random.Random(seed)
+    _write_yaml(os.path.join(folder, "architecture.yaml"), {
+        "product": "BenchProduct",
+        "productDescription": _words(rng, 20),
+        "organization": "BenchOrg",
+        "domains": [
+            {
+                "name": f"domain{i}",
+                "description": _words(rng, 12),
+                "data": {
+                    "sources": [{"name": f"source{i}-{j}", "backingService": "mongodb"} for j in range(3)],
+                    "sinks": [{"name": f"sink{i}", "backingService": "kafka"}],
+                },
+            }
+            for i in range(size.domains)
+        ],
+    })
+    _write_yaml(os.path.join(folder, "dataDictionary.yaml"), {
+        "types": {
+            f"type{i}": {"description": _words(rng, 10), "properties": _properties(rng, size.properties)}
+            for i in range(size.types)
+        },
+    })
+    for i in range(size.definitions):
+        nesting = [f"group{(i >> (2 * level)) % 4}" for level in range(size.depth)]
+        _write_yaml(os.path.join(folder, "dataDefinitions", *nesting, f"dd.definition{i}.yaml"), {
+            "title": f"Definition {i}",
+            "description": _words(rng, 15),
+            "properties": _properties(rng, size.properties),
+        })
+
+
+def process_config(size: BenchmarkSize) -> Dict[str, Any]:
+    """The process.yaml for a generated template repo."""
+    templates: List[Dict[str, Any]] = []
+    for copy in range(size.copies):
+        templates.append({"path": f"./README{copy}.md", "merge": True})
+        templates.append({
+            "path": f"./domain{copy}.md.template",
+            "mergeFor": {"items": "domains", "output": f"./domain{copy}-{{{{ name }}}}.md"},
+        })
+        templates.append({
+            "path": f"./type{copy}.md.template",
+            "mergeFrom": {"items": "types", "output": f"./type{copy}-{{{{ item.name }}}}.md"},
+        })
+    return {
+        "environment": {"SERVICE_NAME": "The domain to generate"},
+        "context": [
+            {"key": "architecture", "type": "path", "path": "specifications.architecture"},
+            {"key": "domains", "type": "path", "path": "architecture.domains"},
+            {"key": "types", "type": "path", "path": "specifications.dataDictionary.types"},
+            {
+                "key": "service",
+                "type": "selector",
+                "path": "architecture.domains",
+                "filter": {"property": "name", "value": "{{ SERVICE_NAME }}"},
+            },
+        ],
+        "requires": ["architecture.product", "service.data.sources"],
+        "templates": templates,
+    }
+
+
+def generate_repo(folder: str, size: BenchmarkSize) -> int:
+    """Write a template repo to folder and return the number of outputs a merge produces."""
+    _write_yaml(os.path.join(folder, ".stage0_template", "process.yaml"), process_config(size))
+    for copy in range(size.copies):
+        _write_text(os.path.join(folder, f"README{copy}.md"), README_TEMPLATE)
+        _write_text(os.path.join(folder, f"domain{copy}.md.template"), DOMAIN_TEMPLATE)
+        _write_text(os.path.join(folder, f"type{copy}.md.template"), TYPE_TEMPLATE)
+    return size.copies * (1 + size.domains + size.types)
@@ -0,0 +1,203 @@
+"""
+Benchmark the merge pipeline on generated specifications and templates.
+
+Each repetition merges a fresh copy of the generated repo in its own Python
+process, so peak memory and caches are not shared between repetitions. The
+median of the repetitions is reported and can be saved as a baseline; a later
+run with --baseline fails when any tracked timing regresses past --tolerance.
+
+    PYTHONPATH=./src python benchmarks/run.py --size medium --save baseline.json
+    PYTHONPATH=./src python benchmarks/run.py --size medium --baseline baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional
+
+BENCHMARKS_FOLDER = os.path.dirname(os.path.abspath(__file__))
+SOURCE_FOLDER = os.path.join(os.path.dirname(BENCHMARKS_FOLDER), "src")
+sys.path.insert(0, SOURCE_FOLDER)
+
+from generate import SERVICE_NAME, SIZES, BenchmarkSize, generate_repo, generate_specifications  # noqa: E402
+
+# Timings compared against a baseline
+TRACKED = ("total_seconds", "load_specifications", "add_context", "process_templates")
+
+
+def _folder_bytes(folder: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(folder)
+        for name in names
+    )
+
+
+def measure_once(specifications_folder: str, repo_template: str) -> Dict[str, Any]:
+    """Merge a scratch copy of repo_template and return the run report."""
+    import logging
+
+    from main import Processor, processor_options
+    from report import RunReport
+
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING").upper(), stream=sys.stderr)
+    with tempfile.TemporaryDirectory() as scratch:
+        repo_folder = os.path.join(scratch, "repo")
+        shutil.copytree(repo_template, repo_folder)
+        report = RunReport()
+        options = processor_options()
+        options["report"] = report
+        Processor(specifications_folder, repo_folder, **options).run({"SERVICE_NAME": SERVICE_NAME})
+        result = report.to_dict()
+        result["output_bytes"] = _folder_bytes(repo_folder)
+    # Per-output detail is noise at benchmark sizes
+    result.pop("templates")
+    result.pop("context")
+    result["specifications"].pop("files")
+    return result
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BENCHMARKS_FOLDER, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def versions() -> Dict[str, str]:
+    import jinja2
+    import yaml
+
+    return {
+        "python": platform.python_version(),
+        "jinja2": jinja2.__version__,
+        "pyyaml": yaml.__version__,
+        "libyaml": str(getattr(yaml, "__with_libyaml__", False)),
+    }
+
+
+def run_benchmark(size_name: str, size: BenchmarkSize, repeat: int, seed: int) -> Dict[str, Any]:
+    """Generate the inputs once, then merge them `repeat` times in fresh processes."""
+    with tempfile.TemporaryDirectory() as workspace:
+        specifications_folder = os.path.join(workspace, "specifications")
+        repo_template = os.path.join(workspace, "repo")
+        generate_specifications(specifications_folder, size, seed)
+        outputs = generate_repo(repo_template, size)
+        spec_bytes = _folder_bytes(specifications_folder)
+
+        runs: List[Dict[str, Any]] = []
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [SOURCE_FOLDER, os.getenv("PYTHONPATH")])))
+        for _ in range(repeat):
+            completed = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--measure", specifications_folder, repo_template],
+                env=env, capture_output=True, text=True,
+            )
+            if completed.returncode != 0:
+                sys.stderr.write(completed.stderr)
+                raise RuntimeError(f"Benchmark merge failed with exit code {completed.returncode}")
+            runs.append(json.loads(completed.stdout))
+
+    def median(value: Any) -> float:
+        return statistics.median(value(run) for run in runs)
+
+    total = median(lambda run: run["total_seconds"])
+    output_bytes = runs[0]["output_bytes"]
+    return {
+        "size": size_name,
+        "parameters": size._asdict(),
+        "seed": seed,
+        "repeat": repeat,
+        "commit": git_commit(),
+        "versions": versions(),
+        "outputs": outputs,
+        "specification_files": runs[0]["specifications"]["files_parsed"],
+        "specification_bytes": spec_bytes,
+        "output_bytes": output_bytes,
+        "total_seconds": total,
+        "files_per_second": outputs / total if total else None,
+        "output_mb_per_second": output_bytes / total / 1e6 if total else None,
+        "specification_mb_per_second": spec_bytes / median(lambda run: run["phases"]["load_specifications"]) / 1e6,
+        "phases": {name: median(lambda run: run["phases"].get(name, 0.0)) for name in runs[0]["phases"]},
+        "peak_rss_bytes": max(run["peak_rss_bytes"] or 0 for run in runs),
+    }
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Describe each tracked timing that is more than tolerance slower than the baseline."""
+    regressions = []
+    for name in TRACKED:
+        current = result["total_seconds"] if name == "total_seconds" else result["phases"].get(name)
+        previous = baseline["total_seconds"] if name == "total_seconds" else baseline["phases"].get(name)
+        if current is None or not previous:
+            continue
+        change = (current - previous) / previous
+        if change > tolerance:
+            regressions.append(f"{name}: {previous:.3f}s -> {current:.3f}s (+{change:.0%})")
+    return regressions
+
+
+def _print_summary(result: Dict[str, Any]) -> None:
+    print(
+        f"{result['size']}: {result['outputs']} outputs from {result['specification_files']} specification files "
+        f"in {result['total_seconds']:.3f}s (median of {result['repeat']})"
+    )
+    print(
+        f"  {result['files_per_second']:.0f} files/s, {result['output_mb_per_second']:.2f} MB/s written, "
+        f"{result['specification_mb_per_second']:.2f} MB/s specifications parsed"
+    )
+    for name, seconds in result["phases"].items():
+        print(f"  {name:<22}{seconds * 1000:10.1f} ms")
+    print(f"  peak RSS {result['peak_rss_bytes'] / 2 ** 20:.1f} MiB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=sorted(SIZES), default="small")
+    for field in BenchmarkSize._fields:
+        parser.add_argument(f"--{field}", type=int, help=f"override the {field} of the selected size")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="write the result as JSON to this file")
+    parser.add_argument("--baseline", help="compare against a result saved with --save")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown, default 0.15 (15%%)")
+    parser.add_argument("--measure", nargs=2, metavar=("SPECIFICATIONS", "REPO"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        json.dump(measure_once(*args.measure), sys.stdout)
+        return
+
+    overrides = {field: getattr(args, field) for field in BenchmarkSize._fields if getattr(args, field) is not None}
+    size = SIZES[args.size]._replace(**overrides)
+    result = run_benchmark(args.size, size, max(1, args.repeat), args.seed)
+    _print_summary(result)
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(result, file, indent=2)
+            file.write("\n")
+
+    if args.baseline:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+        if baseline.get("parameters") != result["parameters"]:
+            print(f"Baseline {args.baseline} was run with different parameters", file=sys.stderr)
+            sys.exit(2)
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            print(f"Regressions against {args.baseline} (commit {baseline.get('commit')}):", file=sys.stderr)
+            for regression in regressions:
+                print(f"  {regression}", file=sys.stderr)
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
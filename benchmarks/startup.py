@@ -0,0 +1,170 @@
+"""
+Benchmark the startup cost of a merge run.
+
+Every merge is a fresh `python -m main`, so interpreter startup and module
+imports are paid on each run. This merges a tiny generated repo, small
+enough that startup dominates, in new processes and reports the median wall
+time next to a bare interpreter, plus the import time of each module measured
+with `python -X importtime`. A run with --baseline fails when the wall or
+import time regresses past --tolerance.
+
+    python benchmarks/startup.py --save startup.json
+    python benchmarks/startup.py --baseline startup.json
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+BENCHMARKS_FOLDER = os.path.dirname(os.path.abspath(__file__))
+SOURCE_FOLDER = os.path.join(os.path.dirname(BENCHMARKS_FOLDER), "src")
+
+from generate import SERVICE_NAME, BenchmarkSize, generate_repo, generate_specifications  # noqa: E402
+from run import git_commit, versions  # noqa: E402
+
+# A merge small enough that startup dominates its wall time
+STARTUP_SIZE = BenchmarkSize(definitions=5, depth=1, domains=5, types=5, properties=5, copies=1)
+
+# Timings compared against a baseline
+TRACKED = ("wall_seconds", "import_seconds")
+
+
+class ImportTime(NamedTuple):
+    own: int  # microseconds importing the module itself
+    cumulative: int  # microseconds including the imports it triggered
+    depth: int  # 0 for modules imported directly by the interpreter or main
+
+
+def parse_importtime(stderr: str) -> Dict[str, ImportTime]:
+    """Map each module in `-X importtime` output to its import time."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        if not own.strip().isdigit():
+            # The column header
+            continue
+        # Nested imports are indented by two spaces per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules[name.strip()] = ImportTime(int(own), int(cumulative), depth)
+    return modules
+
+
+def _timed_run(command: List[str], env: Dict[str, str]) -> Tuple[float, str]:
+    start = time.perf_counter()
+    completed = subprocess.run(command, env=env, capture_output=True, text=True)
+    seconds = time.perf_counter() - start
+    if completed.returncode != 0:
+        sys.stderr.write(completed.stderr)
+        raise RuntimeError(f"{' '.join(command)} failed with exit code {completed.returncode}")
+    return seconds, completed.stderr
+
+
+def run_startup(repeat: int, top: int) -> Dict[str, Any]:
+    """Merge a fresh copy of a tiny repo `repeat` times, with and without -X importtime."""
+    with tempfile.TemporaryDirectory() as workspace:
+        specifications_folder = os.path.join(workspace, "specifications")
+        repo_template = os.path.join(workspace, "repo")
+        generate_specifications(specifications_folder, STARTUP_SIZE)
+        generate_repo(repo_template, STARTUP_SIZE)
+        repo_folder = os.path.join(workspace, "merge")
+        env = dict(
+            os.environ,
+            PYTHONPATH=os.pathsep.join(filter(None, [SOURCE_FOLDER, os.getenv("PYTHONPATH")])),
+            SPECIFICATIONS_FOLDER=specifications_folder,
+            REPO_FOLDER=repo_folder,
+            SERVICE_NAME=SERVICE_NAME,
+            LOG_LEVEL="WARNING",
+        )
+
+        interpreter, wall, imports = [], [], []
+        for _ in range(repeat):
+            interpreter.append(_timed_run([sys.executable, "-c", "pass"], env)[0])
+            for profile in (False, True):
+                shutil.rmtree(repo_folder, ignore_errors=True)
+                shutil.copytree(repo_template, repo_folder)
+                flags = ["-X", "importtime"] if profile else []
+                seconds, stderr = _timed_run([sys.executable, *flags, "-m", "main"], env)
+                if profile:
+                    imports.append(parse_importtime(stderr))
+                else:
+                    wall.append(seconds)
+
+    # Runs import the same modules; take the median time of each
+    top_level = {
+        name: statistics.median(run[name].cumulative for run in imports if name in run) / 1e6
+        for name, timing in imports[0].items()
+        if timing.depth == 0
+    }
+    return {
+        "repeat": repeat,
+        "commit": git_commit(),
+        "versions": versions(),
+        "interpreter_seconds": statistics.median(interpreter),
+        "wall_seconds": statistics.median(wall),
+        "import_seconds": statistics.median(sum(timing.own for timing in run.values()) for run in imports) / 1e6,
+        "modules_imported": len(imports[0]),
+        "slowest_imports": dict(sorted(top_level.items(), key=lambda entry: -entry[1])[:top]),
+    }
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Describe each tracked timing that is more than tolerance slower than the baseline."""
+    regressions = []
+    for name in TRACKED:
+        current, previous = result.get(name), baseline.get(name)
+        if current is None or not previous:
+            continue
+        change = (current - previous) / previous
+        if change > tolerance:
+            regressions.append(f"{name}: {previous * 1000:.1f}ms -> {current * 1000:.1f}ms (+{change:.0%})")
+    return regressions
+
+
+def _print_summary(result: Dict[str, Any]) -> None:
+    print(
+        f"startup: {result['wall_seconds'] * 1000:.1f} ms per merge, "
+        f"{result['interpreter_seconds'] * 1000:.1f} ms bare interpreter (median of {result['repeat']})"
+    )
+    print(f"  {result['import_seconds'] * 1000:.1f} ms importing {result['modules_imported']} modules")
+    for name, seconds in result["slowest_imports"].items():
+        print(f"  {name:<28}{seconds * 1000:10.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="number of slowest top-level imports to list")
+    parser.add_argument("--save", help="write the result as JSON to this file")
+    parser.add_argument("--baseline", help="compare against a result saved with --save")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown, default 0.15 (15%%)")
+    args = parser.parse_args()
+
+    result = run_startup(max(1, args.repeat), args.top)
+    _print_summary(result)
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(result, file, indent=2)
+            file.write("\n")
+
+    if args.baseline:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            print(f"Regressions against {args.baseline} (commit {baseline.get('commit')}):", file=sys.stderr)
+            for regression in regressions:
+                print(f"  {regression}", file=sys.stderr)
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
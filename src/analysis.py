@@ -0,0 +1,207 @@
+import logging
+from collections.abc import Mapping
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from jinja2 import Environment, meta, nodes
+
+from spec_store import StoreList
+
+logger = logging.getLogger(__name__)
+
+# A reference is a root context variable plus the constant keys read below it.
+# The empty tuple means the whole variable is used.
+KeyPath = Tuple[Any, ...]
+
+
+def _collect(node: nodes.Node, refs: Dict[str, Set[KeyPath]]) -> None:
+    if isinstance(node, (nodes.Getattr, nodes.Getitem)):
+        keys = []
+        dynamic = []
+        current = node
+        while isinstance(current, (nodes.Getattr, nodes.Getitem)):
+            if isinstance(current, nodes.Getattr):
+                keys.append(current.attr)
+            elif isinstance(current.arg, nodes.Const) and isinstance(current.arg.value, (str, int)):
+                keys.append(current.arg.value)
+            else:
+                # Keys past a dynamic subscript are unknown, keep only the prefix
+                keys = []
+                dynamic.append(current.arg)
+            current = current.node
+        if isinstance(current, nodes.Name) and current.ctx == "load":
+            refs.setdefault(current.name, set()).add(tuple(reversed(keys)))
+        else:
+            _collect(current, refs)
+        for arg in dynamic:
+            _collect(arg, refs)
+        return
+    if isinstance(node, nodes.Name) and node.ctx == "load":
+        refs.setdefault(node.name, set()).add(())
+        return
+    for child in node.iter_child_nodes():
+        _collect(child, refs)
+
+
+def template_references(env: Environment, source: str) -> Dict[str, Set[KeyPath]]:
+    """
+    Map each context variable a template reads to the key paths it reads
+    below it. Paths stop at the first dynamic subscript, so every value the
+    template can reach lies under one of the returned paths.
+    """
+    ast = env.parse(source)
+    undeclared = meta.find_undeclared_variables(ast)
+    refs: Dict[str, Set[KeyPath]] = {}
+    _collect(ast, refs)
+    return {name: paths for name, paths in refs.items() if name in undeclared}
+
+
+def select(value: Any, path: KeyPath) -> Any:
+    """Follow path into value as far as it resolves and return that sub-tree."""
+    for key in path:
+        if isinstance(value, Mapping) and key in value:
+            value = value[key]
+        elif isinstance(value, (list, StoreList)) and isinstance(key, int) and -len(value) <= key < len(value):
+            value = value[key]
+        else:
+            break
+    return value
+
+
+class ProcessReferences(NamedTuple):
+    # Specification key paths the merge can read, or None when every file is needed
+    spec_paths: Optional[Set[KeyPath]]
+    # Why every file is needed, when spec_paths is None
+    reason: Optional[str]
+    # Context keys that nothing in the process reads
+    unused_context: List[str]
+
+
+def _dotted(path: str) -> KeyPath:
+    """Keys of a dotted context path, stopping at the first templated segment."""
+    keys = []
+    for key in path.split("."):
+        if "{" in key or "}" in key:
+            break
+        keys.append(key)
+    return tuple(keys)
+
+
+def _has_includes(env: Environment, source: str) -> bool:
+    ast = env.parse(source)
+    return any(True for _ in ast.find_all((nodes.Extends, nodes.Include, nodes.Import, nodes.FromImport)))
+
+
+def process_references(
+    process: Dict[str, Any], sources: Dict[str, str], env: Environment, pattern_env: Environment
+) -> ProcessReferences:
+    """
+    Work out which specification paths a process.yaml can read: context
+    directive, requires and items paths, plus the attribute and item chains
+    its templates (sources, by template path) and output patterns use on
+    `specifications` and on context keys. Templated path segments, dynamic
+    subscripts and bare uses widen a path to its prefix; includes, imports
+    and missing templates make every file needed.
+    """
+    # Context key -> (specification path it resolves to, whether keys below it map onto that path)
+    aliases: Dict[str, Tuple[KeyPath, bool]] = {"specifications": ((), True)}
+    needed: Set[KeyPath] = set()
+    used: Set[str] = set()
+
+    def resolve(keys: KeyPath) -> Optional[KeyPath]:
+        if not keys or keys[0] not in aliases:
+            return None
+        used.add(keys[0])
+        base, exact = aliases[keys[0]]
+        return base + tuple(keys[1:]) if exact else base
+
+    def reference(template_env: Environment, source: str) -> None:
+        for name, paths in template_references(template_env, source).items():
+            for path in paths:
+                resolved = resolve((name,) + path)
+                if resolved is not None:
+                    needed.add(resolved)
+
+    directive_paths: Dict[str, KeyPath] = {}
+    for directive in process.get("context") or []:
+        raw_path = str(directive.get("path", ""))
+        keys = _dotted(raw_path)
+        resolved = resolve(keys)
+        if resolved is None:
+            continue
+        complete = len(keys) == len(raw_path.split("."))
+        if directive.get("type") == "selector":
+            # The whole list is scanned and the item it picks is not known statically
+            needed.add(resolved)
+            aliases[directive["key"]] = (resolved, False)
+        else:
+            aliases[directive["key"]] = (resolved, complete)
+            directive_paths[directive["key"]] = resolved
+
+    for required in process.get("requires") or []:
+        resolved = resolve(_dotted(str(required)))
+        if resolved is not None:
+            needed.add(resolved)
+
+    for template_config in process.get("templates") or []:
+        source = sources.get(template_config.get("path"))
+        if source is None:
+            return ProcessReferences(None, f"template {template_config.get('path')} could not be read", [])
+        if _has_includes(env, source):
+            return ProcessReferences(None, f"template {template_config.get('path')} includes other templates", [])
+        reference(env, source)
+        for directive in ("mergeFor", "mergeFrom"):
+            if directive in template_config:
+                resolved = resolve(_dotted(str(template_config[directive].get("items", ""))))
+                if resolved is not None:
+                    needed.add(resolved)
+        if template_config.get("merge") and template_config.get("output"):
+            reference(pattern_env, str(template_config["output"]))
+
+    unused = [key for key in aliases if key != "specifications" and key not in used]
+    for key in unused:
+        # Keep an unread path directive resolvable
+        if key in directive_paths:
+            needed.add(directive_paths[key])
+    if () in needed:
+        return ProcessReferences(None, "the whole specifications tree is read", unused)
+    return ProcessReferences(needed, None, unused)
+
+
+def needed_files(files: Dict[str, KeyPath], spec_paths: Set[KeyPath]) -> List[str]:
+    """
+    Pick the files (file path -> key path in the specifications tree) that
+    hold data under any of spec_paths. A key that is not a file or folder
+    name, such as a key inside a document or a method name, needs every file
+    below the point where it was reached.
+    """
+    # Trie of the specifications folder; FILES holds the files ending at a node
+    FILES = object()
+    root: Dict[Any, Any] = {}
+    for file_path, keys in files.items():
+        node = root
+        for key in keys:
+            node = node.setdefault(key, {})
+        node.setdefault(FILES, []).append(file_path)
+
+    def everything(node: Dict[Any, Any], found: Set[str]) -> None:
+        for key, child in node.items():
+            if key is FILES:
+                found.update(child)
+            else:
+                everything(child, found)
+
+    found: Set[str] = set()
+    for path in spec_paths:
+        node = root
+        for key in path:
+            found.update(node.get(FILES, ()))
+            if key not in node:
+                break
+            node = node[key]
+        else:
+            everything(node, found)
+            continue
+        if len(node) > (FILES in node):
+            # Unknown key below a folder
+            everything(node, found)
+    return [file_path for file_path in files if file_path in found]
@@ -0,0 +1,117 @@
+import os
+import unittest
+
+from jinja2 import Environment
+
+from analysis import needed_files, process_references, select, template_references
+from main import Processor
+from rendering import create_environment
+
+
+class TestTemplateReferences(unittest.TestCase):
+
+    def test_attribute_and_item_chains(self):
+        """Test that constant attribute and item chains are recorded per root variable."""
+        refs = template_references(
+            Environment(),
+            "{{ specifications.architecture.product }} {{ specifications['dataDictionary'].types }}",
+        )
+        self.assertEqual(
+            {("architecture", "product"), ("dataDictionary", "types")}, refs["specifications"]
+        )
+
+    def test_dynamic_subscript_keeps_prefix(self):
+        """Test that a dynamic subscript truncates the path and records its own references."""
+        refs = template_references(Environment(), "{{ specifications.types[item.name].description }}")
+        self.assertEqual({("types",)}, refs["specifications"])
+        self.assertEqual({("name",)}, refs["item"])
+
+    def test_bare_use_and_locals(self):
+        """Test that bare names mean the whole value and loop variables are ignored."""
+        refs = template_references(
+            create_environment(), "{% for t in architecture.domains %}{{ t.name }}{% endfor %}{{ service | to_json }}"
+        )
+        self.assertEqual({("domains",)}, refs["architecture"])
+        self.assertEqual({()}, refs["service"])
+        self.assertNotIn("t", refs)
+
+    def test_select_stops_at_unresolvable_key(self):
+        """Test that select returns the deepest sub-tree that resolves."""
+        data = {"a": {"b": [{"c": 1}]}}
+        self.assertEqual(1, select(data, ("a", "b", 0, "c")))
+        self.assertEqual({"b": [{"c": 1}]}, select(data, ("a", "items")))
+
+
+class TestProcessReferences(unittest.TestCase):
+    TEST_SPECIFICATIONS = "./test/repo/.stage0_template/test_data"
+    TEST_REPO = "./test/repo"
+
+    def _references(self, process, sources):
+        return process_references(process, sources, create_environment(), Environment())
+
+    def test_aliases_map_template_reads_to_specification_paths(self):
+        """Test that reads through context keys resolve to paths below specifications."""
+        process = {
+            "context": [
+                {"key": "architecture", "type": "path", "path": "specifications.architecture"},
+                {"key": "service", "type": "selector", "path": "architecture.domains",
+                 "filter": {"property": "name", "value": "{{ SERVICE_NAME }}"}},
+                {"key": "unused", "type": "path", "path": "specifications.personas"},
+            ],
+            "requires": ["service.data"],
+            "templates": [{"path": "./a.md", "merge": True}],
+        }
+        references = self._references(process, {"./a.md": "{{ architecture.product }} {{ service.name }}"})
+        self.assertEqual(
+            {("architecture", "product"), ("architecture", "domains"), ("personas",)}, references.spec_paths
+        )
+        self.assertEqual(["unused"], references.unused_context)
+
+    def test_templated_path_segment_widens_to_prefix(self):
+        """Test that a context path with a templated segment needs everything below its prefix."""
+        process = {
+            "context": [{"key": "source", "type": "path", "path": "specifications.types.{{ DATA_SOURCE }}"}],
+            "templates": [{"path": "./a.md", "merge": True}],
+        }
+        references = self._references(process, {"./a.md": "{{ source.description }}"})
+        self.assertEqual({("types",)}, references.spec_paths)
+
+    def test_full_load_fallbacks(self):
+        """Test that bare specifications use, includes and missing templates need every file."""
+        process = {"templates": [{"path": "./a.md", "merge": True}]}
+        self.assertIsNone(self._references(process, {"./a.md": "{{ specifications | to_json }}"}).spec_paths)
+        self.assertIsNone(self._references(process, {"./a.md": "{% include 'b.md' %}"}).spec_paths)
+        self.assertIsNone(self._references(process, {}).spec_paths)
+
+    def test_needed_files(self):
+        """Test that paths select files by folder and file names, and unknown keys widen the selection."""
+        files = {
+            "architecture.yaml": ("architecture",),
+            "types/word.yaml": ("types", "word"),
+            "types/count.yaml": ("types", "count"),
+            "personas.yaml": ("personas",),
+        }
+        self.assertEqual(["architecture.yaml"], needed_files(files, {("architecture", "product")}))
+        self.assertEqual(["types/word.yaml"], needed_files(files, {("types", "word", "description")}))
+        self.assertEqual(["types/word.yaml", "types/count.yaml"], needed_files(files, {("types",)}))
+        self.assertEqual(["types/word.yaml", "types/count.yaml"], needed_files(files, {("types", "items")}))
+
+    def test_prefetch_loads_only_needed_files(self):
+        """Test that a prefetching Processor loads fewer files and plans identical outputs."""
+        os.environ["SERVICE_NAME"] = "user"
+        os.environ["DATA_SOURCE"] = "organization"
+        try:
+            full = Processor(self.TEST_SPECIFICATIONS, self.TEST_REPO)
+            prefetched = Processor(self.TEST_SPECIFICATIONS, self.TEST_REPO, prefetch_specifications=True)
+            self.assertNotIn("personas", prefetched.context_data["specifications"])
+            self.assertEqual(14, prefetched.report.counters["specification_files_skipped"])
+            self.assertEqual(
+                [output.digest for output in full.plan()], [output.digest for output in prefetched.plan()]
+            )
+        finally:
+            del os.environ["SERVICE_NAME"]
+            del os.environ["DATA_SOURCE"]
+
+
+if __name__ == "__main__":
+    unittest.main()
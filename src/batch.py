@@ -0,0 +1,146 @@
+import glob
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from main import Processor
+from rendering import TemplateCache
+from report import RunReport
+from spec_loader import find_specification_layers, load_specification_layers
+from spec_store import build_store
+
+logger = logging.getLogger(__name__)
+
+
+class BatchResult(NamedTuple):
+    repo: str
+    error: Optional[str]
+    seconds: float
+    report: RunReport
+
+
+def parse_repo_list(value: str) -> List[str]:
+    """
+    Split an os.pathsep separated list of repo folders. Entries may be glob
+    patterns; only folders with a .stage0_template/process.yaml match a pattern.
+    """
+    repos = []
+    for entry in filter(None, (part.strip() for part in value.split(os.pathsep))):
+        if glob.has_magic(entry):
+            matches = sorted(glob.glob(entry))
+            repos.extend(
+                match for match in matches
+                if os.path.isfile(os.path.join(match, ".stage0_template", "process.yaml"))
+            )
+        else:
+            repos.append(entry)
+    return repos
+
+
+def run_repo(
+    specifications_folder: str,
+    repo_folder: str,
+    specifications: Any,
+    template_cache: TemplateCache,
+    options: Dict[str, Any],
+) -> BatchResult:
+    """Merge one repo against the shared specifications, returning its error instead of raising."""
+    start = time.perf_counter()
+    report = RunReport()
+    try:
+        processor = Processor(
+            specifications_folder,
+            repo_folder,
+            specifications=specifications,
+            template_cache=template_cache,
+            report=report,
+            **options,
+        )
+        processor.run()
+    except Exception as e:
+        logger.error(f"Batch repo {repo_folder} failed: {e}")
+        return BatchResult(repo_folder, str(e), time.perf_counter() - start, report)
+    logger.info(f"Batch repo {repo_folder} merged in {time.perf_counter() - start:.2f}s")
+    return BatchResult(repo_folder, None, time.perf_counter() - start, report)
+
+
+# Per-process state for batch workers, set once by _init_batch_worker
+_worker: Dict[str, Any] = {}
+
+
+def _init_batch_worker(specifications_folder: str, specifications: Any, options: Dict[str, Any]) -> None:
+    _worker.update(
+        specifications_folder=specifications_folder,
+        specifications=specifications,
+        template_cache=TemplateCache(),
+        options=options,
+    )
+
+
+def _run_in_worker(repo_folder: str) -> BatchResult:
+    return run_repo(
+        _worker["specifications_folder"],
+        repo_folder,
+        _worker["specifications"],
+        _worker["template_cache"],
+        _worker["options"],
+    )
+
+
+def run_batch(
+    specifications_folder: str,
+    repo_folders: List[str],
+    workers: int = 1,
+    spec_workers: int = 1,
+    spec_cache: Any = None,
+    lazy_specifications: bool = False,
+    report: Optional[RunReport] = None,
+    **options: Any,
+) -> List[BatchResult]:
+    """
+    Merge many template repos against one specifications folder. The
+    specifications are loaded once and shared read-only by every repo, and
+    templates are compiled once per worker. Each repo runs the full pipeline
+    in place; a failing repo is reported in its result and does not stop the others.
+    Each repo's RunReport is returned in its result and added to report.
+    """
+    report = report if report is not None else RunReport()
+    # Every repo reads the same tree, so it cannot be narrowed to one process.yaml
+    options.pop("prefetch_specifications", None)
+    with report.phase("load_specifications"):
+        layers = find_specification_layers(specifications_folder)
+        specifications = load_specification_layers(
+            layers, spec_workers, spec_cache, lazy_specifications, report.spec_files
+        )
+        if options.get("specification_store"):
+            # Workers map the store instead of each unpickling a copy of the tree
+            specifications = build_store(specifications)
+    documents = sum(len(paths) for _, paths in layers)
+    logger.info(f"Specifications Loaded from {documents} documents for {len(repo_folders)} repos")
+
+    with report.phase("merge_repos"):
+        if workers > 1 and len(repo_folders) > 1:
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(repo_folders)),
+                initializer=_init_batch_worker,
+                initargs=(specifications_folder, specifications, options),
+            ) as executor:
+                results = list(executor.map(_run_in_worker, repo_folders))
+        else:
+            template_cache = TemplateCache()
+            results = [
+                run_repo(specifications_folder, repo_folder, specifications, template_cache, options)
+                for repo_folder in repo_folders
+            ]
+
+    for result in results:
+        report.merge(result.report)
+    failed = [result for result in results if result.error]
+    report.count("repos_merged", len(results) - len(failed))
+    report.count("repos_failed", len(failed))
+    logger.info(f"Batch completed - {len(results) - len(failed)} of {len(results)} repos merged")
+    for result in failed:
+        logger.info(f"  failed: {result.repo}: {result.error}")
+    return results
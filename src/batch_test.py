@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+import yaml
+
+from batch import parse_repo_list, run_batch
+from report import RunReport
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        base = Path(self.tmpdir.name)
+        self.specs = base / "specs"
+        self.specs.mkdir()
+        (self.specs / "product.yaml").write_text("name: Widget\n")
+        (self.specs / "types.yaml").write_text("a: one\nb: two\n")
+        self.repos = []
+        templates = {"first": "{{ specifications.product.name }}", "second": "{{ specifications.types.a }}"}
+        for name, template in templates.items():
+            repo = base / "repos" / name
+            (repo / ".stage0_template").mkdir(parents=True)
+            (repo / ".stage0_template" / "process.yaml").write_text(yaml.dump({
+                "templates": [{"path": "./out.md", "merge": True}],
+            }))
+            (repo / "out.md").write_text(template)
+            self.repos.append(str(repo))
+        # A repo whose template cannot render
+        broken = base / "repos" / "broken"
+        (broken / ".stage0_template").mkdir(parents=True)
+        (broken / ".stage0_template" / "process.yaml").write_text(yaml.dump({
+            "templates": [{"path": "./out.md", "merge": True}],
+        }))
+        (broken / "out.md").write_text("{{ specifications.missing.name }}")
+        self.broken = str(broken)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _assert_results(self, results):
+        self.assertEqual(self.repos + [self.broken], [result.repo for result in results])
+        self.assertIsNone(results[0].error)
+        self.assertIsNone(results[1].error)
+        self.assertIn("missing", results[2].error)
+        self.assertEqual("Widget", Path(self.repos[0], "out.md").read_text())
+        self.assertEqual("one", Path(self.repos[1], "out.md").read_text())
+        self.assertFalse(Path(self.repos[0], ".stage0_template").exists())
+
+    def test_batch_loads_specifications_once(self):
+        """Test that every repo is merged against one load and a failure does not stop the others."""
+        report = RunReport()
+        results = run_batch(str(self.specs), self.repos + [self.broken], report=report)
+        self._assert_results(results)
+        self.assertEqual(2, len(report.spec_files))
+        self.assertEqual(2, report.counters["repos_merged"])
+        self.assertEqual(1, report.counters["repos_failed"])
+        self.assertEqual(1, results[0].report.counters["files_written"])
+        self.assertEqual(2, report.counters["files_written"])
+        self.assertEqual(["./out.md"] * 3, [template.path for template in report.templates])
+
+    def test_parallel_batch_matches_sequential(self):
+        """Test that a batch run across workers reports the same per-repo results and reports."""
+        report = RunReport()
+        self._assert_results(run_batch(str(self.specs), self.repos + [self.broken], workers=2, report=report))
+        self.assertEqual(2, report.counters["files_written"])
+
+    def test_parse_repo_list_expands_globs(self):
+        """Test that glob entries match only folders with a process.yaml."""
+        Path(self.tmpdir.name, "repos", "not-a-repo").mkdir()
+        pattern = os.path.join(self.tmpdir.name, "repos", "*")
+        self.assertEqual(sorted([self.broken] + self.repos), parse_repo_list(pattern))
+        self.assertEqual(["a", "b"], parse_repo_list(f"a{os.pathsep}{os.pathsep}b"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+Precompiled template bundles.
+
+A bundle is .stage0_template/templates.bundle: the compiled Jinja code of
+every template in process.yaml, keyed by a hash of the template source. With
+TEMPLATE_BUNDLE set, the Processor loads it before merging and compiles only
+templates whose source no longer matches. The code is not checked against the
+source, so bundles are opt-in. Build one in a template repo with:
+
+    REPO_FOLDER=~/my-repository PYTHONPATH=./src python -m bundle
+"""
+import importlib.util
+import logging
+import marshal
+import os
+import sys
+from types import CodeType
+from typing import Any, Dict, List, Optional
+
+import jinja2
+import yaml
+
+from rendering import create_environment, source_digest
+from spec_loader import YamlLoader, format_yaml_error
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FILE = "templates.bundle"
+BUNDLE_FORMAT = 1
+
+
+def compiler_tag() -> str:
+    """Compiled code only loads under the same Jinja version and Python bytecode format."""
+    return f"jinja2-{jinja2.__version__}/python-{importlib.util.MAGIC_NUMBER.hex()}"
+
+
+def _template_sources(repo_folder: str) -> Dict[str, str]:
+    """Read the source of each template in the repo's process.yaml, keyed by template path."""
+    process_file_path = os.path.join(repo_folder, ".stage0_template", "process.yaml")
+    try:
+        with open(process_file_path, "r") as file:
+            process = yaml.load(file, Loader=YamlLoader) or {}
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Process file not found: {process_file_path}")
+    except yaml.YAMLError as e:
+        raise ValueError(format_yaml_error(e, process_file_path)) from e
+
+    sources = {}
+    for template_config in process.get("templates") or []:
+        path = os.path.normpath(template_config["path"])
+        # In-place merges kept for a rerun render from their saved source
+        saved_path = os.path.join(repo_folder, ".stage0_template", "sources", path)
+        read_path = saved_path if os.path.exists(saved_path) else os.path.join(repo_folder, path)
+        try:
+            with open(read_path, "r") as file:
+                sources[template_config["path"]] = file.read()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Template file not found: {os.path.join(repo_folder, path)}")
+    return sources
+
+
+def build_bundle(repo_folder: str) -> str:
+    """Compile every template in the repo's process.yaml and write the bundle; return its path."""
+    env = create_environment()
+    templates = {}
+    for path, source in _template_sources(repo_folder).items():
+        try:
+            templates[source_digest(source)] = env.compile(source)
+        except jinja2.TemplateSyntaxError as e:
+            raise ValueError(f"Template {path}: syntax error at line {e.lineno} - {e.message}") from e
+
+    bundle_path = os.path.join(repo_folder, ".stage0_template", BUNDLE_FILE)
+    tmp_path = f"{bundle_path}.tmp"
+    with open(tmp_path, "wb") as file:
+        marshal.dump({"format": BUNDLE_FORMAT, "compiler": compiler_tag(), "templates": templates}, file)
+    os.replace(tmp_path, bundle_path)
+    logger.info(f"Bundled {len(templates)} templates into {bundle_path}")
+    return bundle_path
+
+
+def read_bundle(bundle_path: str) -> Dict[str, CodeType]:
+    """
+    Load a bundle's compiled templates, keyed by source digest. A bundle that
+    cannot be read or was built by another Jinja or Python version is ignored.
+    """
+    try:
+        with open(bundle_path, "rb") as file:
+            bundle: Any = marshal.load(file)
+    except (OSError, EOFError, ValueError, TypeError) as e:
+        logger.warning(f"Ignoring template bundle {bundle_path}: {e}")
+        return {}
+    if not isinstance(bundle, dict) or bundle.get("format") != BUNDLE_FORMAT:
+        logger.warning(f"Ignoring template bundle {bundle_path}: unknown format")
+        return {}
+    if bundle.get("compiler") != compiler_tag():
+        logger.warning(
+            f"Ignoring template bundle {bundle_path}: built with {bundle.get('compiler')}, running {compiler_tag()}"
+        )
+        return {}
+    logger.info(f"Loaded {len(bundle['templates'])} precompiled templates from {bundle_path}")
+    return bundle["templates"]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    repo_folder = argv[0] if argv else os.getenv("REPO_FOLDER", "/repo")
+    logging_level = os.getenv("LOG_LEVEL", "INFO").upper()
+    logging.basicConfig(level=logging_level, format="%(levelname)s: %(message)s", stream=sys.stderr)
+    try:
+        build_bundle(repo_folder)
+    except Exception as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import filecmp
+import marshal
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from bundle import BUNDLE_FILE, build_bundle, read_bundle
+from main import Processor, processor_options
+
+
+class TestTemplateBundle(unittest.TestCase):
+    TEST_SPECIFICATIONS = "./test/repo/.stage0_template/test_data"
+    TEST_REPO = "./test/repo"
+    TEST_EXPECTED = "./test/repo/.stage0_template/test_expected"
+    PATTERNS = 10
+
+    def setUp(self):
+        os.environ["SERVICE_NAME"] = "user"
+        os.environ["DATA_SOURCE"] = "organization"
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo = os.path.join(self.tmpdir.name, "repo")
+        shutil.copytree(self.TEST_REPO, self.repo)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+        del os.environ["SERVICE_NAME"]
+        del os.environ["DATA_SOURCE"]
+
+    def test_bundled_templates_are_not_compiled(self):
+        """Test that a merge with a bundle loads every template precompiled and matches the expected output."""
+        build_bundle(self.repo)
+        processor = Processor(self.TEST_SPECIFICATIONS, self.repo, template_bundle=True)
+        processor.run()
+        self.assertEqual(6, processor.template_cache.bundled)
+        # Only output name and context path patterns are compiled
+        self.assertEqual(self.PATTERNS, processor.template_cache.compiled)
+        names = os.listdir(self.TEST_EXPECTED)
+        _, mismatch, errors = filecmp.cmpfiles(self.TEST_EXPECTED, self.repo, names, shallow=False)
+        self.assertEqual(([], []), (mismatch, errors))
+
+    def test_changed_template_falls_back_to_source(self):
+        """Test that a template edited after bundling is compiled from its source."""
+        build_bundle(self.repo)
+        with open(os.path.join(self.repo, "simple.md"), "a") as file:
+            file.write("\nedited")
+        processor = Processor(self.TEST_SPECIFICATIONS, self.repo, template_bundle=True)
+        processor.run()
+        self.assertEqual(5, processor.template_cache.bundled)
+        self.assertEqual(self.PATTERNS + 1, processor.template_cache.compiled)
+        with open(os.path.join(self.repo, "simple.md")) as file:
+            self.assertTrue(file.read().endswith("\nedited"))
+
+    def test_bundle_from_other_compiler_is_ignored(self):
+        """Test that a bundle built by another Jinja or Python version is not loaded."""
+        bundle_path = build_bundle(self.repo)
+        with open(bundle_path, "rb") as file:
+            bundle = marshal.load(file)
+        bundle["compiler"] = "jinja2-0.0/python-0000"
+        with open(bundle_path, "wb") as file:
+            marshal.dump(bundle, file)
+        with self.assertLogs("bundle", level="WARNING"):
+            self.assertEqual({}, read_bundle(bundle_path))
+
+    def test_bundle_is_opt_in(self):
+        """Test that a bundle in the repo is ignored unless template_bundle is set."""
+        build_bundle(self.repo)
+        self.assertTrue(os.path.exists(os.path.join(self.repo, ".stage0_template", BUNDLE_FILE)))
+        with patch.dict(os.environ):
+            os.environ.pop("TEMPLATE_BUNDLE", None)
+            self.assertFalse(processor_options()["template_bundle"])
+        processor = Processor(self.TEST_SPECIFICATIONS, self.repo)
+        processor.run()
+        self.assertEqual(0, processor.template_cache.bundled)
+        self.assertEqual(self.PATTERNS + 6, processor.template_cache.compiled)
+
+
+if __name__ == "__main__":
+    unittest.main()
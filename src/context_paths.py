@@ -0,0 +1,88 @@
+"""
+Compiled dotted paths into the merge context.
+
+process.yaml names context values by dotted paths such as
+`specifications.architecture.product`, in context directives, `requires` and
+mergeFor / mergeFrom `items`. A PathAccessor splits its path once and is reused
+on every lookup. RequiresTrie checks all `requires` entries in one walk, so a
+prefix shared by many entries is looked up once.
+"""
+from collections.abc import Mapping
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _available(value: Any) -> Any:
+    """What an error message lists as available below value."""
+    return list(value.keys()) if isinstance(value, Mapping) else f"<{type(value).__name__}>"
+
+
+class PathAccessor:
+    """A dotted path, split once, that resolves against a context."""
+
+    __slots__ = ("path", "keys")
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.keys = tuple(path.split("."))
+
+    def resolve(self, context: Any) -> Any:
+        value = context
+        for depth, key in enumerate(self.keys):
+            if key not in value:
+                raise KeyError(
+                    f"Path '{self.path}' failed at '{'.'.join(self.keys[:depth + 1])}': key '{key}' not found. "
+                    f"Available at this level: {_available(value)}"
+                )
+            value = value[key]
+        return value
+
+
+class _TrieNode:
+    __slots__ = ("first", "children")
+
+    def __init__(self, first: int) -> None:
+        self.first = first  # index of the first requires entry through this key
+        self.children: Dict[str, "_TrieNode"] = {}
+
+
+class RequiresTrie:
+    """
+    The `requires` entries of a process as a trie of their keys. verify walks
+    each shared prefix once and reports the first missing entry, in `requires`
+    order, with the same message a walk of each entry on its own would give.
+    """
+
+    def __init__(self, paths: List[str]) -> None:
+        self.paths = list(paths)
+        self._root: Dict[str, _TrieNode] = {}
+        for index, path in enumerate(self.paths):
+            children = self._root
+            for key in path.split("."):
+                node = children.get(key)
+                if node is None:
+                    node = children[key] = _TrieNode(index)
+                children = node.children
+
+    def verify(self, context: Any) -> None:
+        """Raise KeyError for the first entry missing from context."""
+        # (entry index, breadcrumb, available keys) of the earliest failing entry
+        missing: Optional[Tuple[int, Tuple[str, ...], Any]] = None
+        stack: List[Tuple[Any, Dict[str, _TrieNode], Tuple[str, ...]]] = [(context, self._root, ())]
+        while stack:
+            value, children, breadcrumb = stack.pop()
+            for key, node in children.items():
+                if missing is not None and node.first > missing[0]:
+                    # Only entries after the one already reported pass through here
+                    continue
+                if key not in value:
+                    missing = (node.first, breadcrumb + (key,), _available(value))
+                    continue
+                child = value[key]
+                if node.children:
+                    stack.append((child, node.children, breadcrumb + (key,)))
+        if missing is not None:
+            index, breadcrumb, available = missing
+            raise KeyError(
+                f"Required property '{self.paths[index]}' is missing at '{'.'.join(breadcrumb)}'. "
+                f"Available at this level: {available}"
+            )
@@ -0,0 +1,143 @@
+"""
+Guardrails against runaway templates.
+
+A template that loops over more than it should (to_json of all of
+specifications inside a mergeFrom over thousands of items) can exhaust the
+container's memory or run for a very long time. RenderLimits caps the bytes one
+output may render, the bytes all outputs of a run may render, and the wall-clock
+time spent rendering one template and the whole run. RenderBudget checks them
+as each output streams, so a run stops at the first chunk past a limit, with
+an error naming the template and item, before that output is written.
+
+Limits come from MERGE_MAX_* environment variables and from a `limits`
+section in process.yaml; when both set a limit, the lower one applies.
+"""
+import os
+import time
+from typing import Any, Iterable, Iterator, Mapping, NamedTuple, Optional
+
+MB = 1024 * 1024
+
+# process.yaml `limits` keys and environment variables, by RenderLimits field and unit
+_SETTINGS = {
+    "output_bytes": ("outputMB", "MERGE_MAX_OUTPUT_MB", MB),
+    "total_bytes": ("totalMB", "MERGE_MAX_TOTAL_MB", MB),
+    "template_seconds": ("templateSeconds", "MERGE_MAX_TEMPLATE_SECONDS", 1),
+    "run_seconds": ("runSeconds", "MERGE_MAX_RUN_SECONDS", 1),
+}
+
+
+class RenderLimits(NamedTuple):
+    """Render limits; 0 means unlimited."""
+    output_bytes: float = 0  # rendered bytes of one output file
+    total_bytes: float = 0  # rendered bytes of every output in the run
+    template_seconds: float = 0  # wall-clock time rendering one template's outputs
+    run_seconds: float = 0  # wall-clock time rendering every template
+
+    def combine(self, other: "RenderLimits") -> "RenderLimits":
+        """The stricter of each limit in self and other."""
+        return RenderLimits(*(min(a, b) if a and b else a or b for a, b in zip(self, other)))
+
+
+def _limit(value: Any, name: str, scale: int) -> float:
+    try:
+        limit = float(value)
+    except (TypeError, ValueError):
+        limit = -1
+    if limit < 0:
+        raise ValueError(f"{name} must be a non-negative number, got {value!r}")
+    return limit * scale
+
+
+def limits_from_env() -> RenderLimits:
+    """Limits configured by MERGE_MAX_* environment variables."""
+    values = {}
+    for field, (_, variable, scale) in _SETTINGS.items():
+        value = os.getenv(variable)
+        if value:
+            values[field] = _limit(value, f"Environment variable '{variable}'", scale)
+    return RenderLimits(**values)
+
+
+def limits_from_process(section: Optional[Mapping[str, Any]]) -> RenderLimits:
+    """Limits configured by the `limits` section of process.yaml."""
+    if not section:
+        return RenderLimits()
+    if not isinstance(section, Mapping):
+        raise ValueError(f"process.yaml limits must be a mapping, got {type(section).__name__}")
+    keys = {key: field for field, (key, _, _) in _SETTINGS.items()}
+    unknown = [key for key in section if key not in keys]
+    if unknown:
+        raise ValueError(f"Unknown process.yaml limits {unknown}, expected some of {list(keys)}")
+    return RenderLimits(**{
+        keys[key]: _limit(value, f"process.yaml limits.{key}", _SETTINGS[keys[key]][2])
+        for key, value in section.items()
+    })
+
+
+def _describe(field: str, value: float) -> str:
+    key, _, scale = _SETTINGS[field]
+    return f"{key}: {value / scale:g}"
+
+
+class RenderBudget:
+    """
+    A run's progress against its limits. begin_template starts each template's
+    clock (and the run's, at the first template) and guard wraps the chunks of
+    each output. A budget pickled to a render worker checks the worker's
+    outputs against the same deadlines.
+    """
+
+    def __init__(self, limits: RenderLimits) -> None:
+        self.limits = limits
+        self.rendered_bytes = 0
+        self._started = False
+        self._run_deadline: Optional[float] = None
+        self._template_deadline: Optional[float] = None
+        self._deadline_field = "run_seconds"
+
+    @property
+    def active(self) -> bool:
+        return any(self.limits)
+
+    def begin_template(self) -> None:
+        """Start the clock for the next template's outputs."""
+        if not self._started:
+            self._started = True
+            if self.limits.run_seconds:
+                self._run_deadline = time.time() + self.limits.run_seconds
+        self._template_deadline, self._deadline_field = self._run_deadline, "run_seconds"
+        if self.limits.template_seconds:
+            deadline = time.time() + self.limits.template_seconds
+            if self._run_deadline is None or deadline < self._run_deadline:
+                self._template_deadline, self._deadline_field = deadline, "template_seconds"
+
+    def _exceeded(self, template_name: str, item: Any, message: str) -> ValueError:
+        where = f"Template {template_name}" if item is None else f"Template {template_name} (item={item})"
+        return ValueError(f"{where}: render limit exceeded - {message}")
+
+    def guard(self, chunks: Iterable[str], template_name: str, item: Any = None) -> Iterator[str]:
+        """Yield chunks, raising ValueError at the first one past a limit."""
+        limits = self.limits
+        deadline = self._template_deadline
+        size = 0
+        for chunk in chunks:
+            length = len(chunk) if chunk.isascii() else len(chunk.encode("utf-8"))
+            size += length
+            self.rendered_bytes += length
+            if limits.output_bytes and size > limits.output_bytes:
+                raise self._exceeded(
+                    template_name, item,
+                    f"output is over {limits.output_bytes:g} bytes ({_describe('output_bytes', limits.output_bytes)})",
+                )
+            if limits.total_bytes and self.rendered_bytes > limits.total_bytes:
+                raise self._exceeded(
+                    template_name, item,
+                    f"run output is over {limits.total_bytes:g} bytes ({_describe('total_bytes', limits.total_bytes)})",
+                )
+            if deadline is not None and time.time() > deadline:
+                field = self._deadline_field
+                raise self._exceeded(
+                    template_name, item, f"rendering ran out of time ({_describe(field, getattr(limits, field))})"
+                )
+            yield chunk
@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import yaml
+
+from limits import MB, RenderLimits, limits_from_env, limits_from_process
+from main import Processor
+
+
+class TestRenderLimits(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        base = Path(self.tmpdir.name)
+        self.specs = base / "specs"
+        self.specs.mkdir()
+        types = {f"type{i}": {"description": "x" * 100} for i in range(20)}
+        (self.specs / "types.yaml").write_text(yaml.dump(types))
+        self.repo = base / "repo"
+        (self.repo / ".stage0_template").mkdir(parents=True)
+        (self.repo / "type.md").write_text("{{ item.name }}: {{ specifications | to_json }}")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _processor(self, limits=None, **options):
+        process = {
+            "templates": [{
+                "path": "./type.md",
+                "mergeFrom": {"items": "specifications.types", "output": "./{{ item.name }}.md"},
+            }],
+        }
+        if limits is not None:
+            process["limits"] = limits
+        (self.repo / ".stage0_template" / "process.yaml").write_text(yaml.dump(process))
+        return Processor(str(self.specs), str(self.repo), keep_process_files=True, **options)
+
+    def test_unlimited_by_default(self):
+        """Test that a merge without limits renders every output."""
+        self._processor().run()
+        self.assertTrue((self.repo / "type19.md").exists())
+
+    def test_output_limit_names_template_and_item(self):
+        """Test that an output past outputMB stops the run before it is written."""
+        processor = self._processor({"outputMB": 1000 / MB})
+        with self.assertRaises(ValueError) as ctx:
+            processor.run()
+        self.assertIn("Template ./type.md (item=type0): render limit exceeded", str(ctx.exception))
+        self.assertIn("outputMB", str(ctx.exception))
+        self.assertEqual([], [path.name for path in self.repo.glob("type*.md") if path.name != "type.md"])
+        self.assertEqual([], list(self.repo.glob(".*.tmp")))
+
+    def test_total_limit_from_environment(self):
+        """Test that MERGE_MAX_TOTAL_MB bounds the bytes rendered by the whole run."""
+        with patch.dict(os.environ, {"MERGE_MAX_TOTAL_MB": str(10000 / MB)}):
+            limits = limits_from_env()
+        processor = self._processor(render_limits=limits)
+        with self.assertRaises(ValueError) as ctx:
+            processor.run()
+        self.assertIn("run output is over 10000 bytes", str(ctx.exception))
+        self.assertTrue((self.repo / "type0.md").exists())
+        self.assertFalse((self.repo / "type19.md").exists())
+
+    def test_render_time_limit(self):
+        """Test that a template past templateSeconds stops the run."""
+        processor = self._processor({"templateSeconds": 1e-9})
+        with self.assertRaises(ValueError) as ctx:
+            processor.run()
+        self.assertIn("rendering ran out of time (templateSeconds: 1e-09)", str(ctx.exception))
+
+    def test_limits_apply_in_render_workers(self):
+        """Test that render workers stop an output at the output limit."""
+        processor = self._processor({"outputMB": 1000 / MB}, merge_workers=2)
+        with self.assertRaises(ValueError) as ctx:
+            processor.run()
+        self.assertIn("(item=type0): render limit exceeded", str(ctx.exception))
+
+    def test_stricter_limit_wins(self):
+        """Test that environment and process.yaml limits combine to the lower of each."""
+        combined = RenderLimits(output_bytes=100, run_seconds=5).combine(limits_from_process(
+            {"outputMB": 1, "runSeconds": 2, "templateSeconds": 1}
+        ))
+        self.assertEqual(RenderLimits(output_bytes=100, template_seconds=1, run_seconds=2), combined)
+        processor = self._processor({"outputMB": 1, "runSeconds": 2}, render_limits=RenderLimits(output_bytes=100))
+        self.assertEqual(RenderLimits(output_bytes=100, run_seconds=2), processor.render_limits)
+        self.assertEqual(processor.render_limits, processor.budget.limits)
+
+    def test_invalid_limits_are_rejected(self):
+        """Test that unknown or negative limits fail with the setting named."""
+        with self.assertRaises(ValueError) as ctx:
+            self._processor({"outputBytes": 10})
+        self.assertIn("Unknown process.yaml limits ['outputBytes']", str(ctx.exception))
+        with self.assertRaises(ValueError) as ctx:
+            limits_from_process({"runSeconds": -1})
+        self.assertIn("limits.runSeconds", str(ctx.exception))
+        with patch.dict(os.environ, {"MERGE_MAX_OUTPUT_MB": "lots"}):
+            with self.assertRaises(ValueError) as ctx:
+                limits_from_env()
+        self.assertIn("MERGE_MAX_OUTPUT_MB", str(ctx.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
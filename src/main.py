@@ -1,23 +1,60 @@
-import json
 import logging
 import os
 import shutil
 import sys
-from typing import Any, Dict, List
+import time
+from collections import ChainMap
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 import yaml
-from jinja2 import Environment, Template, TemplateSyntaxError, UndefinedError
+from jinja2 import TemplateSyntaxError, UndefinedError
+
+from bundle import BUNDLE_FILE, read_bundle
+from context_paths import PathAccessor, RequiresTrie
+from limits import RenderBudget, RenderLimits, limits_from_env, limits_from_process
+from rendering import TemplateCache, item_label, render, render_items_parallel, stream_item, stream_template
+from report import RunReport, TemplateReport, timed_phase
+from spec_cache import SpecificationCache, cache_from_env
+from spec_loader import (
+    Override,
+    YamlLoader,
+    find_specification_layers,
+    format_yaml_error,
+    load_specification_layers,
+    spec_keys,
+)
+from spec_store import StoreList, build_store
+from writer import OutputPipeline, OutputWriter
+
+# Modules only some runs need (plan mode, incremental merges, prefetching) are
+# imported where they are used, to keep the startup of a plain merge short.
+if TYPE_CHECKING:
+    from manifest import MergeManifest
+    from plan import PlannedOutput
 
 logger = logging.getLogger(__name__)
 
+MANIFEST_FILE = "manifest.json"
 
-def _format_yaml_error(e: Exception, file_path: str) -> str:
-    """Format YAML parsing errors with file path and line/column when available."""
-    msg = f"YAML parsing error in {file_path}: {e}"
-    if hasattr(e, "problem_mark") and e.problem_mark:
-        mark = e.problem_mark
-        msg += f" (line {mark.line + 1}, column {mark.column + 1})"
-    return msg
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment."""
+    raw = os.getenv(name)
+    if raw is None or raw.strip() == "":
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        raise ValueError(f"Environment variable '{name}' must be an integer, got {raw!r}")
+
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    """Read a true/false setting from the environment."""
+    raw = os.getenv(name)
+    if raw is None or raw.strip() == "":
+        return default
+    return raw.strip().lower() in ("1", "true", "yes", "on")
 
 class Processor:
     """
@@ -25,17 +62,76 @@ class Processor:
     based on process.yaml configuration.
     """
 
-    def __init__(self, specifications_folder: str, repo_folder: str) -> None:
+    def __init__(
+        self,
+        specifications_folder: str,
+        repo_folder: str,
+        spec_workers: int = 1,
+        spec_cache: Optional[SpecificationCache] = None,
+        lazy_specifications: bool = False,
+        template_cache: Optional[TemplateCache] = None,
+        merge_workers: int = 1,
+        keep_process_files: bool = False,
+        incremental: bool = False,
+        specifications: Optional[Any] = None,
+        report: Optional[RunReport] = None,
+        prefetch_specifications: bool = False,
+        template_bundle: bool = False,
+        writer_threads: int = 0,
+        writer_queue_bytes: int = 64 * 1024 * 1024,
+        specification_store: bool = False,
+        render_limits: Optional[RenderLimits] = None,
+    ) -> None:
         self.specifications_folder = specifications_folder
         self.repo_folder = repo_folder
+        self.spec_workers = spec_workers
+        self.spec_cache = spec_cache
+        self.lazy_specifications = lazy_specifications
+        self.template_cache = template_cache if template_cache is not None else TemplateCache()
+        self.merge_workers = merge_workers
+        # Incremental merges need the templates and manifest on the next run
+        self.keep_process_files = keep_process_files or incremental
+        self.incremental = incremental
+        self.prefetch_specifications = prefetch_specifications
+        self.template_bundle = template_bundle
+        self.writer_threads = writer_threads
+        self.writer_queue_bytes = writer_queue_bytes
+        self.specification_store = specification_store
+        # Combined with the process.yaml limits, and the budget built, by load_process
+        self.render_limits = render_limits if render_limits is not None else RenderLimits()
+        self.report = report if report is not None else RunReport()
         self.specifications: Dict[str, Any] = {}
         self.environment: Dict[str, str] = {}
         self.context: List[Dict[str, Any]] = []
         self.requires: List[str] = []
         self.templates: List[Dict[str, Any]] = []
         self.context_data: Dict[str, Any] = {"specifications": {}}
+        self._selector_indexes: Dict[Any, Any] = {}
+        self._paths: Dict[str, PathAccessor] = {}
+        self._requires: Optional[RequiresTrie] = None
+        self._lazy_overrides: Optional[List[Override]] = None
         self.load_process()
-        self.load_specifications()
+        if specifications is not None:
+            # Share an already loaded (read-only) specifications tree
+            self.context_data["specifications"] = specifications
+        else:
+            self.load_specifications()
+
+    def run(self, environment: Optional[Mapping] = None) -> None:
+        """Run the merge pipeline: environment, context, requirements and templates."""
+        # Serializer output is only reused within a run
+        self.template_cache.serializers.clear()
+        self.read_environment(environment)
+        self.add_context()
+        self.verify_exists()
+        self.process_templates()
+        self._count_lazy_overrides()
+
+    def _count_lazy_overrides(self) -> None:
+        """Report the values lazily loaded overlays overrode during the run."""
+        if self._lazy_overrides is not None:
+            self.report.count("specification_overrides", len(self._lazy_overrides))
+            logger.info(f"Specification overlays overrode {len(self._lazy_overrides)} values read during the run")
 
     def remove_process_file(self) -> None:
         """Recursively remove the .stage0_template directory."""
@@ -43,16 +139,17 @@ class Processor:
         logger.info(f"Removing {process_file_path}")
         shutil.rmtree(process_file_path)
 
+    @timed_phase("load_process")
     def load_process(self) -> None:
         """Load the process.yaml file from the repository folder."""
         process_file_path = os.path.join(self.repo_folder, ".stage0_template/process.yaml")
         try:
             with open(process_file_path, "r") as file:
-                process = yaml.safe_load(file)
+                process = yaml.load(file, Loader=YamlLoader)
         except FileNotFoundError:
             raise FileNotFoundError(f"Process file not found: {process_file_path}")
         except yaml.YAMLError as e:
-            raise ValueError(_format_yaml_error(e, process_file_path)) from e
+            raise ValueError(format_yaml_error(e, process_file_path)) from e
         except IOError as e:
             raise IOError(f"Error reading Process file {process_file_path}: {e}") from e
 
@@ -64,47 +161,112 @@ class Processor:
         self.context = process.get("context", [])
         self.requires = process.get("requires", [])
         self.templates = process.get("templates", [])
+        self._compile_paths()
+        try:
+            self.render_limits = self.render_limits.combine(limits_from_process(process.get("limits")))
+        except ValueError as e:
+            raise ValueError(f"Process file {process_file_path}: {e}") from e
+        self.budget = RenderBudget(self.render_limits)
 
         logger.info(f"Process Loaded for {len(self.templates)} templates")
         logger.debug(
             f"Process config: {len(self.environment)} env vars, {len(self.context)} context directives, "
             f"{len(self.requires)} requirements, templates={[t.get('path') for t in self.templates]}"
         )
+        bundle_path = self._process_path(BUNDLE_FILE)
+        if self.template_bundle and os.path.exists(bundle_path):
+            self.template_cache.use_bundle(read_bundle(bundle_path))
 
+    @timed_phase("load_specifications")
     def load_specifications(self) -> None:
-        """Recursively load YAML files from the specifications folder."""
-        files_read = 0
-        for root, _, files in os.walk(self.specifications_folder):
-            for file in files:
-                if file.endswith(".yaml"):
-                    file_path = os.path.join(root, file)
-                    try:
-                        with open(file_path, "r") as f:
-                            data = yaml.safe_load(f)
-                    except yaml.YAMLError as e:
-                        raise ValueError(_format_yaml_error(e, file_path)) from e
-                    except IOError as e:
-                        raise IOError(f"Error reading specification file {file_path}: {e}") from e
-
-                    files_read += 1
-                    relative_path = os.path.relpath(file_path, self.specifications_folder)
-                    keys = relative_path.replace(".yaml", "").split(os.sep)
-                    temp = self.context_data["specifications"]
-                    for key in keys[:-1]:
-                        temp = temp.setdefault(key, {})
-                    temp[keys[-1]] = data
-
-        spec_keys = list(self.context_data["specifications"].keys())
-        logger.info(f"Specifications Loaded from {files_read} documents")
-        logger.debug(f"Specification top-level keys: {spec_keys}")
-
-    def read_environment(self) -> None:
+        """
+        Recursively load YAML files from the specifications folder, or from
+        each folder of an os.pathsep separated list, deep-merged in order.
+        Files are parsed in a process pool when spec_workers > 1, and only
+        files missing from spec_cache are parsed when a cache is configured.
+        With lazy_specifications, files are only indexed here and parsed the
+        first time something reads them. With prefetch_specifications, only
+        the files process.yaml and its templates can read are loaded. With
+        specification_store, the tree is moved into a memory-mapped store
+        that merge workers open instead of receiving a copy.
+        """
+        layers = find_specification_layers(self.specifications_folder)
+        if self.prefetch_specifications:
+            layers = self._prefetch_files(layers)
+        overrides: List[Override] = []
+        tree = load_specification_layers(
+            layers, self.spec_workers, self.spec_cache, self.lazy_specifications, self.report.spec_files, overrides
+        )
+        documents = sum(len(paths) for _, paths in layers)
+        if self.specification_store:
+            # Reads every lazily indexed file
+            tree = build_store(tree)
+        self.context_data["specifications"] = tree
+        if len(layers) > 1:
+            if self.lazy_specifications and not self.specification_store:
+                # Filled as overlaid documents are first read, counted when the run ends
+                self._lazy_overrides = overrides
+                logger.info(
+                    f"Specifications overlaid from {len(layers)} folders, overrides applied as documents are read"
+                )
+            else:
+                self.report.count("specification_overrides", len(overrides))
+                logger.info(f"Specifications overlaid from {len(layers)} folders, {len(overrides)} values overridden")
+        if self.lazy_specifications and not self.specification_store:
+            logger.info(f"Specifications Indexed from {documents} documents, parsing on demand")
+        else:
+            logger.info(f"Specifications Loaded from {documents} documents")
+        logger.debug(f"Specification top-level keys: {list(tree.keys())}")
+
+    def _prefetch_files(self, layers: List[Tuple[str, List[str]]]) -> List[Tuple[str, List[str]]]:
+        """
+        Keep the specification files that static analysis of process.yaml and
+        its templates says can be read, or all of them when analysis cannot tell.
+        """
+        from analysis import needed_files, process_references
+
+        sources = {}
+        for template_config in self.templates:
+            template_path = os.path.normpath(os.path.join(self.repo_folder, template_config["path"]))
+            try:
+                sources[template_config["path"]] = self._read_template(
+                    template_config, template_path, save_source=False
+                )
+            except OSError:
+                continue
+        process = {"context": self.context, "requires": self.requires, "templates": self.templates}
+        try:
+            references = process_references(
+                process, sources, self.template_cache.env, self.template_cache.pattern_env
+            )
+        except TemplateSyntaxError as e:
+            logger.info(f"Loading all specifications, a template could not be analyzed: {e}")
+            return layers
+        if references.unused_context:
+            logger.info(f"Context keys never read by requires or templates: {', '.join(references.unused_context)}")
+        if references.spec_paths is None:
+            logger.info(f"Loading all specifications, {references.reason}")
+            return layers
+
+        files = {path: tuple(spec_keys(path, folder)) for folder, paths in layers for path in paths}
+        needed = needed_files(files, references.spec_paths)
+        kept = set(needed)
+        unused = [path for path in files if path not in kept]
+        self.report.count("specification_files_skipped", len(unused))
+        logger.info(f"Prefetching {len(needed)} of {len(files)} specification files, {len(unused)} are never read")
+        logger.debug(f"Unused specification files: {unused}")
+        return [(folder, [path for path in paths if path in kept]) for folder, paths in layers]
+
+    @timed_phase("read_environment")
+    def read_environment(self, values: Optional[Mapping] = None) -> None:
         """
         Load environment variables as specified in the process.yaml.
+        Values given in `values` take precedence over the process environment.
         Raise an exception if a required variable is missing.
         """
         for var_name in self.environment.keys():
-            value = os.getenv(var_name)
+            value = values.get(var_name) if values is not None else None
+            value = os.getenv(var_name) if value is None else str(value)
             if value is None:
                 raise KeyError(
                     f"Environment variable '{var_name}' is not set. "
@@ -115,13 +277,15 @@ class Processor:
         logger.info(f"{len(self.environment)} Environment Variables loaded successfully.")
         logger.debug(f"Environment: {dict(self.environment)}")
 
+    @timed_phase("add_context")
     def add_context(self) -> None:
         """Add context elements to the context_data based on standardized directives."""
         for context_item in self.context:
             key = context_item["key"]
             directive_type = context_item["type"]
+            start = time.perf_counter()
             try:
-                path = Template(context_item["path"]).render(self.environment)
+                path = self.template_cache.pattern(context_item["path"]).render(self.environment)
             except (UndefinedError, TemplateSyntaxError) as e:
                 raise ValueError(
                     f"Context directive '{key}': failed to render path '{context_item['path']}': {e}"
@@ -131,10 +295,10 @@ class Processor:
                 if directive_type == "path":
                     value = self.resolve_path(path)
                 elif directive_type == "selector":
-                    filter_property = Template(context_item["filter"]["property"]).render(
+                    filter_property = self.template_cache.pattern(context_item["filter"]["property"]).render(
                         self.environment
                     )
-                    filter_value = Template(context_item["filter"]["value"]).render(
+                    filter_value = self.template_cache.pattern(context_item["filter"]["value"]).render(
                         self.environment
                     )
                     value = self.resolve_selector(path, filter_property, filter_value)
@@ -142,6 +306,7 @@ class Processor:
                     raise ValueError(f"Unknown context directive type: {directive_type}")
 
                 self.context_data[key] = value
+                self.report.record_directive(key, directive_type, path, time.perf_counter() - start)
                 logger.debug(f"Context '{key}' resolved: {directive_type} -> {path}")
             except (KeyError, ValueError) as e:
                 raise ValueError(
@@ -150,36 +315,89 @@ class Processor:
 
         logger.info(f"{len(self.context)} Data Contexts Established")
 
+    def _compile_paths(self) -> None:
+        """
+        Split the literal context, requires and items paths of process.yaml
+        once. Templated context paths are compiled when first rendered.
+        """
+        self._paths.clear()
+        paths = [item.get("path") for item in self.context or [] if isinstance(item, dict)]
+        for template_config in self.templates or []:
+            for merge in ("mergeFor", "mergeFrom"):
+                if isinstance(template_config, dict) and isinstance(template_config.get(merge), dict):
+                    paths.append(template_config[merge].get("items"))
+        for path in paths:
+            if isinstance(path, str) and "{" not in path:
+                self._accessor(path)
+        self._requires = RequiresTrie(self.requires or [])
+
+    def _accessor(self, path: str) -> PathAccessor:
+        accessor = self._paths.get(path)
+        if accessor is None:
+            accessor = self._paths[path] = PathAccessor(path)
+        return accessor
+
     def resolve_path(self, path: str) -> Any:
         """Resolve a simple property path."""
-        keys = path.split(".")
-        value = self.context_data
-        breadcrumb = []
-        for key in keys:
-            breadcrumb.append(key)
-            if key not in value:
-                available = list(value.keys()) if isinstance(value, dict) else f"<{type(value).__name__}>"
-                raise KeyError(
-                    f"Path '{path}' failed at '{'.'.join(breadcrumb)}': key '{key}' not found. "
-                    f"Available at this level: {available}"
-                )
-            value = value[key]
-        return value
+        return self._accessor(path).resolve(self.context_data)
+
+    def _selector_index(self, list_path: str, property_name: str, items: List[Any]) -> Dict[Any, Any]:
+        """
+        Map each value of property_name to the first item holding it. Duplicate
+        values are logged once, in list order, when the index is built.
+        """
+        cached = self._selector_indexes.get((list_path, property_name))
+        if cached is not None and cached[0] is items:
+            return cached[1]
+        index: Dict[Any, Any] = {}
+        duplicates: Set[Any] = set()
+        for item in items:
+            if not isinstance(item, Mapping) or property_name not in item:
+                continue
+            value = item[property_name]
+            try:
+                if value not in index:
+                    index[value] = item
+                else:
+                    duplicates.add(value)
+            except TypeError:
+                # Unhashable values can never equal a rendered filter value
+                continue
+        if duplicates:
+            # index keys are in list order
+            logger.warning(
+                f"Selector on {list_path} by {property_name}: duplicate values "
+                f"{', '.join(repr(value) for value in index if value in duplicates)}, the first matching item is used"
+            )
+        self._selector_indexes[(list_path, property_name)] = (items, index)
+        logger.debug(f"Indexed {len(items)} items of {list_path} by {property_name}")
+        return index
 
     def resolve_selector(
         self, list_path: str, property_name: str, property_value: Any
     ) -> Any:
-        """Resolve a list item based on filter criteria."""
+        """
+        Resolve a list item based on filter criteria. The first item whose
+        property equals the value wins, looked up in an index that is built
+        once per (list path, property) and reused by later selectors.
+        """
         items = self.resolve_path(list_path)
-        if not isinstance(items, list):
+        if not isinstance(items, (list, StoreList)):
             raise ValueError(
                 f"Path '{list_path}' must resolve to a list, got {type(items).__name__}"
             )
-        for item in items:
-            if item.get(property_name) == property_value:
-                return item
+        index = self._selector_index(list_path, property_name, items)
+        try:
+            if property_value in index:
+                return index[property_value]
+        except TypeError:
+            # Unhashable filter value, fall back to a scan
+            for item in items:
+                if isinstance(item, Mapping) and item.get(property_name) == property_value:
+                    return item
         available_values = [
-            repr(item.get(property_name, "<missing>")) for item in items[:5]
+            repr(item.get(property_name, "<missing>")) if isinstance(item, Mapping) else f"<{type(item).__name__}>"
+            for item in items[:5]
         ]
         if len(items) > 5:
             available_values.append("...")
@@ -188,160 +406,408 @@ class Processor:
             f"Available {property_name} values: {', '.join(available_values)}"
         )
 
+    @timed_phase("verify_exists")
     def verify_exists(self) -> None:
-        """Ensure all required properties exist in the context data."""
-        for prop in self.requires:
-            keys = prop.split(".")
-            value = self.context_data
-            breadcrumb = []
-            for key in keys:
-                breadcrumb.append(key)
-                if key not in value:
-                    available = (
-                        list(value.keys())
-                        if isinstance(value, dict)
-                        else f"<{type(value).__name__}>"
-                    )
-                    raise KeyError(
-                        f"Required property '{prop}' is missing at '{'.'.join(breadcrumb)}'. "
-                        f"Available at this level: {available}"
-                    )
-                value = value[key]
+        """
+        Ensure all required properties exist in the context data, in one walk
+        over the requires trie so shared prefixes are resolved once.
+        """
+        if self._requires is None or self._requires.paths != self.requires:
+            self._requires = RequiresTrie(self.requires)
+        self._requires.verify(self.context_data)
         logger.info(f"Verified {len(self.requires)} required properties exist, go for processing")
         logger.debug(f"Required properties verified: {self.requires}")
 
-    def process_templates(self) -> None:
-        """Process templates according to the process.yaml configuration."""
-        files_written = 0
+    def _render_items(
+        self, template_config: Dict[str, Any], source: str, template: Any, items: List[Any], spread_item: bool
+    ) -> Iterator[Iterable[str]]:
+        """
+        Yield the output of a mergeFor/mergeFrom template for each item, in
+        item order, as an iterable of chunks. Items are streamed in-process, or
+        rendered across a process pool when merge_workers > 1.
+        """
+        items = list(items)
+        if self.merge_workers > 1 and len(items) > 1:
+            rendered = render_items_parallel(
+                template_config["path"], source, self.context_data, items, spread_item, self.merge_workers,
+                self.budget if self.budget.active else None,
+            )
+            for output in rendered:
+                yield (output,)
+            return
+        for item in items:
+            yield stream_item(template, template_config["path"], self.context_data, item, spread_item)
+
+    def _process_path(self, *parts: str) -> str:
+        """Path inside the repo's .stage0_template folder."""
+        return os.path.join(self.repo_folder, ".stage0_template", *parts)
+
+    def _read_template(
+        self, template_config: Dict[str, Any], template_path: str, save_source: bool = True
+    ) -> str:
+        """
+        Read a template's source. When process files are kept, the source of an
+        in-place merge is saved under .stage0_template/sources so later runs
+        render from the original rather than from the merged output. Plans
+        read the saved source but never save one (save_source=False).
+        """
+        saved_path = None
+        if self.keep_process_files and not template_config.get("output") and template_config.get("merge"):
+            saved_path = self._process_path("sources", os.path.normpath(template_config["path"]))
+        read_path = saved_path if saved_path and os.path.exists(saved_path) else template_path
+        try:
+            with open(read_path, "r") as file:
+                source = file.read()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Template file not found: {template_path}")
+        except IOError as e:
+            raise IOError(f"Error reading template file {template_path}: {e}")
+        if save_source and saved_path and read_path != saved_path:
+            os.makedirs(os.path.dirname(saved_path), exist_ok=True)
+            with open(saved_path, "w") as file:
+                file.write(source)
+        return source
+
+    def _remove_template(self, pipeline: OutputPipeline, template_path: str) -> None:
+        """Remove a consumed template file, unless process files are kept."""
+        if self.keep_process_files:
+            logger.debug(f"Keeping template {template_path}")
+            return
+        logger.debug(f"Removing template {template_path}")
+        pipeline.remove(template_path)
+
+    def _template_digest(
+        self, source: str, output_pattern: Optional[str], output_context: Dict[str, Any]
+    ) -> str:
+        """
+        Digest of everything a template's output depends on apart from the
+        item: its source, output pattern and the context sub-trees it reads.
+        """
+        from analysis import select, template_references
+        from manifest import fingerprint
+
+        def referenced(env: Any, text: str, values: Dict[str, Any]) -> List[Any]:
+            return [
+                (name, [(path, select(values[name], path)) for path in sorted(paths, key=repr)])
+                for name, paths in sorted(template_references(env, text).items())
+                if name in values
+            ]
+
+        context = referenced(self.template_cache.env, source, self.context_data)
+        pattern_values = []
+        if output_pattern:
+            pattern_values = referenced(self.template_cache.pattern_env, output_pattern, output_context)
+        return fingerprint(source, output_pattern, context, pattern_values)
+
+    def _write_items(
+        self,
+        template_config: Dict[str, Any],
+        source: str,
+        template: Any,
+        jobs: List[Any],
+        spread_item: bool,
+        manifest: Optional["MergeManifest"],
+        output_pattern: str,
+        pipeline: OutputPipeline,
+        template_report: TemplateReport,
+    ) -> None:
+        """
+        Render and write mergeFor/mergeFrom jobs of (item, output_file_name,
+        output_path), skipping outputs the manifest reports as current.
+        """
+        pending = []
+        template_digest = None
+        if manifest is not None:
+            from manifest import fingerprint
+
+            template_digest = self._template_digest(source, output_pattern, {})
+        for item, output_file_name, output_path in jobs:
+            if manifest is not None:
+                digest = fingerprint(template_digest, item)
+                output = os.path.relpath(output_path, self.repo_folder)
+                manifest.record(output, template_config["path"], output_pattern, item_label(item), digest)
+                if manifest.is_current(output, digest, output_path):
+                    logger.debug(f"Skipping {output_file_name}, inputs unchanged")
+                    pipeline.writer.skipped += 1
+                    continue
+            pending.append((item, output_file_name, output_path))
+
+        outputs = self._render_items(template_config, source, template, [job[0] for job in pending], spread_item)
+        for item, output_file_name, output_path in pending:
+            logger.info(f"Building {output_file_name}")
+            self._write_output(pipeline, template_report, output_path, item_label(item), next(outputs))
+
+    def _write_output(
+        self,
+        pipeline: OutputPipeline,
+        template_report: TemplateReport,
+        output_path: str,
+        item: Any,
+        chunks: Iterable[str],
+    ) -> None:
+        """Render (by consuming chunks) and write one output, recording its timing once written."""
+        output = os.path.relpath(output_path, self.repo_folder)
+        if self.budget.active:
+            chunks = self.budget.guard(chunks, template_report.path, item)
+
+        def done(written: bool, size: int, seconds: float) -> None:
+            template_report.record_output(output, item, seconds, size, written)
+
+        pipeline.submit(output_path, chunks, done)
+
+    def _merge_output(
+        self, template_config: Dict[str, Any], template_path: str
+    ) -> Tuple[Optional[str], Mapping[str, Any], str, str]:
+        """
+        Locate the output of a merge template: its output pattern, the context
+        the pattern renders in, and the output file name and path.
+        """
+        output_pattern = template_config.get("output")
+        if output_pattern:
+            # Write to output path and delete the template file
+            output_context = ChainMap(self.environment, self.context_data)
+            output_file_name = render(self.template_cache.pattern(output_pattern), output_context)
+            return (
+                output_pattern, output_context, output_file_name,
+                os.path.normpath(os.path.join(self.repo_folder, output_file_name)),
+            )
+        # Render and overwrite the template in-place
+        return None, {}, template_config["path"], template_path
+
+    def _item_jobs(self, template_config: Dict[str, Any]) -> Tuple[str, bool, List[Tuple[Any, str, str]]]:
+        """
+        Expand a mergeFor/mergeFrom template into jobs of (item, output_file_name,
+        output_path). Returns the output pattern, whether dict items are spread
+        into the render context, and the jobs.
+        """
+        if "mergeFor" in template_config:
+            # Use resolve_path to get the items for mergeFor processing
+            items = self.resolve_path(template_config["mergeFor"]["items"])
+            # Handle both list and dictionary iteration
+            if isinstance(items, Mapping):
+                # For dictionaries, create name/content pairs
+                iterable = [{"name": k, "content": v} for k, v in items.items()]
+            else:
+                # For lists (including lists of strings), use as-is
+                iterable = items
+            output_pattern = template_config["mergeFor"]["output"]
+            jobs = []
+            for item in iterable:
+                # Build the context for rendering the output file name.
+                # - For dict items, expose keys as top-level variables (backwards compatible)
+                # - Always expose the full item as `item` so string lists can use {{ item }}.
+                if isinstance(item, Mapping):
+                    output_context = ChainMap(item, {"item": item})
+                else:
+                    output_context = {"item": item}
+
+                # Render the output file name using the item-aware context
+                output_file_name = render(self.template_cache.pattern(output_pattern), output_context)
+                output_path = os.path.normpath(os.path.join(self.repo_folder, output_file_name))
+                jobs.append((item, output_file_name, output_path))
+            # Render with `item` plus any dict keys when item is a mapping
+            return output_pattern, True, jobs
+
+        # New directive for dictionary iteration
+        items = self.resolve_path(template_config["mergeFrom"]["items"])
+
+        if not isinstance(items, Mapping):
+            raise ValueError(f"mergeFrom requires a dictionary, got {type(items)}")
+
+        # Convert dictionary to name/content pairs
+        iterable = [{"name": k, "content": v} for k, v in items.items()]
+        output_pattern = template_config["mergeFrom"]["output"]
+        jobs = []
+        for item in iterable:
+            # Render the output file name using the item context
+            output_file_name = self.template_cache.pattern(output_pattern).render(item=item)
+            output_path = os.path.normpath(os.path.join(self.repo_folder, output_file_name))
+            jobs.append((item, output_file_name, output_path))
+        # Render with `item` in the context
+        return output_pattern, False, jobs
+
+    def plan(
+        self, environment: Optional[Mapping] = None, render: bool = True, scratch_folder: Optional[str] = None
+    ) -> List["PlannedOutput"]:
+        """Run the merge pipeline up to templates, planning outputs instead of writing them."""
+        self.template_cache.serializers.clear()
+        self.read_environment(environment)
+        self.add_context()
+        self.verify_exists()
+        planned = self.plan_templates(render, scratch_folder)
+        self._count_lazy_overrides()
+        return planned
+
+    def _plan_output(
+        self, template_name: str, output_path: str, item: Any,
+        chunks: Optional[Iterable[str]], scratch_folder: Optional[str],
+    ) -> "PlannedOutput":
+        """Render (when chunks are given) and describe one planned output."""
+        from plan import PlannedOutput, content_digest, output_status
+
+        output = os.path.relpath(output_path, self.repo_folder)
+        if chunks is None:
+            return PlannedOutput(template_name, output, item_label(item), output_status(output_path, None))
+        if self.budget.active:
+            chunks = self.budget.guard(chunks, template_name, item_label(item))
+        text = "".join(chunks)
+        digest = content_digest(text)
+        if scratch_folder:
+            scratch_path = os.path.normpath(os.path.join(scratch_folder, output))
+            os.makedirs(os.path.dirname(scratch_path), exist_ok=True)
+            OutputWriter().write(scratch_path, (text,))
+        return PlannedOutput(
+            template_name, output, item_label(item), output_status(output_path, digest),
+            len(text.encode("utf-8")), digest,
+        )
+
+    @timed_phase("plan_templates")
+    def plan_templates(self, render: bool = True, scratch_folder: Optional[str] = None) -> List["PlannedOutput"]:
+        """
+        List every output process_templates would produce, leaving the repo
+        untouched. With render set, each output is rendered in memory to get
+        its size and hash, and written below scratch_folder when one is given.
+        """
+        from plan import plan_summary
+
+        planned = []
         for template_config in self.templates:
             template_path = os.path.normpath(os.path.join(self.repo_folder, template_config["path"]))
-            logger.info(f"Processing {template_path}")
-            try:
-                with open(template_path, "r") as file:
-                    env = Environment()
-                    env.filters['to_yaml'] = lambda value: yaml.dump(value, default_flow_style=False).rstrip()
-                    env.filters['to_json'] = lambda value: json.dumps(value, indent=2, sort_keys=True)
-                    env.filters['to_json_minified'] = lambda value: json.dumps(value, separators=(',', ':'))
-                    def indent_filter(s, n=2):
-                        if not s:
-                            return ''
-                        lines = s.splitlines()
-                        result = '\n'.join((' ' * n + line if line.strip() else '') for line in lines)
-                        return result
-                    env.filters['indent'] = indent_filter
-                    template = env.from_string(file.read())
-            except FileNotFoundError:
-                raise FileNotFoundError(f"Template file not found: {template_path}")
-            except IOError as e:
-                raise IOError(f"Error reading template file {template_path}: {e}")
-            logger.debug(f"Read Template {template_path}")
-            
+            source = self._read_template(template_config, template_path, save_source=False)
+            template = self.template_cache.template(source) if render else None
+            self.budget.begin_template()
+            name = template_config["path"]
+
             if "merge" in template_config and template_config["merge"]:
-                logger.debug(f"Merging {template_path}")
-                try:
-                    output = template.render(self.context_data)
-                except (UndefinedError, TemplateSyntaxError) as e:
-                    raise ValueError(
-                        f"Template {template_config['path']}: render failed - {e}"
-                    ) from e
-                if "output" in template_config:
-                    # Write to output path and delete the template file
-                    output_context = {**self.context_data, **self.environment}
-                    output_file_name = Template(template_config["output"]).render(output_context)
-                    output_path = os.path.normpath(os.path.join(self.repo_folder, output_file_name))
-                    logger.info(f"Building {output_file_name}")
-                    with open(output_path, "w") as file:
-                        file.write(output)
-                    logger.debug(f"Removing template {template_path}")
-                    os.remove(template_path)
-                else:
-                    # Render and overwrite the template in-place
-                    with open(template_path, "w") as file:
-                        file.write(output)
-                files_written += 1
-
-            elif "mergeFor" in template_config:
-                # Use resolve_path to get the items for mergeFor processing
-                items = self.resolve_path(template_config["mergeFor"]["items"])
-                # Handle both list and dictionary iteration
-                if isinstance(items, dict):
-                    # For dictionaries, create name/content pairs
-                    iterable = [{"name": k, "content": v} for k, v in items.items()]
-                else:
-                    # For lists (including lists of strings), use as-is
-                    iterable = items
-                for item in iterable:
-                    # Build the context for rendering the output file name.
-                    # - For dict items, expose keys as top-level variables (backwards compatible)
-                    # - Always expose the full item as `item` so string lists can use {{ item }}.
-                    if isinstance(item, dict):
-                        output_context = {**item}
-                        output_context.setdefault("item", item)
-                    else:
-                        output_context = {"item": item}
-
-                    # Render the output file name using the item-aware context
-                    output_file_name = Template(template_config["mergeFor"]["output"]).render(**output_context)
-                    output_path = os.path.normpath(os.path.join(self.repo_folder, output_file_name))
-                    logger.info(f"Building {output_file_name}")
+                _, _, _, output_path = self._merge_output(template_config, template_path)
+                chunks = stream_template(template, name, self.context_data) if render else None
+                planned.append(self._plan_output(name, output_path, None, chunks, scratch_folder))
+
+            elif "mergeFor" in template_config or "mergeFrom" in template_config:
+                _, spread_item, jobs = self._item_jobs(template_config)
+                outputs = None
+                if render:
+                    items = [job[0] for job in jobs]
+                    outputs = self._render_items(template_config, source, template, items, spread_item)
+                for item, _, output_path in jobs:
+                    chunks = next(outputs) if outputs is not None else None
+                    planned.append(self._plan_output(name, output_path, item, chunks, scratch_folder))
+
+        summary = ", ".join(f"{count} {status}" for status, count in sorted(plan_summary(planned).items()))
+        logger.info(f"Planned {len(planned)} outputs from {len(self.templates)} templates ({summary or 'none'})")
+        return planned
+
+    def _process_template(
+        self, template_config: Dict[str, Any], manifest: Optional["MergeManifest"], pipeline: OutputPipeline
+    ) -> None:
+        """Render one process.yaml template entry and queue its outputs on the pipeline."""
+        template_path = os.path.normpath(os.path.join(self.repo_folder, template_config["path"]))
+        logger.info(f"Processing {template_path}")
+        # An earlier output or removal may target this template
+        pipeline.settle(template_path)
+        source = self._read_template(template_config, template_path)
+        template_report = self.report.template(template_config["path"])
+        start = time.perf_counter()
+        template = self.template_cache.template(source)
+        template_report.compile_seconds = time.perf_counter() - start
+        logger.debug(f"Read Template {template_path}")
+        self.budget.begin_template()
+
+        if "merge" in template_config and template_config["merge"]:
+            logger.debug(f"Merging {template_path}")
+            output_pattern, output_context, output_file_name, output_path = self._merge_output(
+                template_config, template_path
+            )
 
-                    # Establish item context and render template
-                    # Expose `item` plus any dict keys when item is a mapping
-                    if isinstance(item, dict):
-                        context = {**self.context_data, **item, "item": item}
-                    else:
-                        context = {**self.context_data, "item": item}
-                    try:
-                        output = template.render(context)
-                    except (UndefinedError, TemplateSyntaxError) as e:
-                        raise ValueError(
-                            f"Template {template_config['path']} (item={item.get('name', item)}): "
-                            f"render failed - {e}"
-                        ) from e
-
-                    with open(output_path, "w") as file:
-                        file.write(output)
-                    files_written += 1
-
-                # Remove the original template file after processing
-                logger.debug(f"Removing template {template_path}")
-                os.remove(template_path)
-
-            elif "mergeFrom" in template_config:
-                # New directive for dictionary iteration
-                items = self.resolve_path(template_config["mergeFrom"]["items"])
-                
-                if not isinstance(items, dict):
-                    raise ValueError(f"mergeFrom requires a dictionary, got {type(items)}")
-                
-                # Convert dictionary to name/content pairs
-                iterable = [{"name": k, "content": v} for k, v in items.items()]
-                
-                for item in iterable:
-                    # Render the output file name using the item context
-                    output_file_name = Template(template_config["mergeFrom"]["output"]).render(item=item)
-                    output_path = os.path.normpath(os.path.join(self.repo_folder, output_file_name))
+            current = False
+            if manifest is not None:
+                digest = self._template_digest(source, output_pattern, output_context)
+                output = os.path.relpath(output_path, self.repo_folder)
+                manifest.record(output, template_config["path"], output_pattern, None, digest)
+                current = manifest.is_current(output, digest, output_path)
+            if current:
+                logger.debug(f"Skipping {output_file_name}, inputs unchanged")
+                pipeline.writer.skipped += 1
+            else:
+                if output_pattern:
                     logger.info(f"Building {output_file_name}")
+                self._write_output(
+                    pipeline, template_report, output_path, None,
+                    stream_template(template, template_config["path"], self.context_data),
+                )
+            if output_pattern:
+                self._remove_template(pipeline, template_path)
+
+        elif "mergeFor" in template_config or "mergeFrom" in template_config:
+            output_pattern, spread_item, jobs = self._item_jobs(template_config)
+            self._write_items(
+                template_config, source, template, jobs, spread_item, manifest, output_pattern, pipeline,
+                template_report,
+            )
 
-                    # Establish item context and render template
-                    context = {**self.context_data, "item": item}
-                    try:
-                        output = template.render(context)
-                    except (UndefinedError, TemplateSyntaxError) as e:
-                        raise ValueError(
-                            f"Template {template_config['path']} (item={item.get('name', item)}): "
-                            f"render failed - {e}"
-                        ) from e
-
-                    with open(output_path, "w") as file:
-                        file.write(output)
-                    files_written += 1
+            # Remove the original template file after processing
+            self._remove_template(pipeline, template_path)
 
-                # Remove the original template file after processing
-                logger.debug(f"Removing template {template_path}")
-                os.remove(template_path)
-        self.remove_process_file()
-        logger.info(f"Completed - Processed {len(self.templates)} templates, wrote {files_written} files")
+    @timed_phase("process_templates")
+    def process_templates(self) -> None:
+        """
+        Process templates according to the process.yaml configuration.
+        With incremental set, outputs whose inputs match the merge manifest
+        are skipped and outputs that are no longer produced are removed.
+        With writer_threads set, outputs are written on background threads
+        while the next ones render. Rendering stops with an error when an
+        output, the run or a template's render time passes its limit.
+        """
+        writer = OutputWriter()
+        manifest = None
+        if self.incremental:
+            from manifest import MergeManifest
+
+            manifest = MergeManifest(self._process_path(MANIFEST_FILE))
+        with OutputPipeline(writer, self.writer_threads, self.writer_queue_bytes) as pipeline:
+            for template_config in self.templates:
+                self._process_template(template_config, manifest, pipeline)
+
+        if manifest is not None:
+            repo = os.path.realpath(self.repo_folder)
+            removed = 0
+            for output in manifest.stale_outputs():
+                stale_path = os.path.join(self.repo_folder, output)
+                if not os.path.realpath(stale_path).startswith(repo + os.sep):
+                    # A tampered or hand-edited manifest must not reach outside the repo
+                    logger.warning(f"Not removing stale output {output}: it is outside {self.repo_folder}")
+                    continue
+                if os.path.exists(stale_path):
+                    logger.info(f"Removing stale output {output}")
+                    os.remove(stale_path)
+                    removed += 1
+            manifest.save()
+            logger.info(f"Incremental merge: {writer.skipped} outputs current, {removed} stale outputs removed")
+        if not self.keep_process_files:
+            self.remove_process_file()
+        self.report.count("files_written", writer.written)
+        self.report.count("files_unchanged", writer.unchanged)
+        self.report.count("files_skipped", writer.skipped)
+        self.report.count("bytes_written", writer.bytes_written)
+        logger.info(f"Completed - Processed {len(self.templates)} templates, {writer.summary()}")
+
+
+def processor_options() -> Dict[str, Any]:
+    """Processor keyword arguments configured through environment variables."""
+    return {
+        "spec_workers": _env_int("SPECIFICATIONS_WORKERS", 1),
+        "spec_cache": cache_from_env(),
+        "lazy_specifications": _env_flag("SPECIFICATIONS_LAZY"),
+        "prefetch_specifications": _env_flag("SPECIFICATIONS_PREFETCH"),
+        "template_bundle": _env_flag("TEMPLATE_BUNDLE"),
+        "merge_workers": _env_int("MERGE_WORKERS", 1),
+        "writer_threads": _env_int("WRITER_THREADS", 0),
+        "writer_queue_bytes": _env_int("WRITER_QUEUE_MB", 64) * 1024 * 1024,
+        "keep_process_files": _env_flag("KEEP_PROCESS_FILES"),
+        "incremental": _env_flag("INCREMENTAL_MERGE"),
+        "specification_store": _env_flag("SPECIFICATIONS_STORE"),
+        "render_limits": limits_from_env(),
+    }
 
 
 def main() -> None:
@@ -355,15 +821,70 @@ def main() -> None:
         f"Logging Level: {logging_level}"
     )
 
+    report_destination = os.getenv("MERGE_REPORT")
+    options = {"report": RunReport()}
     try:
-        processor = Processor(specifications_folder, repo_folder)
-        processor.read_environment()
-        processor.add_context()
-        processor.verify_exists()
-        processor.process_templates()
+        options.update(processor_options())
+        plan_destination = os.getenv("MERGE_PLAN")
+        if plan_destination:
+            from plan import write_plan
+
+            processor = Processor(specifications_folder, repo_folder, **options)
+            outputs = processor.plan(
+                render=_env_flag("MERGE_PLAN_RENDER", True),
+                scratch_folder=os.getenv("MERGE_PLAN_FOLDER") or None,
+            )
+            write_plan(outputs, plan_destination)
+            return
+        if _env_flag("MERGE_WATCH"):
+            import tempfile
+
+            from watch import watch
+
+            output_folder = os.getenv("MERGE_WATCH_FOLDER") or tempfile.mkdtemp(prefix="stage0_watch_")
+            watch(
+                specifications_folder,
+                repo_folder,
+                output_folder,
+                interval=_env_int("MERGE_WATCH_INTERVAL_MS", 500) / 1000,
+                **options,
+            )
+            return
+        batch = os.getenv("MERGE_BATCH")
+        if batch:
+            from batch import parse_repo_list, run_batch
+
+            results = run_batch(
+                specifications_folder,
+                parse_repo_list(batch),
+                workers=_env_int("BATCH_WORKERS", 1),
+                **options,
+            )
+            if any(result.error for result in results):
+                sys.exit(1)
+            return
+        matrix_file = os.getenv("MERGE_MATRIX")
+        if matrix_file:
+            from matrix import load_matrix, run_matrix
+
+            results = run_matrix(
+                specifications_folder,
+                repo_folder,
+                load_matrix(matrix_file),
+                workers=_env_int("MATRIX_WORKERS", 1),
+                **options,
+            )
+            if any(result.error for result in results):
+                sys.exit(1)
+            return
+        processor = Processor(specifications_folder, repo_folder, **options)
+        processor.run()
     except Exception as e:
         logger.exception(str(e))
         sys.exit(1)
+    finally:
+        if report_destination:
+            options["report"].write(report_destination)
 
 
 if __name__ == "__main__":
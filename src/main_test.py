@@ -7,6 +7,7 @@ from pathlib import Path
 from unittest.mock import patch, mock_open
 import os
 from main import Processor
+from writer import WRITE_BUFFER_SIZE
 
 class TestProcessor(unittest.TestCase):
     TEST_SPECIFICATIONS = "./test/repo/.stage0_template/test_data"
@@ -124,6 +125,36 @@ templates:
         self.assertIn("user", str(ctx.exception))
         self.assertIn("admin", str(ctx.exception))
 
+    def test_resolve_selector_reuses_index(self):
+        """Test that repeated selectors on the same list share one index."""
+        self.processor.context_data = {
+            "domains": [{"name": f"domain{i}", "id": i} for i in range(1000)]
+        }
+        self.assertEqual(7, self.processor.resolve_selector("domains", "name", "domain7")["id"])
+        index = self.processor._selector_indexes[("domains", "name")][1]
+        self.assertEqual(999, self.processor.resolve_selector("domains", "name", "domain999")["id"])
+        self.assertIs(index, self.processor._selector_indexes[("domains", "name")][1])
+        self.assertEqual(1, len(self.processor._selector_indexes))
+
+    def test_resolve_selector_duplicates_use_first_match(self):
+        """Test that duplicate values are reported, the first item wins and items without the property are skipped."""
+        self.processor.context_data = {
+            "domains": [
+                {"id": 0},
+                {"name": "user", "id": 1},
+                "not-a-dict",
+                {"id": 5},
+                {"name": "admin", "id": 2},
+                {"name": "user", "id": 3},
+                {"name": "admin", "id": 4},
+            ]
+        }
+        with self.assertLogs("main", level="WARNING") as logs:
+            item = self.processor.resolve_selector("domains", "name", "user")
+        self.assertEqual(1, item["id"])
+        self.assertIn("duplicate values 'user', 'admin', the first", logs.output[0])
+        self.assertNotIn(None, self.processor._selector_indexes[("domains", "name")][1])
+
     def test_verify_exists_missing_property_has_helpful_error(self):
         """Test that verify_exists raises KeyError with available keys when required missing."""
         self.processor.context_data = {"a": {"b": {"c": 1}}}
@@ -133,6 +164,26 @@ templates:
         self.assertIn("nonexistent", str(ctx.exception))
         self.assertIn("c", str(ctx.exception))
 
+    def test_verify_exists_reports_first_missing_requirement(self):
+        """Test that requires sharing a prefix are checked together and the first missing entry is reported."""
+        self.processor.context_data = {"a": {"x": 1, "y": {"z": 2}}, "b": {"c": 3}}
+        self.processor.requires = ["a.x", "a.y.z", "b.missing", "a.y.missing", "b.c"]
+        with self.assertRaises(KeyError) as ctx:
+            self.processor.verify_exists()
+        self.assertIn("Required property 'b.missing' is missing at 'b.missing'", str(ctx.exception))
+        self.assertIn("['c']", str(ctx.exception))
+        self.processor.requires = ["a.x", "a.y.z", "b.c"]
+        self.processor.verify_exists()
+
+    def test_resolve_path_compiles_each_path_once(self):
+        """Test that literal process.yaml paths are compiled at load and reused by every lookup."""
+        accessor = self.processor._paths["specifications.architecture"]
+        self.assertNotIn("specifications.dataDictionary.primary_document_types.{{DATA_SOURCE}}", self.processor._paths)
+        self.processor.read_environment()
+        self.processor.add_context()
+        self.assertIs(accessor, self.processor._paths["specifications.architecture"])
+        self.assertIn("specifications.dataDictionary.primary_document_types.organization", self.processor._paths)
+
     def test_add_context_with_resolved_directive(self):
         """Test that context is added correctly and resolves directives."""
         self.processor.read_environment()
@@ -165,9 +216,10 @@ templates:
             self.fail(f"verify_exists raised KeyError unexpectedly: {e}")
 
     @patch("builtins.open", new_callable=mock_open)
+    @patch("os.replace")
     @patch("os.remove")
     @patch("shutil.rmtree")
-    def test_process_templates(self, mock_rmtree, mock_remove, mock_file):
+    def test_process_templates(self, mock_rmtree, mock_remove, mock_replace, mock_file):
         """Test template processing with mock file operations."""
         # Prepare test data
         self.processor.read_environment()
@@ -177,12 +229,15 @@ templates:
         # Mock behavior for process_templates
         self.processor.process_templates()
 
-        # Verify that files were opened for writing for the merge templates
-        mock_file.assert_any_call(os.path.normpath(os.path.join(self.TEST_REPO, "simple.md")), "w")
-        mock_file.assert_any_call(os.path.normpath(os.path.join(self.TEST_REPO, "loop-in.ts")), "w")
-        mock_file.assert_any_call(os.path.normpath(os.path.join(self.TEST_REPO, "README.md")), "w")
-        mock_file.assert_any_call(os.path.normpath(os.path.join(self.TEST_REPO, "userService.ts")), "w")
-        mock_file.assert_any_call(os.path.normpath(os.path.join(self.TEST_REPO, "organizationService.ts")), "w")
+        # Verify that output was written to a temp file and renamed over each merge output
+        written = [call.args[1] for call in mock_replace.call_args_list]
+        self.assertIn(os.path.normpath(os.path.join(self.TEST_REPO, "simple.md")), written)
+        self.assertIn(os.path.normpath(os.path.join(self.TEST_REPO, "loop-in.ts")), written)
+        self.assertIn(os.path.normpath(os.path.join(self.TEST_REPO, "README.md")), written)
+        self.assertIn(os.path.normpath(os.path.join(self.TEST_REPO, "userService.ts")), written)
+        self.assertIn(os.path.normpath(os.path.join(self.TEST_REPO, "organizationService.ts")), written)
+        for call in mock_replace.call_args_list:
+            mock_file.assert_any_call(call.args[0], "wb", buffering=WRITE_BUFFER_SIZE)
 
         # Verify that the source template file was removed
         mock_remove.assert_any_call(os.path.normpath(os.path.join(self.TEST_REPO, "source.ts")))
@@ -390,5 +445,17 @@ templates:
         expected = 'Content: |\n  {\n    "key": "value",\n    "nested": {\n      "inner": "data"\n    }\n  }'
         self.assertEqual(result, expected)
 
+    def test_import_skips_optional_modules(self):
+        """Test that importing main does not load modules only worker pools, plans or incremental merges use."""
+        import subprocess
+        import sys
+
+        code = "import sys, main; print(' '.join(sorted(sys.modules)))"
+        completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        loaded = set(completed.stdout.split())
+        for module in ("concurrent.futures.process", "multiprocessing", "analysis", "manifest", "plan"):
+            self.assertNotIn(module, loaded)
+
+
 if __name__ == "__main__":
-    unittest.main()
\ No newline at end of file
+    unittest.main()
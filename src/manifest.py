@@ -0,0 +1,93 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from spec_loader import materialize
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+def _json_default(value: Any) -> Any:
+    plain = materialize(value)
+    return str(value) if plain is value else plain
+
+
+def _canonical(value: Any) -> Any:
+    """value as plain dicts and lists, with dict keys JSON cannot encode (such as YAML dates) tagged by type."""
+    value = materialize(value)
+    if isinstance(value, dict):
+        return {
+            key if isinstance(key, (str, int, float, bool, type(None))) else f"{type(key).__name__}:{key}":
+                _canonical(child)
+            for key, child in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [_canonical(child) for child in value]
+    return value
+
+
+def fingerprint(*values: Any) -> str:
+    """Stable hash of plain data (dicts, lists, scalars, lazy specifications and store views)."""
+    try:
+        encoded = json.dumps(values, default=_json_default, separators=(",", ":"))
+    except TypeError:
+        # json.dumps never calls default for dict keys
+        encoded = json.dumps(_canonical(values), default=_json_default, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class MergeManifest:
+    """
+    Record of what each generated file was rendered from.
+
+    Every output (relative to the repo folder) maps to its template, output
+    pattern, item key and a digest of the inputs it depended on. A later run
+    skips outputs whose digest is unchanged and removes outputs that are no
+    longer produced.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.previous: Dict[str, Dict[str, Any]] = {}
+        self.current: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as file:
+                    data = json.load(file)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable merge manifest {path}: {e}")
+                data = {}
+            if data.get("version") == MANIFEST_VERSION:
+                self.previous = data.get("outputs", {})
+
+    def is_current(self, output: str, digest: str, output_path: str) -> bool:
+        """True when output was last rendered from the same inputs and still exists."""
+        entry = self.previous.get(output)
+        return entry is not None and entry.get("digest") == digest and os.path.exists(output_path)
+
+    def record(
+        self, output: str, template: str, output_pattern: Optional[str], item: Any, digest: str
+    ) -> None:
+        """Record an output produced (or confirmed current) by this run."""
+        self.current[output] = {
+            "template": template,
+            "output": output_pattern,
+            "item": item,
+            "digest": digest,
+        }
+
+    def stale_outputs(self) -> List[str]:
+        """Outputs from the previous run that this run no longer produces."""
+        return [output for output in self.previous if output not in self.current]
+
+    def save(self) -> None:
+        """Write the manifest for this run."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"version": MANIFEST_VERSION, "outputs": self.current}, file, indent=2, sort_keys=True, default=str)
+        os.replace(tmp_path, self.path)
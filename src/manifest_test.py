@@ -0,0 +1,132 @@
+import datetime
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import yaml
+
+from main import Processor
+from manifest import MergeManifest, fingerprint
+
+
+class TestIncrementalMerge(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo = Path(self.tmpdir.name) / "repo"
+        self.specs = Path(self.tmpdir.name) / "specs"
+        (self.repo / ".stage0_template").mkdir(parents=True)
+        self.specs.mkdir()
+        (self.repo / ".stage0_template" / "process.yaml").write_text(yaml.dump({
+            "context": [{"key": "types", "type": "path", "path": "specifications.types"}],
+            "templates": [
+                {"path": "./readme.md", "merge": True},
+                {"path": "./type.j2", "mergeFrom": {"items": "types", "output": "./{{ item.name }}.txt"}},
+                {"path": "./title.j2", "merge": True, "output": "./title.txt"},
+            ],
+        }))
+        (self.repo / "readme.md").write_text("{{ specifications.product.name }}")
+        (self.repo / "type.j2").write_text("{{ item.name }}={{ item.content }}")
+        (self.repo / "title.j2").write_text("{{ specifications.product.name }} title")
+        (self.specs / "product.yaml").write_text("name: Widget\n")
+        (self.specs / "types.yaml").write_text("a: one\nb: two\n")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _merge(self):
+        processor = Processor(str(self.specs), str(self.repo), incremental=True)
+        processor.read_environment()
+        processor.add_context()
+        processor.verify_exists()
+        with self.assertLogs("main", level="DEBUG") as logs:
+            processor.process_templates()
+        return [line for line in logs.output if "Building" in line or "Skipping" in line]
+
+    def test_rerun_skips_unchanged_outputs(self):
+        """Test that a second incremental run renders nothing when inputs are unchanged."""
+        self._merge()
+        self.assertEqual("Widget", (self.repo / "readme.md").read_text())
+        self.assertEqual("a=one", (self.repo / "a.txt").read_text())
+        self.assertTrue((self.repo / ".stage0_template" / "manifest.json").exists())
+        self.assertTrue((self.repo / "type.j2").exists())
+
+        lines = self._merge()
+        self.assertTrue(lines)
+        self.assertFalse([line for line in lines if "Building" in line])
+
+    def test_only_changed_items_are_rendered(self):
+        """Test that changing one item re-renders only that item's output."""
+        self._merge()
+        (self.specs / "types.yaml").write_text("a: one\nb: changed\n")
+        lines = self._merge()
+        built = [line for line in lines if "Building" in line]
+        self.assertEqual(1, len(built))
+        self.assertIn("b.txt", built[0])
+        self.assertEqual("b=changed", (self.repo / "b.txt").read_text())
+
+    def test_in_place_merge_renders_from_saved_source(self):
+        """Test that an in-place merge re-renders from its original source after a change."""
+        self._merge()
+        (self.specs / "product.yaml").write_text("name: Gadget\n")
+        self._merge()
+        self.assertEqual("Gadget", (self.repo / "readme.md").read_text())
+        self.assertEqual("Gadget title", (self.repo / "title.txt").read_text())
+
+    def test_disappeared_items_are_removed(self):
+        """Test that outputs for items no longer present are deleted."""
+        self._merge()
+        (self.specs / "types.yaml").write_text("a: one\n")
+        self._merge()
+        self.assertTrue((self.repo / "a.txt").exists())
+        self.assertFalse((self.repo / "b.txt").exists())
+
+    def test_stale_outputs_outside_repo_are_kept(self):
+        """Test that manifest entries resolving outside the repo are never removed."""
+        self._merge()
+        outside = Path(self.tmpdir.name) / "outside.txt"
+        outside.write_text("keep")
+        manifest_path = self.repo / ".stage0_template" / "manifest.json"
+        data = json.loads(manifest_path.read_text())
+        data["outputs"]["../outside.txt"] = data["outputs"]["a.txt"]
+        data["outputs"][str(outside)] = data["outputs"]["a.txt"]
+        manifest_path.write_text(json.dumps(data))
+        processor = Processor(str(self.specs), str(self.repo), incremental=True)
+        with self.assertLogs("main", level="WARNING") as logs:
+            processor.run()
+        self.assertEqual("keep", outside.read_text())
+        self.assertEqual(2, len([line for line in logs.output if "Not removing stale output" in line]))
+
+    def test_manifest_records_outputs(self):
+        """Test the manifest entries written for each output."""
+        self._merge()
+        manifest = MergeManifest(str(self.repo / ".stage0_template" / "manifest.json"))
+        self.assertEqual(
+            {"a.txt", "b.txt", "readme.md", "title.txt"}, set(manifest.previous.keys())
+        )
+        entry = manifest.previous["a.txt"]
+        self.assertEqual("./type.j2", entry["template"])
+        self.assertEqual("./{{ item.name }}.txt", entry["output"])
+        self.assertEqual("a", entry["item"])
+
+    def test_fingerprint_is_stable(self):
+        """Test that fingerprints depend only on content."""
+        self.assertEqual(fingerprint({"a": [1, 2]}), fingerprint({"a": [1, 2]}))
+        self.assertNotEqual(fingerprint({"a": [1, 2]}), fingerprint({"a": [2, 1]}))
+        releases = {datetime.date(2024, 1, 1): "release"}
+        self.assertEqual(fingerprint([releases]), fingerprint([{datetime.date(2024, 1, 1): "release"}]))
+        self.assertNotEqual(fingerprint(releases), fingerprint({datetime.date(2024, 1, 2): "release"}))
+
+    def test_date_keys_merge_incrementally(self):
+        """Test that specifications with YAML date keys can be fingerprinted by an incremental merge."""
+        (self.specs / "product.yaml").write_text("name: Widget\nreleases: {2024-01-01: release}\n")
+        (self.repo / "readme.md").write_text("{{ specifications.product | to_yaml }}")
+        self._merge()
+        self.assertIn("2024-01-01: release", (self.repo / "readme.md").read_text())
+        lines = self._merge()
+        self.assertFalse([line for line in lines if "Building" in line and "readme.md" in line])
+
+
+if __name__ == "__main__":
+    unittest.main()
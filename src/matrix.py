@@ -0,0 +1,152 @@
+import logging
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import yaml
+
+from main import Processor
+from rendering import TemplateCache
+from report import RunReport
+from spec_loader import YamlLoader, format_yaml_error
+
+logger = logging.getLogger(__name__)
+
+
+class MatrixEntry(NamedTuple):
+    environment: Dict[str, str]
+    output: str
+
+
+class MatrixResult(NamedTuple):
+    output: str
+    error: Optional[str]
+    report: RunReport
+
+
+def load_matrix(matrix_file: str) -> List[MatrixEntry]:
+    """
+    Load a YAML or JSON list of matrix entries, each with an `environment`
+    mapping and an `output` folder. Relative outputs are resolved against the
+    matrix file's folder.
+    """
+    try:
+        with open(matrix_file, "r") as file:
+            data = yaml.load(file, Loader=YamlLoader)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Matrix file not found: {matrix_file}")
+    except yaml.YAMLError as e:
+        raise ValueError(format_yaml_error(e, matrix_file)) from e
+
+    if not isinstance(data, list):
+        raise ValueError(f"Matrix file {matrix_file} must contain a list of entries")
+    base = os.path.dirname(os.path.abspath(matrix_file))
+    entries = []
+    for index, entry in enumerate(data):
+        if not isinstance(entry, dict) or "output" not in entry:
+            raise ValueError(f"Matrix entry {index} in {matrix_file} must be a mapping with an 'output' folder")
+        environment = entry.get("environment") or {}
+        if not isinstance(environment, dict):
+            raise ValueError(f"Matrix entry {index} in {matrix_file}: environment must be a mapping")
+        output = os.path.join(base, entry["output"])
+        entries.append(MatrixEntry({str(k): str(v) for k, v in environment.items()}, os.path.normpath(output)))
+    return entries
+
+
+def run_entry(
+    specifications_folder: str,
+    repo_folder: str,
+    entry: MatrixEntry,
+    specifications: Any,
+    template_cache: TemplateCache,
+    options: Dict[str, Any],
+) -> MatrixResult:
+    """Copy the template repo to the entry's output folder and merge it there."""
+    logger.info(f"Matrix entry {entry.output}: {entry.environment}")
+    report = RunReport()
+    try:
+        shutil.copytree(repo_folder, entry.output, dirs_exist_ok=True)
+        processor = Processor(
+            specifications_folder,
+            entry.output,
+            specifications=specifications,
+            template_cache=template_cache,
+            report=report,
+            **options,
+        )
+        processor.run(entry.environment)
+    except Exception as e:
+        logger.error(f"Matrix entry {entry.output} failed: {e}")
+        return MatrixResult(entry.output, str(e), report)
+    return MatrixResult(entry.output, None, report)
+
+
+# Per-process state for matrix workers, set once by _init_matrix_worker
+_worker: Dict[str, Any] = {}
+
+
+def _init_matrix_worker(specifications_folder: str, repo_folder: str, specifications: Any, options: Dict[str, Any]) -> None:
+    _worker.update(
+        specifications_folder=specifications_folder,
+        repo_folder=repo_folder,
+        specifications=specifications,
+        template_cache=TemplateCache(),
+        options=options,
+    )
+
+
+def _run_in_worker(entry: MatrixEntry) -> MatrixResult:
+    return run_entry(
+        _worker["specifications_folder"],
+        _worker["repo_folder"],
+        entry,
+        _worker["specifications"],
+        _worker["template_cache"],
+        _worker["options"],
+    )
+
+
+def run_matrix(
+    specifications_folder: str,
+    repo_folder: str,
+    entries: List[MatrixEntry],
+    workers: int = 1,
+    report: Optional[RunReport] = None,
+    **options: Any,
+) -> List[MatrixResult]:
+    """
+    Merge one template repo for many environments. Specifications are loaded
+    once and templates compiled once (per worker when workers > 1); each entry
+    runs the full pipeline on its own copy of the repo. Each entry reports to
+    its own RunReport, added to report when the entry is done. Outputs must
+    be outside repo_folder, since each entry copies the whole repo.
+    """
+    repo = os.path.realpath(repo_folder)
+    inside = [entry.output for entry in entries if os.path.commonpath([repo, os.path.realpath(entry.output)]) == repo]
+    if inside:
+        raise ValueError(f"Matrix outputs {inside} must be outside the repo folder {repo_folder}")
+    report = report if report is not None else RunReport()
+    base = Processor(specifications_folder, repo_folder, report=report, **options)
+    specifications = base.context_data["specifications"]
+
+    if workers > 1 and len(entries) > 1:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(entries)),
+            initializer=_init_matrix_worker,
+            initargs=(specifications_folder, repo_folder, specifications, options),
+        ) as executor:
+            results = list(executor.map(_run_in_worker, entries))
+    else:
+        results = [
+            run_entry(specifications_folder, repo_folder, entry, specifications, base.template_cache, options)
+            for entry in entries
+        ]
+
+    for result in results:
+        report.merge(result.report)
+    failed = [result for result in results if result.error]
+    report.count("entries_merged", len(results) - len(failed))
+    report.count("entries_failed", len(failed))
+    logger.info(f"Matrix completed - {len(results) - len(failed)} of {len(results)} entries merged")
+    return results
@@ -0,0 +1,88 @@
+import filecmp
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from matrix import load_matrix, run_matrix
+from report import RunReport
+
+
+class TestMatrix(unittest.TestCase):
+    TEST_SPECIFICATIONS = "./test/repo/.stage0_template/test_data"
+    TEST_REPO = "./test/repo"
+    TEST_EXPECTED = "./test/repo/.stage0_template/test_expected"
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.matrix_file = Path(self.tmpdir.name) / "matrix.yaml"
+        self.matrix_file.write_text(
+            "- environment: {SERVICE_NAME: user, DATA_SOURCE: organization}\n"
+            "  output: ./user\n"
+            "- environment: {SERVICE_NAME: missing, DATA_SOURCE: organization}\n"
+            "  output: ./missing\n"
+            "- environment: {SERVICE_NAME: user, DATA_SOURCE: work-order}\n"
+            "  output: ./work-order\n"
+        )
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _check(self, results, report):
+        self.assertEqual([None, None], [results[0].error, results[2].error])
+        self.assertIn("missing", results[1].error)
+        names = sorted(os.listdir(self.TEST_EXPECTED))
+        _, mismatch, errors = filecmp.cmpfiles(
+            self.TEST_EXPECTED, os.path.join(self.tmpdir.name, "user"), names, shallow=False
+        )
+        self.assertEqual([], mismatch + errors)
+        self.assertTrue(os.path.exists(os.path.join(self.tmpdir.name, "work-order", "userService.ts")))
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir.name, "user", ".stage0_template")))
+        # Each entry reports on its own and the run report adds them up
+        self.assertEqual(13, results[0].report.counters["files_written"])
+        self.assertEqual(
+            sum(result.report.counters.get("files_written", 0) for result in results),
+            report.counters["files_written"],
+        )
+        self.assertEqual(sum(len(result.report.templates) for result in results), len(report.templates))
+        self.assertEqual(2, report.counters["entries_merged"])
+        self.assertEqual(1, report.counters["entries_failed"])
+
+    def test_load_matrix_resolves_outputs(self):
+        """Test that matrix outputs are resolved against the matrix file folder."""
+        entries = load_matrix(str(self.matrix_file))
+        self.assertEqual(3, len(entries))
+        self.assertEqual({"SERVICE_NAME": "user", "DATA_SOURCE": "organization"}, entries[0].environment)
+        self.assertEqual(os.path.join(self.tmpdir.name, "user"), entries[0].output)
+
+    def test_outputs_inside_repo_are_rejected(self):
+        """Test that an output inside the repo is refused before any entry copies the repo into itself."""
+        repo = os.path.join(self.tmpdir.name, "repo")
+        shutil.copytree(self.TEST_REPO, repo)
+        matrix_file = Path(repo, "matrix.yaml")
+        matrix_file.write_text("- output: ./out/user\n- output: ./out/search\n")
+        with self.assertRaises(ValueError) as ctx:
+            run_matrix(self.TEST_SPECIFICATIONS, repo, load_matrix(str(matrix_file)))
+        self.assertIn("must be outside the repo folder", str(ctx.exception))
+        self.assertFalse(os.path.exists(os.path.join(repo, "out")))
+
+    def test_run_matrix_reports_each_entry(self):
+        """Test that every entry is merged and failures do not stop other entries."""
+        report = RunReport()
+        results = run_matrix(
+            self.TEST_SPECIFICATIONS, self.TEST_REPO, load_matrix(str(self.matrix_file)), report=report
+        )
+        self._check(results, report)
+
+    def test_run_matrix_in_parallel(self):
+        """Test that entries can run in worker processes and their reports come back."""
+        report = RunReport()
+        results = run_matrix(
+            self.TEST_SPECIFICATIONS, self.TEST_REPO, load_matrix(str(self.matrix_file)), workers=2, report=report
+        )
+        self._check(results, report)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import hashlib
+import json
+import logging
+import os
+import sys
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from writer import file_digest
+
+logger = logging.getLogger(__name__)
+
+
+class PlannedOutput(NamedTuple):
+    """
+    One file a merge would produce. status is "new", "changed" or
+    "unchanged" when the output was rendered, and "new" or "exists" when it
+    was only located.
+    """
+    template: str
+    output: str
+    item: Any
+    status: str
+    size: Optional[int] = None
+    digest: Optional[str] = None
+
+
+def content_digest(text: str) -> str:
+    """sha256 of rendered text, comparable with writer.file_digest of the written file."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def output_status(output_path: str, digest: Optional[str]) -> str:
+    """Compare a planned output with the file currently at output_path."""
+    if not os.path.exists(output_path):
+        return "new"
+    if digest is None:
+        return "exists"
+    try:
+        return "unchanged" if file_digest(output_path) == digest else "changed"
+    except OSError:
+        return "changed"
+
+
+def plan_summary(outputs: List[PlannedOutput]) -> Dict[str, int]:
+    """Count planned outputs by status."""
+    counts: Dict[str, int] = {}
+    for output in outputs:
+        counts[output.status] = counts.get(output.status, 0) + 1
+    return counts
+
+
+def write_plan(outputs: List[PlannedOutput], destination: str) -> None:
+    """Write a plan as JSON to a file, or to stdout when destination is '-'."""
+    plan = {
+        "outputs": [output._asdict() for output in outputs],
+        "summary": plan_summary(outputs),
+    }
+    text = json.dumps(plan, indent=2, default=str)
+    if destination == "-":
+        sys.stdout.write(text + "\n")
+        return
+    with open(destination, "w") as file:
+        file.write(text + "\n")
+    logger.info(f"Merge plan written to {destination}")
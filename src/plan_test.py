@@ -0,0 +1,84 @@
+import json
+import os
+import tempfile
+import unittest
+
+from main import Processor
+from plan import PlannedOutput, content_digest, output_status, plan_summary, write_plan
+from writer import file_digest
+
+
+def _snapshot(folder):
+    return {
+        os.path.join(root, name): os.stat(os.path.join(root, name)).st_mtime_ns
+        for root, _, names in os.walk(folder)
+        for name in names
+    }
+
+
+class TestPlan(unittest.TestCase):
+    TEST_SPECIFICATIONS = "./test/repo/.stage0_template/test_data"
+    TEST_REPO = "./test/repo"
+    TEST_EXPECTED = "./test/repo/.stage0_template/test_expected"
+
+    def setUp(self):
+        os.environ["SERVICE_NAME"] = "user"
+        os.environ["DATA_SOURCE"] = "organization"
+
+    def tearDown(self):
+        del os.environ["SERVICE_NAME"]
+        del os.environ["DATA_SOURCE"]
+
+    def test_plan_matches_merge_output_without_touching_repo(self):
+        """Test that a plan lists every merge output with the expected hash and leaves the repo unchanged."""
+        before = _snapshot(self.TEST_REPO)
+        outputs = Processor(self.TEST_SPECIFICATIONS, self.TEST_REPO).plan()
+        self.assertEqual(before, _snapshot(self.TEST_REPO))
+
+        self.assertEqual(sorted(os.listdir(self.TEST_EXPECTED)), sorted(output.output for output in outputs))
+        for output in outputs:
+            expected = os.path.join(self.TEST_EXPECTED, output.output)
+            self.assertEqual(file_digest(expected), output.digest, output.output)
+            self.assertEqual(os.path.getsize(expected), output.size)
+        statuses = {output.output: output.status for output in outputs}
+        self.assertEqual("changed", statuses["README.md"])
+        self.assertEqual("new", statuses["userService.ts"])
+
+    def test_plan_without_render_only_locates_outputs(self):
+        """Test that render=False lists outputs without sizes or hashes."""
+        outputs = Processor(self.TEST_SPECIFICATIONS, self.TEST_REPO).plan(render=False)
+        self.assertEqual(13, len(outputs))
+        self.assertTrue(all(output.digest is None and output.size is None for output in outputs))
+        self.assertEqual({"exists": 3, "new": 10}, plan_summary(outputs))
+
+    def test_plan_writes_scratch_folder(self):
+        """Test that rendered outputs are written below the scratch folder."""
+        with tempfile.TemporaryDirectory() as scratch:
+            Processor(self.TEST_SPECIFICATIONS, self.TEST_REPO).plan(scratch_folder=scratch)
+            for name in os.listdir(self.TEST_EXPECTED):
+                with open(os.path.join(self.TEST_EXPECTED, name)) as expected:
+                    with open(os.path.join(scratch, name)) as actual:
+                        self.assertEqual(expected.read(), actual.read(), name)
+
+    def test_output_status_and_write_plan(self):
+        """Test status against an existing file and the JSON plan format."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "out.txt")
+            self.assertEqual("new", output_status(path, content_digest("a")))
+            with open(path, "w") as file:
+                file.write("a")
+            self.assertEqual("unchanged", output_status(path, content_digest("a")))
+            self.assertEqual("changed", output_status(path, content_digest("b")))
+            self.assertEqual("exists", output_status(path, None))
+
+            destination = os.path.join(tmpdir, "plan.json")
+            write_plan([PlannedOutput("t.j2", "out.txt", "a", "unchanged", 1, content_digest("a"))], destination)
+            with open(destination) as file:
+                plan = json.load(file)
+            self.assertEqual({"unchanged": 1}, plan["summary"])
+            self.assertEqual("out.txt", plan["outputs"][0]["output"])
+            self.assertEqual(1, plan["outputs"][0]["size"])
+
+
+if __name__ == "__main__":
+    unittest.main()
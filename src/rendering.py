@@ -0,0 +1,341 @@
+import hashlib
+import json
+import logging
+from collections import ChainMap, OrderedDict
+from collections.abc import Mapping
+from types import CodeType
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import yaml
+from jinja2 import Environment, Template, TemplateSyntaxError, Undefined, UndefinedError
+
+from limits import RenderBudget
+from spec_loader import LazySpecifications, materialize
+from spec_store import StoreList, StoreMapping
+
+logger = logging.getLogger(__name__)
+
+
+def indent_filter(s, n=2):
+    if not s:
+        return ''
+    lines = s.splitlines()
+    result = '\n'.join((' ' * n + line if line.strip() else '') for line in lines)
+    return result
+
+
+# libyaml's emitter when PyYAML was built with it
+YamlDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+# Lazy nodes and store views nested in plain data dump like the dicts and lists they stand for
+for _dumper in {yaml.Dumper, yaml.SafeDumper, YamlDumper}:
+    _dumper.add_representer(LazySpecifications, lambda dumper, node: dumper.represent_dict(node))
+    _dumper.add_representer(StoreMapping, lambda dumper, view: dumper.represent_dict(view))
+    _dumper.add_representer(StoreList, lambda dumper, view: dumper.represent_list(view))
+
+
+def _emits_identically(value: Any) -> bool:
+    """
+    True when libyaml emits value exactly like PyYAML's Python emitter: a
+    dict or list of plain scalars whose strings are printable ASCII on one
+    line and whose keys are short. libyaml folds long double-quoted scalars
+    and picks complex keys differently, so anything else takes the Python path.
+    """
+    if not isinstance(value, (dict, list)):
+        return False
+    stack = [value]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            for key, child in node.items():
+                if isinstance(key, str):
+                    if not (0 < len(key) <= 100 and key.isascii() and key.isprintable()):
+                        return False
+                elif not (key is None or isinstance(key, int)):
+                    return False
+                stack.append(child)
+        elif isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, str):
+            if not (node.isascii() and node.isprintable()):
+                return False
+        elif not (node is None or isinstance(node, (int, float))):
+            return False
+    return True
+
+
+def dump_yaml(value: Any) -> str:
+    """
+    yaml.dump(value, default_flow_style=False) without the trailing newline.
+    Values libyaml emits identically go through the C safe dumper when PyYAML
+    has one; everything else through the Python dumper, as before.
+    """
+    value = materialize(value)
+    if YamlDumper is not yaml.SafeDumper and _emits_identically(value):
+        text = yaml.dump(value, Dumper=YamlDumper, default_flow_style=False)
+    else:
+        text = yaml.dump(value, default_flow_style=False)
+    return text.rstrip()
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (LazySpecifications, StoreMapping, StoreList)):
+        return materialize(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dump_json(value: Any) -> str:
+    return json.dumps(materialize(value), indent=2, sort_keys=True, default=_json_default)
+
+
+def dump_json_minified(value: Any) -> str:
+    return json.dumps(materialize(value), separators=(',', ':'), default=_json_default)
+
+
+class SerializerCache:
+    """
+    Output of the to_yaml / to_json filters for a run, keyed by filter and
+    the identity of the dict or list serialized. mergeFrom templates dump the
+    same specification sub-trees for every item, and specifications are not
+    modified during a run, so each sub-tree is serialized once per filter.
+    The memo keeps the max_entries most recently used outputs, so values
+    dumped once (such as each item of a mergeFrom) do not pile up, and the
+    Processor clears it at the start of each run.
+    """
+
+    def __init__(self, max_entries: int = 256) -> None:
+        # (filter, id(value)) -> (value, text); holding value keeps its id from being reused
+        self._memo: "OrderedDict[Tuple[str, int], Tuple[Any, str]]" = OrderedDict()
+        self.max_entries = max_entries
+        self.hits = 0
+
+    def clear(self) -> None:
+        """Forget all memoized output, for when values may have been replaced."""
+        self._memo.clear()
+
+    def filter(self, name: str, dump: Callable[[Any], str]) -> Callable[[Any], str]:
+        """Wrap dump as a memoized filter."""
+        def serialize(value: Any) -> str:
+            if not isinstance(value, (Mapping, list, StoreList)):
+                return dump(value)
+            key = (name, id(value))
+            entry = self._memo.get(key)
+            if entry is not None and entry[0] is value:
+                self.hits += 1
+                self._memo.move_to_end(key)
+                return entry[1]
+            text = dump(value)
+            self._memo[key] = (value, text)
+            self._memo.move_to_end(key)
+            if len(self._memo) > self.max_entries:
+                self._memo.popitem(last=False)
+            return text
+        return serialize
+
+
+class SpecificationUndefined(Undefined):
+    """
+    Undefined that names lazy specification nodes and store views as the
+    dicts and lists they stand in for, so a missing key reads "'dict object'
+    has no attribute ..." however specifications are loaded.
+    """
+
+    __slots__ = ()
+
+    @property
+    def _undefined_message(self) -> str:
+        if isinstance(self._undefined_obj, (LazySpecifications, StoreMapping)):
+            return Undefined(self._undefined_hint, {}, self._undefined_name)._undefined_message
+        if isinstance(self._undefined_obj, StoreList):
+            return Undefined(self._undefined_hint, [], self._undefined_name)._undefined_message
+        return super()._undefined_message
+
+
+def create_environment(serializers: Optional[SerializerCache] = None) -> Environment:
+    """Build the Jinja environment used for templates, with the custom filters installed."""
+    serializers = serializers if serializers is not None else SerializerCache()
+    env = Environment(undefined=SpecificationUndefined)
+    # Jinja's own tojson filter, for store views
+    env.policies["json.dumps_kwargs"] = {"sort_keys": True, "default": _json_default}
+    env.filters['to_yaml'] = serializers.filter('to_yaml', dump_yaml)
+    env.filters['to_json'] = serializers.filter('to_json', dump_json)
+    env.filters['to_json_minified'] = serializers.filter('to_json_minified', dump_json_minified)
+    env.filters['indent'] = indent_filter
+    return env
+
+
+def source_digest(source: str) -> str:
+    """Key of a template source in a template bundle."""
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+class TemplateCache:
+    """
+    Compiled templates for a run, keyed by source text.
+
+    Templates are compiled in an environment with the custom filters. Patterns
+    (output file names and context paths) are compiled in a plain environment,
+    exactly as jinja2.Template would, so identical patterns compile only once.
+    """
+
+    def __init__(self) -> None:
+        self.serializers = SerializerCache()
+        self.env = create_environment(self.serializers)
+        self.pattern_env = Environment(undefined=SpecificationUndefined)
+        self._templates: Dict[str, Template] = {}
+        self._patterns: Dict[str, Template] = {}
+        # Precompiled template code by source digest, from a template bundle
+        self._bundle: Dict[str, CodeType] = {}
+        self.compiled = 0
+        self.bundled = 0
+
+    def use_bundle(self, codes: Dict[str, CodeType]) -> None:
+        """Add precompiled template code, keyed by source_digest of each template's source."""
+        self._bundle.update(codes)
+
+    def template(self, source: str) -> Template:
+        """Return the compiled template for source, from the bundle when it holds that source."""
+        template = self._templates.get(source)
+        if template is None:
+            code = self._bundle.get(source_digest(source)) if self._bundle else None
+            if code is not None:
+                template = self.env.template_class.from_code(self.env, code, self.env.make_globals(None))
+                self.bundled += 1
+            else:
+                template = self.env.from_string(source)
+                self.compiled += 1
+            self._templates[source] = template
+        return template
+
+    def pattern(self, source: str) -> Template:
+        """Return the compiled output-name or path pattern for source."""
+        template = self._patterns.get(source)
+        if template is None:
+            template = self._patterns[source] = self.pattern_env.from_string(source)
+            self.compiled += 1
+        return template
+
+
+def item_label(item: Any) -> Any:
+    """Name used for an item in error messages."""
+    return item.get("name", item) if isinstance(item, Mapping) else item
+
+
+def item_context(context_data: Mapping[str, Any], item: Any, spread_item: bool) -> ChainMap:
+    """
+    Build the render context for a mergeFor/mergeFrom item as layers over
+    context_data, without copying it. `item` comes first, then the item's keys
+    as top-level variables when spread_item is set and the item is a dict
+    (mergeFor), then context_data.
+    """
+    if spread_item and isinstance(item, Mapping):
+        return ChainMap({"item": item}, item, context_data)
+    return ChainMap({"item": item}, context_data)
+
+
+def generate(template: Template, context: Mapping[str, Any]) -> Iterator[str]:
+    """
+    template.generate(context), but Jinja's context is layered over the mapping
+    and the template globals instead of copying both into a new dict, so
+    variables resolve with the same precedence at no per-render cost.
+    """
+    ctx = template.new_context(ChainMap(context, template.globals), shared=True)
+    try:
+        yield from template.root_render_func(ctx)
+    except Exception:
+        yield template.environment.handle_exception()
+
+
+def render(template: Template, context: Mapping[str, Any]) -> str:
+    """template.render(context) with the context layered as in generate()."""
+    return template.environment.concat(generate(template, context))
+
+
+def render_item(
+    template: Template, template_name: str, context_data: Mapping[str, Any], item: Any, spread_item: bool
+) -> str:
+    """Render a template for one item, naming the template and item on failure."""
+    try:
+        return render(template, item_context(context_data, item, spread_item))
+    except (UndefinedError, TemplateSyntaxError) as e:
+        raise ValueError(
+            f"Template {template_name} (item={item_label(item)}): render failed - {e}"
+        ) from e
+
+
+def stream_item(
+    template: Template, template_name: str, context_data: Mapping[str, Any], item: Any, spread_item: bool
+) -> Iterator[str]:
+    """Like render_item, but yield the output in chunks as Jinja produces it."""
+    try:
+        yield from generate(template, item_context(context_data, item, spread_item))
+    except (UndefinedError, TemplateSyntaxError) as e:
+        raise ValueError(
+            f"Template {template_name} (item={item_label(item)}): render failed - {e}"
+        ) from e
+
+
+def stream_template(template: Template, template_name: str, context: Mapping[str, Any]) -> Iterator[str]:
+    """Yield a merge template's output in chunks, naming the template on failure."""
+    try:
+        yield from generate(template, context)
+    except (UndefinedError, TemplateSyntaxError) as e:
+        raise ValueError(f"Template {template_name}: render failed - {e}") from e
+
+
+# Per-process state for render workers, set once by _init_render_worker
+_worker: Dict[str, Any] = {}
+
+
+def _init_render_worker(
+    template_name: str, source: str, context_data: Dict[str, Any], budget: Optional[RenderBudget]
+) -> None:
+    _worker["template_name"] = template_name
+    _worker["template"] = TemplateCache().template(source)
+    _worker["context_data"] = context_data
+    _worker["budget"] = budget
+
+
+def _render_in_worker(task: Any) -> str:
+    item, spread_item = task
+    budget = _worker["budget"]
+    if budget is None:
+        return render_item(
+            _worker["template"], _worker["template_name"], _worker["context_data"], item, spread_item
+        )
+    chunks = stream_item(_worker["template"], _worker["template_name"], _worker["context_data"], item, spread_item)
+    return "".join(budget.guard(chunks, _worker["template_name"], item_label(item)))
+
+
+def render_items_parallel(
+    template_name: str,
+    source: str,
+    context_data: Dict[str, Any],
+    items: List[Any],
+    spread_item: bool,
+    workers: int,
+    budget: Optional[RenderBudget] = None,
+) -> Iterator[str]:
+    """
+    Render items across a process pool, yielding outputs in item order.
+    Each worker compiles the template and receives the context once; the
+    first failing item (in item order) raises its render error. With a
+    budget, each worker stops an output at the budget's output size and
+    deadline rather than rendering it whole.
+    """
+    # multiprocessing is slow to import and most merges never start a pool
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = min(workers, len(items))
+    chunksize = max(1, len(items) // (workers * 4))
+    logger.debug(f"Rendering {len(items)} items of {template_name} with {workers} workers")
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_render_worker,
+        initargs=(template_name, source, context_data, budget),
+    )
+    try:
+        tasks = [(item, spread_item) for item in items]
+        yield from executor.map(_render_in_worker, tasks, chunksize=chunksize)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,148 @@
+import datetime
+import filecmp
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch, mock_open
+
+from main import Processor
+import yaml
+
+from rendering import TemplateCache, dump_yaml, render_item, render_items_parallel, stream_item
+from spec_loader import load_yaml_file
+
+
+class TestTemplateCache(unittest.TestCase):
+    TEST_SPECIFICATIONS = "./test/repo/.stage0_template/test_data"
+    TEST_REPO = "./test/repo"
+
+    def test_environment_has_custom_filters(self):
+        """Test that the shared environment installs the custom filters once."""
+        cache = TemplateCache()
+        for name in ("to_yaml", "to_json", "to_json_minified", "indent"):
+            self.assertIn(name, cache.env.filters)
+        result = cache.template("{{ data | to_json_minified }}").render(data={"a": 1})
+        self.assertEqual('{"a":1}', result)
+
+    def test_identical_sources_compile_once(self):
+        """Test that templates and patterns are cached by source text."""
+        cache = TemplateCache()
+        self.assertIs(cache.template("{{ a }}"), cache.template("{{ a }}"))
+        self.assertIs(cache.pattern("./{{ name }}.md"), cache.pattern("./{{ name }}.md"))
+        self.assertEqual(2, cache.compiled)
+
+    def test_pattern_renders_like_plain_template(self):
+        """Test that output patterns do not see the template-only filters."""
+        cache = TemplateCache()
+        self.assertEqual("  x", cache.pattern("{{ 'x' | indent(2, true) }}").render())
+
+    def test_process_templates_compiles_patterns_once(self):
+        """Test that a mergeFrom output pattern is compiled once for all items."""
+        processor = Processor(self.TEST_SPECIFICATIONS, self.TEST_REPO)
+        processor.templates = [t for t in processor.templates if "mergeFrom" in t]
+        with patch("builtins.open", mock_open(read_data="{{ item.name }}")), \
+                patch("os.remove"), patch("os.replace"), patch("shutil.rmtree"):
+            processor.process_templates()
+        # One template source and two output patterns, shared by every item
+        self.assertEqual(3, processor.template_cache.compiled)
+
+    def test_serializer_filters_are_memoized(self):
+        """Test that dumping the same sub-tree again reuses the earlier output."""
+        cache = TemplateCache()
+        types = {"word": {"type": "string"}, "count": {"type": "integer"}}
+        template = cache.template("{{ types | to_yaml }}|{{ types | to_json }}|{{ item }}")
+        first = template.render(types=types, item="a")
+        self.assertEqual(0, cache.serializers.hits)
+        second = template.render(types=types, item="b")
+        self.assertEqual(2, cache.serializers.hits)
+        self.assertEqual(first[:-1], second[:-1])
+        changed = {**types, "word": {"type": "text"}}
+        self.assertIn("type: text", template.render(types=changed, item="c"))
+
+    def test_serializer_memo_is_bounded_and_cleared_by_run(self):
+        """Test that values dumped once do not pile up in the memo and each run starts empty."""
+        cache = TemplateCache()
+        cache.serializers.max_entries = 10
+        shared = {"types": [1, 2, 3]}
+        template = cache.template("{{ shared | to_json }}{{ item | to_json }}")
+        for index in range(100):
+            template.render(shared=shared, item={"name": index})
+        self.assertEqual(10, len(cache.serializers._memo))
+        self.assertEqual(99, cache.serializers.hits)
+        processor = Processor(self.TEST_SPECIFICATIONS, self.TEST_REPO, template_cache=cache)
+        with patch.object(processor, "read_environment", side_effect=RuntimeError("stop")):
+            with self.assertRaises(RuntimeError):
+                processor.run()
+        self.assertEqual(0, len(cache.serializers._memo))
+
+    def test_dump_yaml_matches_yaml_dump(self):
+        """Test that to_yaml output is byte-identical to yaml.dump on either dumper path."""
+        folder = os.path.join(self.TEST_SPECIFICATIONS, "dd.types")
+        values = [load_yaml_file(os.path.join(folder, name)) for name in sorted(os.listdir(folder))]
+        values += [
+            load_yaml_file(os.path.join(self.TEST_SPECIFICATIONS, "dataDictionary.yaml")),
+            {"unicode": "caf\u00e9 " * 20, "lines": "one\ntwo " * 30, "tuple": (1, 2)},
+            {"k" * 150: 1, "when": datetime.date(2024, 1, 2)},
+            ["x"],
+            "scalar",
+        ]
+        for value in values:
+            self.assertEqual(yaml.dump(value, default_flow_style=False).rstrip(), dump_yaml(value))
+
+    def test_item_context_precedence_without_copying(self):
+        """Test that item layers override context and globals, and context_data is never iterated."""
+        class LookupOnly(dict):
+            def __iter__(self):
+                raise AssertionError("context_data was copied")
+
+            def keys(self):
+                raise AssertionError("context_data was copied")
+
+        cache = TemplateCache()
+        cache.env.globals["name"] = "global"
+        cache.env.globals["shared"] = "global"
+        context = LookupOnly(name="context", other="context")
+        template = cache.template("{{ name }} {{ other }} {{ shared }} {{ item.name }} {{ item is mapping }}")
+        item = {"name": "spread", "item": "own"}
+        self.assertEqual("spread context global spread True", render_item(template, "t", context, item, True))
+        streamed = "".join(stream_item(template, "t", context, item, False))
+        self.assertEqual("context context global spread True", streamed)
+        self.assertEqual("context context global  False", render_item(template, "t", context, "plain", True))
+
+    def test_parallel_merge_matches_sequential(self):
+        """Test that MERGE_WORKERS output is byte-identical to a sequential merge."""
+        os.environ["SERVICE_NAME"] = "user"
+        os.environ["DATA_SOURCE"] = "organization"
+        try:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                folders = []
+                for name, workers in (("sequential", 1), ("parallel", 3)):
+                    repo = os.path.join(tmpdir, name)
+                    shutil.copytree(self.TEST_REPO, repo)
+                    processor = Processor(self.TEST_SPECIFICATIONS, repo, merge_workers=workers)
+                    processor.read_environment()
+                    processor.add_context()
+                    processor.verify_exists()
+                    processor.process_templates()
+                    folders.append(repo)
+                names = sorted(os.listdir(folders[0]))
+                _, mismatch, errors = filecmp.cmpfiles(folders[0], folders[1], names, shallow=False)
+                self.assertEqual([], mismatch)
+                self.assertEqual([], errors)
+        finally:
+            del os.environ["SERVICE_NAME"]
+            del os.environ["DATA_SOURCE"]
+
+    def test_parallel_render_reports_first_failing_item(self):
+        """Test that a worker render error names the template and the first failing item."""
+        items = [{"name": "ok"}, {"name": "bad", "fail": True}, {"name": "worse", "fail": True}]
+        source = "{% if fail %}{{ missing.attribute }}{% endif %}{{ name }}"
+        with self.assertRaises(ValueError) as ctx:
+            list(render_items_parallel("./broken.j2", source, {}, items, True, 2))
+        self.assertIn("./broken.j2", str(ctx.exception))
+        self.assertIn("item=bad", str(ctx.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
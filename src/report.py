@@ -0,0 +1,131 @@
+import functools
+import json
+import logging
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process and its finished children."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+    scale = 1 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) * scale
+
+
+class TemplateReport:
+    """Timings for one template entry in process.yaml."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.compile_seconds = 0.0
+        self.render_seconds = 0.0
+        self.outputs: List[Dict[str, Any]] = []
+
+    def record_output(self, output: str, item: Any, seconds: float, size: int, written: bool) -> None:
+        self.render_seconds += seconds
+        self.outputs.append(
+            {"output": output, "item": item, "seconds": seconds, "bytes": size, "written": written}
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "compile_seconds": self.compile_seconds,
+            "render_seconds": self.render_seconds,
+            "outputs": self.outputs,
+        }
+
+
+class RunReport:
+    """
+    Timings and counters for a merge run: every phase, each specification
+    file parsed, each context directive and each template and output.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.spec_files: Dict[str, float] = {}
+        self.directives: List[Dict[str, Any]] = []
+        self.templates: List[TemplateReport] = []
+        self.counters: Dict[str, int] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a phase; repeated phases accumulate."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def record_directive(self, key: str, directive_type: str, path: str, seconds: float) -> None:
+        self.directives.append({"key": key, "type": directive_type, "path": path, "seconds": seconds})
+
+    def template(self, path: str) -> TemplateReport:
+        """Start reporting on a template entry."""
+        report = TemplateReport(path)
+        self.templates.append(report)
+        return report
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def merge(self, other: "RunReport") -> None:
+        """Add the timings and counters of another run, such as one repo of a batch."""
+        for name, seconds in other.phases.items():
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+        for path, seconds in other.spec_files.items():
+            self.spec_files[path] = self.spec_files.get(path, 0.0) + seconds
+        self.directives.extend(other.directives)
+        self.templates.extend(other.templates)
+        for name, amount in other.counters.items():
+            self.count(name, amount)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(self.started)),
+            "total_seconds": time.perf_counter() - self._start,
+            "peak_rss_bytes": peak_rss_bytes(),
+            "phases": self.phases,
+            "counters": self.counters,
+            "specifications": {
+                "files_parsed": len(self.spec_files),
+                "parse_seconds": sum(self.spec_files.values()),
+                "files": [{"path": path, "seconds": seconds} for path, seconds in self.spec_files.items()],
+            },
+            "context": self.directives,
+            "templates": [template.to_dict() for template in self.templates],
+        }
+
+    def write(self, destination: str) -> None:
+        """Write the report as JSON to a file, or to stderr when destination is '-'."""
+        text = json.dumps(self.to_dict(), indent=2, default=str)
+        if destination == "-":
+            sys.stderr.write(text + "\n")
+            return
+        with open(destination, "w") as file:
+            file.write(text + "\n")
+        logger.info(f"Run report written to {destination}")
+
+
+def timed_phase(name: str) -> Callable:
+    """Decorate a Processor method so its duration is recorded in self.report."""
+    def decorator(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.report.phase(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
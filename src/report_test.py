@@ -0,0 +1,65 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from main import Processor
+from report import RunReport
+
+
+class TestRunReport(unittest.TestCase):
+    TEST_REPO = "./test/repo"
+
+    def setUp(self):
+        os.environ["SERVICE_NAME"] = "user"
+        os.environ["DATA_SOURCE"] = "organization"
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo = os.path.join(self.tmpdir.name, "repo")
+        shutil.copytree(self.TEST_REPO, self.repo)
+        self.report = RunReport()
+        processor = Processor(
+            os.path.join(self.repo, ".stage0_template", "test_data"), self.repo, report=self.report
+        )
+        processor.run()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+        del os.environ["SERVICE_NAME"]
+        del os.environ["DATA_SOURCE"]
+
+    def test_report_covers_every_phase(self):
+        """Test that each pipeline phase, spec file and directive is timed."""
+        data = self.report.to_dict()
+        self.assertEqual(
+            ["load_process", "load_specifications", "read_environment", "add_context",
+             "verify_exists", "process_templates"],
+            list(data["phases"].keys()),
+        )
+        self.assertEqual(16, data["specifications"]["files_parsed"])
+        self.assertEqual(["architecture", "service", "data-source", "productName"],
+                         [directive["key"] for directive in data["context"]])
+
+    def test_report_covers_templates_and_outputs(self):
+        """Test that every template output is recorded with its size."""
+        data = self.report.to_dict()
+        self.assertEqual(6, len(data["templates"]))
+        outputs = [output for template in data["templates"] for output in template["outputs"]]
+        self.assertEqual(13, len(outputs))
+        self.assertEqual(13, data["counters"]["files_written"])
+        self.assertEqual(sum(output["bytes"] for output in outputs), data["counters"]["bytes_written"])
+        source = next(t for t in data["templates"] if t["path"] == "./source.ts")
+        self.assertEqual(["user", "organization"], [output["item"] for output in source["outputs"]])
+
+    def test_write_json_report(self):
+        """Test that the report is written as JSON."""
+        destination = os.path.join(self.tmpdir.name, "report.json")
+        self.report.write(destination)
+        with open(destination) as file:
+            data = json.load(file)
+        self.assertIn("peak_rss_bytes", data)
+        self.assertGreater(data["total_seconds"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
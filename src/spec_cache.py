@@ -0,0 +1,226 @@
+import hashlib
+import logging
+import os
+import pickle
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+from spec_loader import YamlLoader, load_specification_tree, load_yaml_file, load_yaml_files
+
+logger = logging.getLogger(__name__)
+
+# Bump when the cached representation changes so stale entries are ignored.
+CACHE_FORMAT = "1"
+CACHE_MODES = ("use", "bypass", "verify")
+ENTRY_SUFFIX = ".pickle"
+
+
+class SpecificationCache:
+    """
+    On-disk cache of parsed specification documents.
+
+    Entries are pickled documents keyed by a hash of the file content, so a
+    file is only parsed again when its bytes change. Base layers of
+    specification overlays are also kept as whole trees (see load_layer).
+    The folder is kept under max_bytes by evicting the least recently used
+    entries.
+
+    Modes:
+      use    - read and write the cache (default)
+      bypass - ignore the cache entirely
+      verify - parse every file and report cached entries that disagree
+    """
+
+    def __init__(self, folder: str, max_bytes: int = 256 * 1024 * 1024, mode: str = "use") -> None:
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown specifications cache mode '{mode}', expected one of {CACHE_MODES}")
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self.layer_hits = 0
+        self.mismatches: List[str] = []
+        self._salt = f"{CACHE_FORMAT}:{yaml.__version__}:{YamlLoader.__name__}".encode()
+        if mode != "bypass":
+            os.makedirs(folder, exist_ok=True)
+
+    def key(self, content: bytes) -> str:
+        """Cache key for a document's raw content."""
+        return hashlib.sha256(self._salt + b"\0" + content).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.folder, key + ENTRY_SUFFIX)
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Return (hit, document) for a key, refreshing its LRU position on a hit."""
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, "rb") as f:
+                data = pickle.load(f)
+        except FileNotFoundError:
+            return False, None
+        except Exception as e:
+            # A corrupt pickle can fail in almost any way; parsing the document again is always safe
+            logger.warning(f"Discarding unreadable cache entry {entry_path}: {e}")
+            self._discard(entry_path)
+            return False, None
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return True, data
+
+    def put(self, key: str, data: Any) -> None:
+        """Store a parsed document, writing atomically."""
+        entry_path = self._entry_path(key)
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, entry_path)
+        except OSError as e:
+            logger.warning(f"Unable to write cache entry {entry_path}: {e}")
+            self._discard(tmp_path)
+
+    def evict(self) -> int:
+        """Remove least recently used entries until the cache fits max_bytes."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.folder):
+            if not name.endswith(ENTRY_SUFFIX):
+                continue
+            entry_path = os.path.join(self.folder, name)
+            try:
+                stat = os.stat(entry_path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry_path))
+            total += stat.st_size
+        evicted = 0
+        for _, size, entry_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._discard(entry_path)
+            total -= size
+            evicted += 1
+        if evicted:
+            logger.debug(f"Evicted {evicted} specification cache entries")
+        return evicted
+
+    def load_document(self, path: str) -> Any:
+        """Load a single document through the cache, without eviction."""
+        if self.mode == "bypass":
+            return load_yaml_file(path)
+        try:
+            with open(path, "rb") as f:
+                key = self.key(f.read())
+        except IOError as e:
+            raise IOError(f"Error reading specification file {path}: {e}") from e
+        if self.mode == "use":
+            hit, data = self.get(key)
+            if hit:
+                self.hits += 1
+                return data
+        data = load_yaml_file(path)
+        if self.mode == "verify":
+            hit, cached = self.get(key)
+            if hit and cached != data:
+                logger.warning(f"Specification cache entry for {path} does not match the source")
+                self.mismatches.append(path)
+        self.misses += 1
+        self.put(key, data)
+        return data
+
+    def load(
+        self, paths: List[str], workers: int = 1, timings: Optional[Dict[str, float]] = None
+    ) -> List[Any]:
+        """
+        Load documents for paths in order, parsing only cache misses.
+        """
+        if self.mode == "bypass":
+            return load_yaml_files(paths, workers, timings)
+
+        keys: List[str] = []
+        documents: Dict[int, Any] = {}
+        misses: List[int] = []
+        for index, path in enumerate(paths):
+            try:
+                with open(path, "rb") as f:
+                    key = self.key(f.read())
+            except IOError as e:
+                raise IOError(f"Error reading specification file {path}: {e}") from e
+            keys.append(key)
+            hit, data = (False, None) if self.mode == "verify" else self.get(key)
+            if hit:
+                documents[index] = data
+            else:
+                misses.append(index)
+
+        parsed = load_yaml_files([paths[i] for i in misses], workers, timings)
+        for index, data in zip(misses, parsed):
+            if self.mode == "verify":
+                hit, cached = self.get(keys[index])
+                if hit and cached != data:
+                    logger.warning(f"Specification cache entry for {paths[index]} does not match the source")
+                    self.mismatches.append(paths[index])
+            documents[index] = data
+            self.put(keys[index], data)
+
+        self.hits += len(paths) - len(misses)
+        self.misses += len(misses)
+        self.evict()
+        logger.info(f"Specification cache: {len(paths) - len(misses)} hits, {len(misses)} parsed")
+        return [documents[i] for i in range(len(paths))]
+
+    def load_layer(
+        self, folder: str, paths: List[str], workers: int = 1, timings: Optional[Dict[str, float]] = None
+    ) -> Dict[str, Any]:
+        """
+        Load the assembled tree of a whole specifications folder. The tree is
+        cached under a key made from each file's path, size and mtime, so an
+        unchanged folder is read back in one piece without opening its files.
+        A changed folder, or any folder in verify mode, is loaded document by
+        document through load().
+        """
+        if self.mode == "bypass":
+            return load_specification_tree(folder, paths, workers, None, False, timings)
+        stamps = []
+        for path in sorted(paths):
+            try:
+                stat = os.stat(path)
+            except OSError as e:
+                raise IOError(f"Error reading specification file {path}: {e}") from e
+            stamps.append(f"{os.path.relpath(path, folder)}\0{stat.st_size}\0{stat.st_mtime_ns}")
+        key = self.key("\n".join(["layer", os.path.abspath(folder), *stamps]).encode())
+        if self.mode == "use":
+            hit, tree = self.get(key)
+            if hit:
+                self.layer_hits += 1
+                logger.info(f"Specification cache: {folder} loaded as one layer ({len(paths)} files)")
+                return tree
+        tree = load_specification_tree(folder, paths, workers, self, False, timings)
+        self.put(key, tree)
+        return tree
+
+    def _discard(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def cache_from_env() -> Optional[SpecificationCache]:
+    """Build the cache configured by SPECIFICATIONS_CACHE_* variables, if any."""
+    folder = os.getenv("SPECIFICATIONS_CACHE_FOLDER")
+    if not folder:
+        return None
+    max_mb = os.getenv("SPECIFICATIONS_CACHE_MAX_MB", "256")
+    try:
+        max_bytes = int(float(max_mb) * 1024 * 1024)
+    except ValueError:
+        raise ValueError(f"Environment variable 'SPECIFICATIONS_CACHE_MAX_MB' must be a number, got {max_mb!r}")
+    mode = os.getenv("SPECIFICATIONS_CACHE_MODE", "use").lower()
+    logger.debug(f"Specification cache {folder} (mode={mode}, max={max_mb}MB)")
+    return SpecificationCache(folder, max_bytes=max_bytes, mode=mode)
@@ -0,0 +1,120 @@
+import os
+import pickle
+import tempfile
+import unittest
+from pathlib import Path
+
+from main import Processor
+from spec_cache import SpecificationCache
+
+
+class TestSpecificationCache(unittest.TestCase):
+    TEST_SPECIFICATIONS = "./test/repo/.stage0_template/test_data"
+    TEST_REPO = "./test/repo"
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache_folder = os.path.join(self.tmpdir.name, "cache")
+        self.specs = Path(self.tmpdir.name) / "specs"
+        self.specs.mkdir()
+        (self.specs / "a.yaml").write_text("name: a\n")
+        (self.specs / "b.yaml").write_text("name: b\n")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _paths(self):
+        return [str(self.specs / "a.yaml"), str(self.specs / "b.yaml")]
+
+    def test_second_load_hits_cache(self):
+        """Test that unchanged files are served from the cache."""
+        SpecificationCache(self.cache_folder).load(self._paths())
+        cache = SpecificationCache(self.cache_folder)
+        documents = cache.load(self._paths())
+        self.assertEqual([{"name": "a"}, {"name": "b"}], documents)
+        self.assertEqual(2, cache.hits)
+        self.assertEqual(0, cache.misses)
+
+    def test_changed_file_is_parsed_again(self):
+        """Test that only files whose content changed are parsed."""
+        SpecificationCache(self.cache_folder).load(self._paths())
+        (self.specs / "b.yaml").write_text("name: changed\n")
+        cache = SpecificationCache(self.cache_folder)
+        documents = cache.load(self._paths())
+        self.assertEqual({"name": "changed"}, documents[1])
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(1, cache.misses)
+
+    def test_corrupt_entries_are_parsed_again(self):
+        """Test that entries failing to unpickle in any way are discarded and the files parsed."""
+        cache = SpecificationCache(self.cache_folder)
+        cache.load(self._paths())
+        corrupt = [
+            b"\x80\x04cno_such_module\nthing\n.",  # ModuleNotFoundError
+            b"cbuiltins\nlen\n(tR.",  # TypeError
+        ]
+        for path, data in zip(self._paths(), corrupt):
+            with open(cache._entry_path(cache.key(Path(path).read_bytes())), "wb") as file:
+                file.write(data)
+        cache = SpecificationCache(self.cache_folder)
+        with self.assertLogs("spec_cache", level="WARNING") as logs:
+            documents = cache.load(self._paths())
+        self.assertEqual([{"name": "a"}, {"name": "b"}], documents)
+        self.assertEqual(2, cache.misses)
+        self.assertEqual(2, len([line for line in logs.output if "Discarding unreadable cache entry" in line]))
+        cache = SpecificationCache(self.cache_folder)
+        cache.load(self._paths())
+        self.assertEqual(2, cache.hits)
+
+    def test_eviction_keeps_cache_under_cap(self):
+        """Test that least recently used entries are evicted past max_bytes."""
+        cache = SpecificationCache(self.cache_folder, max_bytes=1)
+        cache.load(self._paths())
+        self.assertLessEqual(len(os.listdir(self.cache_folder)), 1)
+
+    def test_verify_reports_mismatched_entries(self):
+        """Test that verify mode re-parses and reports entries that disagree with the source."""
+        cache = SpecificationCache(self.cache_folder)
+        cache.load(self._paths())
+        key = cache.key((self.specs / "a.yaml").read_bytes())
+        with open(os.path.join(self.cache_folder, key + ".pickle"), "wb") as f:
+            pickle.dump({"name": "stale"}, f)
+
+        verifier = SpecificationCache(self.cache_folder, mode="verify")
+        documents = verifier.load(self._paths())
+        self.assertEqual({"name": "a"}, documents[0])
+        self.assertEqual([str(self.specs / "a.yaml")], verifier.mismatches)
+
+    def test_bypass_does_not_touch_cache(self):
+        """Test that bypass mode neither reads nor writes cache entries."""
+        cache = SpecificationCache(self.cache_folder, mode="bypass")
+        cache.load(self._paths())
+        self.assertFalse(os.path.exists(self.cache_folder))
+
+    def test_processor_with_cache_matches_uncached(self):
+        """Test that a cached load builds the same specifications tree."""
+        plain = Processor(self.TEST_SPECIFICATIONS, self.TEST_REPO)
+        Processor(self.TEST_SPECIFICATIONS, self.TEST_REPO, spec_cache=SpecificationCache(self.cache_folder))
+        cached = Processor(
+            self.TEST_SPECIFICATIONS, self.TEST_REPO, spec_cache=SpecificationCache(self.cache_folder)
+        )
+        self.assertEqual(plain.context_data["specifications"], cached.context_data["specifications"])
+        self.assertEqual(0, cached.spec_cache.misses)
+
+    def test_unchanged_layer_is_loaded_in_one_piece(self):
+        """Test that a cached layer is reused until one of its files changes."""
+        SpecificationCache(self.cache_folder).load_layer(str(self.specs), self._paths())
+        cache = SpecificationCache(self.cache_folder)
+        tree = cache.load_layer(str(self.specs), self._paths())
+        self.assertEqual({"a": {"name": "a"}, "b": {"name": "b"}}, tree)
+        self.assertEqual((1, 0, 0), (cache.layer_hits, cache.hits, cache.misses))
+
+        (self.specs / "b.yaml").write_text("name: changed\n")
+        cache = SpecificationCache(self.cache_folder)
+        tree = cache.load_layer(str(self.specs), self._paths())
+        self.assertEqual({"name": "changed"}, tree["b"])
+        self.assertEqual((0, 1, 1), (cache.layer_hits, cache.hits, cache.misses))
+
+
+if __name__ == "__main__":
+    unittest.main()
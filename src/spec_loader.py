@@ -0,0 +1,351 @@
+import logging
+import os
+import time
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import yaml
+
+from spec_store import StoreList, StoreMapping, to_plain
+
+logger = logging.getLogger(__name__)
+
+# Prefer the libyaml backed loader, fall back to the pure-Python one when
+# PyYAML was built without libyaml.
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def format_yaml_error(e: Exception, file_path: str) -> str:
+    """Format YAML parsing errors with file path and line/column when available."""
+    msg = f"YAML parsing error in {file_path}: {e}"
+    if hasattr(e, "problem_mark") and e.problem_mark:
+        mark = e.problem_mark
+        msg += f" (line {mark.line + 1}, column {mark.column + 1})"
+    return msg
+
+
+def load_yaml_file(file_path: str) -> Any:
+    """Parse a single specification file, raising errors that name the file."""
+    try:
+        with open(file_path, "r") as f:
+            return yaml.load(f, Loader=YamlLoader)
+    except yaml.YAMLError as e:
+        raise ValueError(format_yaml_error(e, file_path)) from e
+    except IOError as e:
+        raise IOError(f"Error reading specification file {file_path}: {e}") from e
+
+
+def _timed_load(file_path: str) -> Tuple[Any, float]:
+    start = time.perf_counter()
+    data = load_yaml_file(file_path)
+    return data, time.perf_counter() - start
+
+
+def find_yaml_files(folder: str) -> List[str]:
+    """List the .yaml files below folder in os.walk order."""
+    paths = []
+    for root, _, files in os.walk(folder):
+        for file in files:
+            if file.endswith(".yaml"):
+                paths.append(os.path.join(root, file))
+    return paths
+
+
+def specification_roots(folders: str) -> List[str]:
+    """Split an os.pathsep separated list of specification folders, base layer first."""
+    return [folder for folder in (part.strip() for part in folders.split(os.pathsep)) if folder]
+
+
+def find_specification_layers(folders: str) -> List[Tuple[str, List[str]]]:
+    """Each specification folder in an os.pathsep separated list, with its .yaml files."""
+    return [(root, find_yaml_files(root)) for root in specification_roots(folders)]
+
+
+def load_yaml_files(
+    paths: List[str], workers: int = 1, timings: Optional[Dict[str, float]] = None
+) -> List[Any]:
+    """
+    Parse many files, in a process pool when workers > 1.
+    Results are returned in the same order as paths. When timings is given,
+    the parse time of each file is recorded in it.
+    """
+    if workers <= 1 or len(paths) < 2:
+        results = [_timed_load(path) for path in paths]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        workers = min(workers, len(paths))
+        chunksize = max(1, len(paths) // (workers * 4))
+        logger.debug(f"Parsing {len(paths)} files with {workers} workers")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_timed_load, paths, chunksize=chunksize))
+    if timings is not None:
+        for path, (_, seconds) in zip(paths, results):
+            timings[path] = seconds
+    return [data for data, _ in results]
+
+
+def spec_keys(file_path: str, folder: str) -> List[str]:
+    """Map a specification file to its key path in the specifications tree."""
+    relative_path = os.path.relpath(file_path, folder)
+    return relative_path.replace(".yaml", "").split(os.sep)
+
+
+def assemble_tree(tree: Dict[str, Any], keys: List[str], data: Any) -> None:
+    """Place a parsed document into the nested specifications tree."""
+    for key in keys[:-1]:
+        tree = tree.setdefault(key, {})
+    tree[keys[-1]] = data
+
+
+def _kind(value: Any) -> str:
+    if isinstance(value, Mapping):
+        return "mapping"
+    if value is None:
+        return "null"
+    return type(value).__name__
+
+
+class Override(NamedTuple):
+    path: str  # breadcrumb of the replaced value, as in resolve_path errors
+    replaced: str  # kind of the earlier value
+    value: str  # kind of the overlay value
+
+    @property
+    def conflict(self) -> bool:
+        """True when a mapping or list is replaced by something of another kind."""
+        return self.replaced != self.value and bool({self.replaced, self.value} & {"mapping", "list"})
+
+
+def overlay_specifications(base: Any, overlay: Any, breadcrumb: str, overrides: List[Override]) -> Any:
+    """
+    Deep-merge overlay onto base and return the result. Mappings merge key by
+    key; any other overlay value (including a list) replaces the base value
+    and is recorded in overrides. base is not modified: only the mappings
+    along overlaid paths are copied.
+    """
+    if isinstance(base, Mapping) and isinstance(overlay, Mapping):
+        merged = dict(base)
+        for key, value in overlay.items():
+            if key in merged:
+                value = overlay_specifications(merged[key], value, f"{breadcrumb}.{key}", overrides)
+            merged[key] = value
+        return merged
+    overrides.append(Override(breadcrumb, _kind(base), _kind(overlay)))
+    return overlay
+
+
+def log_overrides(source: str, overrides: List[Override]) -> None:
+    """Log the values an overlay replaced; changes of structure are warnings."""
+    for override in overrides:
+        if override.conflict:
+            logger.warning(
+                f"Specification overlay {source} replaces a {override.replaced} with a {override.value} "
+                f"at '{override.path}'"
+            )
+        else:
+            logger.debug(f"Specification overlay {source} overrides '{override.path}'")
+
+
+class _PendingDocument:
+    """
+    Placeholder for a specification document that has not been parsed yet,
+    with the files that build it as (layer, keys below the document, path) in
+    the order they were found. The file with no keys is the document itself;
+    the others come from a folder of the same name and are placed into the
+    document as assemble_tree places them. Each specifications folder (layer)
+    is assembled on its own and deep-merged over the layers before it.
+    """
+
+    __slots__ = ("keys", "files")
+
+    def __init__(self, keys: List[str], files: List[Tuple[int, List[str], str]]) -> None:
+        self.keys = keys
+        self.files = files
+
+
+class LazySpecifications(Mapping):
+    """
+    Read-only specifications tree that parses each file on first access.
+
+    Folders become nested LazySpecifications nodes, files are parsed the first
+    time their key is read and the result replaces the placeholder. Membership
+    tests and key listings never parse anything. The tree read is the same as
+    the one load_specification_layers assembles eagerly.
+    """
+
+    def __init__(
+        self, cache: Any = None, timings: Optional[Dict[str, float]] = None, overrides: Optional[List[Override]] = None
+    ) -> None:
+        self._entries: Dict[str, Any] = {}
+        # Every file added below this node, as (layer, keys below this node, path)
+        self._files: List[Tuple[int, List[str], str]] = []
+        self._cache = cache
+        self._timings = timings
+        self._overrides = overrides
+
+    def add_document(self, keys: List[str], path: str, layer: int = 0) -> None:
+        """
+        Register a file from the given layer (specifications folder) under its
+        key path without parsing it. A document and a folder of the same name
+        become one placeholder that is assembled when first read.
+        """
+        node = self
+        for depth, key in enumerate(keys):
+            node._files.append((layer, keys[depth:], path))
+            child = node._entries.get(key)
+            if isinstance(child, _PendingDocument):
+                child.files.append((layer, keys[depth + 1:], path))
+                return
+            if depth == len(keys) - 1:
+                files = child._files if isinstance(child, LazySpecifications) else []
+                node._entries[key] = _PendingDocument(keys, [*files, (layer, [], path)])
+                return
+            if child is None:
+                child = node._entries[key] = LazySpecifications(self._cache, self._timings, self._overrides)
+            node = child
+
+    def _load(self, path: str) -> Any:
+        start = time.perf_counter()
+        if self._cache is not None:
+            data = self._cache.load_document(path)
+        else:
+            data = load_yaml_file(path)
+        if self._timings is not None:
+            self._timings[path] = time.perf_counter() - start
+        return data
+
+    def _assemble(self, pending: _PendingDocument) -> Any:
+        """Parse a placeholder's files and build its value as the eager loader would."""
+        layers: Dict[int, Any] = {}
+        sources: Dict[int, str] = {}
+        for layer, keys, path in pending.files:
+            data = self._load(path)
+            sources.setdefault(layer, path)
+            if keys:
+                assemble_tree(layers.setdefault(layer, {}), keys, data)
+            else:
+                layers[layer] = data
+        breadcrumb = ".".join(["specifications", *pending.keys])
+        values = iter(layers.items())
+        _, value = next(values)
+        for layer, layer_value in values:
+            overrides: List[Override] = []
+            value = overlay_specifications(value, layer_value, breadcrumb, overrides)
+            log_overrides(sources[layer], overrides)
+            if self._overrides is not None:
+                self._overrides.extend(overrides)
+        return value
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._entries[key]
+        if isinstance(value, _PendingDocument):
+            value = self._entries[key] = self._assemble(value)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f"LazySpecifications({list(self._entries)})"
+
+    def materialize(self) -> Dict[str, Any]:
+        """Parse everything below this node and return it as plain dicts."""
+        return {
+            key: value.materialize() if isinstance(value, LazySpecifications) else value
+            for key, value in self.items()
+        }
+
+
+def materialize(value: Any) -> Any:
+    """Return value with a lazy specifications node or store view converted to plain dicts and lists."""
+    if isinstance(value, LazySpecifications):
+        return value.materialize()
+    if isinstance(value, (StoreMapping, StoreList)):
+        return to_plain(value)
+    return value
+
+
+def load_specification_tree(
+    folder: str,
+    paths: List[str],
+    workers: int = 1,
+    cache: Any = None,
+    lazy: bool = False,
+    timings: Optional[Dict[str, float]] = None,
+) -> Any:
+    """
+    Build the specifications tree from the files in paths (below folder).
+    Files are parsed with `workers` processes, through `cache` (a
+    SpecificationCache) when one is given. With lazy set, a LazySpecifications
+    index is returned and files are parsed on first access.
+    """
+    if lazy:
+        tree = LazySpecifications(cache, timings)
+        for file_path in paths:
+            tree.add_document(spec_keys(file_path, folder), file_path)
+        if cache is not None:
+            cache.evict()
+        return tree
+
+    if cache is not None:
+        documents = cache.load(paths, workers, timings)
+    else:
+        documents = load_yaml_files(paths, workers, timings)
+    tree: Dict[str, Any] = {}
+    for file_path, data in zip(paths, documents):
+        assemble_tree(tree, spec_keys(file_path, folder), data)
+    return tree
+
+
+def load_specification_layers(
+    layers: List[Tuple[str, List[str]]],
+    workers: int = 1,
+    cache: Any = None,
+    lazy: bool = False,
+    timings: Optional[Dict[str, float]] = None,
+    overrides: Optional[List[Override]] = None,
+) -> Any:
+    """
+    Build the specifications tree from (folder, paths) layers, base first.
+    Each later folder is deep-merged over the ones before it (see
+    overlay_specifications) and the values it replaced are logged and added
+    to overrides. With a cache, every layer but the last is loaded as one
+    cached tree (SpecificationCache.load_layer), so a large shared base is
+    neither parsed nor reassembled while it is unchanged; the last layer is
+    loaded document by document. With lazy set, overlaid documents are merged
+    by the same rule when first read, and their overrides are added then.
+    """
+    if len(layers) == 1:
+        folder, paths = layers[0]
+        return load_specification_tree(folder, paths, workers, cache, lazy, timings)
+
+    if lazy:
+        lazy_tree = LazySpecifications(cache, timings, overrides)
+        for layer, (folder, paths) in enumerate(layers):
+            for file_path in paths:
+                lazy_tree.add_document(spec_keys(file_path, folder), file_path, layer)
+        if cache is not None:
+            cache.evict()
+        return lazy_tree
+
+    tree: Dict[str, Any] = {}
+    for index, (folder, paths) in enumerate(layers):
+        if cache is not None and index < len(layers) - 1:
+            layer = cache.load_layer(folder, paths, workers, timings)
+        else:
+            layer = load_specification_tree(folder, paths, workers, cache, False, timings)
+        layer_overrides: List[Override] = []
+        tree = overlay_specifications(tree, layer, "specifications", layer_overrides)
+        if index:
+            log_overrides(folder, layer_overrides)
+            logger.debug(f"Specification overlay {folder} overrides {len(layer_overrides)} values")
+        if overrides is not None:
+            overrides.extend(layer_overrides)
+    return tree
@@ -0,0 +1,228 @@
+import filecmp
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import yaml
+
+import spec_loader
+from main import Processor
+
+
+class TestSpecLoader(unittest.TestCase):
+    TEST_SPECIFICATIONS = "./test/repo/.stage0_template/test_data"
+    TEST_REPO = "./test/repo"
+
+    def test_loader_prefers_libyaml(self):
+        """Test that the C loader is used when PyYAML was built with libyaml."""
+        if yaml.__with_libyaml__:
+            self.assertIs(spec_loader.YamlLoader, yaml.CSafeLoader)
+        else:
+            self.assertIs(spec_loader.YamlLoader, yaml.SafeLoader)
+
+    def test_invalid_yaml_names_file_line_and_column(self):
+        """Test that parse errors name the file, line and column."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            bad = Path(tmpdir) / "bad.yaml"
+            bad.write_text("key: value\nother: [unclosed\n")
+            with self.assertRaises(ValueError) as ctx:
+                spec_loader.load_yaml_file(str(bad))
+            self.assertIn(str(bad), str(ctx.exception))
+            self.assertIn("line", str(ctx.exception))
+            self.assertIn("column", str(ctx.exception))
+
+    def test_invalid_yaml_in_worker_is_reported(self):
+        """Test that parse errors raised in the process pool keep the file name."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            good = Path(tmpdir) / "good.yaml"
+            good.write_text("key: value\n")
+            bad = Path(tmpdir) / "bad.yaml"
+            bad.write_text("key: [unclosed\n")
+            with self.assertRaises(ValueError) as ctx:
+                spec_loader.load_yaml_files([str(good), str(bad)], workers=2)
+            self.assertIn("bad.yaml", str(ctx.exception))
+            self.assertIn("line", str(ctx.exception))
+
+    def test_parallel_load_matches_sequential(self):
+        """Test that loading with a process pool builds the same specifications tree."""
+        sequential = Processor(self.TEST_SPECIFICATIONS, self.TEST_REPO)
+        parallel = Processor(self.TEST_SPECIFICATIONS, self.TEST_REPO, spec_workers=3)
+        self.assertEqual(
+            sequential.context_data["specifications"],
+            parallel.context_data["specifications"],
+        )
+
+    def test_lazy_tree_parses_on_first_access(self):
+        """Test that lazy mode only parses documents that are read."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            template_dir = Path(tmpdir) / ".stage0_template"
+            template_dir.mkdir()
+            (template_dir / "process.yaml").write_text("templates: []\n")
+            specs_dir = Path(tmpdir) / "specs"
+            (specs_dir / "nested").mkdir(parents=True)
+            (specs_dir / "good.yaml").write_text("name: good\n")
+            (specs_dir / "nested" / "bad.yaml").write_text("key: [unclosed\n")
+
+            processor = Processor(str(specs_dir), tmpdir, lazy_specifications=True)
+            specifications = processor.context_data["specifications"]
+            self.assertIsInstance(specifications, spec_loader.LazySpecifications)
+            self.assertEqual("good", processor.resolve_path("specifications.good.name"))
+            self.assertIn("bad", specifications["nested"])
+
+            with self.assertRaises(ValueError) as ctx:
+                processor.resolve_path("specifications.nested.bad")
+            self.assertIn("bad.yaml", str(ctx.exception))
+            self.assertIn("line", str(ctx.exception))
+
+    def test_lazy_missing_key_lists_available_keys(self):
+        """Test that lazy mode keeps the resolve_path diagnostics."""
+        processor = Processor(self.TEST_SPECIFICATIONS, self.TEST_REPO, lazy_specifications=True)
+        with self.assertRaises(KeyError) as ctx:
+            processor.resolve_path("specifications.nonexistent")
+        self.assertIn("architecture", str(ctx.exception))
+
+    def test_lazy_tree_matches_eager_for_document_beside_folder(self):
+        """Test that a document and a folder of the same name assemble into one mapping in both modes."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            specs_dir = Path(tmpdir) / "specs"
+            (specs_dir / "a" / "c").mkdir(parents=True)
+            (specs_dir / "a.yaml").write_text("top: 1\nb: replaced\nc: {kept: true}\n")
+            (specs_dir / "a" / "b.yaml").write_text("name: b\n")
+            (specs_dir / "a" / "c" / "d.yaml").write_text("name: d\n")
+            (specs_dir / "other.yaml").write_text("x: 1\n")
+            paths = spec_loader.find_yaml_files(str(specs_dir))
+
+            eager = spec_loader.load_specification_tree(str(specs_dir), paths)
+            lazy = spec_loader.load_specification_tree(str(specs_dir), paths, lazy=True)
+            self.assertEqual(1, eager["a"]["top"])
+            self.assertEqual({"kept": True, "d": {"name": "d"}}, eager["a"]["c"])
+            self.assertEqual(eager, lazy.materialize())
+
+    def test_lazy_undefined_attribute_names_dict(self):
+        """Test that a missing key in a template reads the same with lazy specifications."""
+        env = Processor(self.TEST_SPECIFICATIONS, self.TEST_REPO).template_cache.env
+        messages = []
+        for lazy in (False, True):
+            processor = Processor(self.TEST_SPECIFICATIONS, self.TEST_REPO, lazy_specifications=lazy)
+            with self.assertRaises(Exception) as ctx:
+                env.from_string("{{ specifications.nope.name }}").render(processor.context_data)
+            messages.append(str(ctx.exception))
+        self.assertEqual(["'dict object' has no attribute 'nope'"] * 2, messages)
+
+    def test_nested_lazy_folders_serialize_like_eager(self):
+        """Test that folder nodes nested in plain data dump the same with lazy specifications."""
+        template = (
+            "{% for key, value in specifications.items() %}{{ value | to_json }}{% endfor %}\n"
+            "{{ {'x': specifications.dataDefinitions} | to_yaml }}\n"
+            "{{ [specifications['dd.types']] | to_json_minified }}\n"
+            "{{ {'x': specifications.dataDefinitions} | tojson }}"
+        )
+        rendered = []
+        for lazy in (False, True):
+            processor = Processor(self.TEST_SPECIFICATIONS, self.TEST_REPO, lazy_specifications=lazy)
+            env = processor.template_cache.env
+            rendered.append(env.from_string(template).render(processor.context_data))
+        self.assertNotIn("python/object", rendered[1])
+        self.assertEqual(rendered[0], rendered[1])
+
+    def test_overlay_merges_mappings_and_reports_overrides(self):
+        """Test that an overlay deep-merges mappings, replaces other values and leaves the base untouched."""
+        base = {"architecture": {"product": "base", "domains": [1, 2], "owner": {"name": "team"}}}
+        overlay = {"architecture": {"product": "team", "domains": [3], "owner": "someone", "extra": True}}
+        overrides = []
+        merged = spec_loader.overlay_specifications(base, overlay, "specifications", overrides)
+        self.assertEqual(
+            {"architecture": {"product": "team", "domains": [3], "owner": "someone", "extra": True}}, merged
+        )
+        self.assertEqual("base", base["architecture"]["product"])
+        self.assertEqual(
+            [
+                ("specifications.architecture.product", False),
+                ("specifications.architecture.domains", False),
+                ("specifications.architecture.owner", True),
+            ],
+            [(override.path, override.conflict) for override in overrides],
+        )
+
+    def test_processor_overlays_specification_folders(self):
+        """Test that later specification folders override earlier ones, eagerly and lazily."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            base = Path(tmpdir) / "base"
+            team = Path(tmpdir) / "team"
+            (base / "catalog").mkdir(parents=True)
+            team.mkdir()
+            (base / "product.yaml").write_text("name: Widget\nversion: 1\n")
+            (base / "catalog" / "types.yaml").write_text("a: one\n")
+            (team / "product.yaml").write_text("version: 2\n")
+            repo = Path(tmpdir) / "repo"
+            (repo / ".stage0_template").mkdir(parents=True)
+            (repo / ".stage0_template" / "process.yaml").write_text("templates: []\n")
+
+            folders = f"{base}{os.pathsep}{team}"
+            eager = Processor(folders, str(repo))
+            lazy = Processor(folders, str(repo), lazy_specifications=True)
+            expected = {"product": {"name": "Widget", "version": 2}, "catalog": {"types": {"a": "one"}}}
+            self.assertEqual(expected, eager.context_data["specifications"])
+            self.assertEqual(expected, lazy.context_data["specifications"].materialize())
+            self.assertEqual(1, eager.report.counters["specification_overrides"])
+
+    def test_lazy_overlay_matches_eager_and_counts_overrides(self):
+        """Test that a folder overlaying a document merges and reports the same overrides in both modes."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            base = Path(tmpdir) / "base"
+            team = Path(tmpdir) / "team"
+            base.mkdir()
+            (team / "catalog").mkdir(parents=True)
+            (base / "catalog.yaml").write_text("a: one\nb: two\n")
+            (team / "catalog" / "a.yaml").write_text("name: first\n")
+            repo = Path(tmpdir) / "repo"
+            (repo / ".stage0_template").mkdir(parents=True)
+            (repo / ".stage0_template" / "process.yaml").write_text(
+                "requires:\n  - specifications.catalog.b\ntemplates: []\n"
+            )
+
+            folders = f"{base}{os.pathsep}{team}"
+            with self.assertLogs("spec_loader", level="WARNING"):
+                eager = Processor(folders, str(repo), keep_process_files=True)
+            lazy = Processor(folders, str(repo), keep_process_files=True, lazy_specifications=True)
+            expected = {"catalog": {"a": {"name": "first"}, "b": "two"}}
+            self.assertEqual(expected, eager.context_data["specifications"])
+            with self.assertLogs("spec_loader", level="WARNING"):
+                lazy.run({})
+            self.assertEqual(expected, lazy.context_data["specifications"].materialize())
+            self.assertEqual(1, eager.report.counters["specification_overrides"])
+            self.assertEqual(1, lazy.report.counters["specification_overrides"])
+
+    def test_lazy_merge_matches_expected(self):
+        """Test that a lazy merge of the test repo produces the expected files."""
+        os.environ["SERVICE_NAME"] = "user"
+        os.environ["DATA_SOURCE"] = "organization"
+        try:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                repo = os.path.join(tmpdir, "repo")
+                shutil.copytree(self.TEST_REPO, repo)
+                expected = os.path.join(repo, ".stage0_template", "test_expected")
+                expected_copy = os.path.join(tmpdir, "expected")
+                shutil.copytree(expected, expected_copy)
+
+                processor = Processor(
+                    os.path.join(repo, ".stage0_template", "test_data"), repo, lazy_specifications=True
+                )
+                processor.read_environment()
+                processor.add_context()
+                processor.verify_exists()
+                processor.process_templates()
+
+                names = sorted(os.listdir(expected_copy))
+                _, mismatch, errors = filecmp.cmpfiles(expected_copy, repo, names, shallow=False)
+                self.assertEqual([], mismatch)
+                self.assertEqual([], errors)
+        finally:
+            del os.environ["SERVICE_NAME"]
+            del os.environ["DATA_SOURCE"]
+
+
+if __name__ == "__main__":
+    unittest.main()
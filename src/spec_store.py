@@ -0,0 +1,386 @@
+"""
+Read-only specification store shared by worker processes.
+
+build_store serializes a specifications tree into one flat file. Worker
+processes memory-map that file instead of unpickling their own copy of the
+tree, so the operating system shares its pages between them and memory stays
+flat as workers are added.
+
+Every node is a tag byte followed by its payload:
+
+    N, T, F     None, True, False
+    i           int64
+    f           float64
+    s           u32 length, UTF-8 bytes
+    p           u32 length, pickle bytes (dates, binary, big ints)
+    l           u32 count, count u64 value offsets
+    m           u32 count, count (u64 key offset, u64 value offset) entries in
+                insertion order, then count (u32 key hash, u32 entry) slots
+                sorted by hash for lookups
+
+Mappings and lists are read through StoreMapping and StoreList views, which
+decode nodes on access and pickle as (file, offset), so a view sent to a
+worker process opens the same file rather than copying the data.
+"""
+import logging
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+import weakref
+import zlib
+from collections.abc import Mapping, Sequence
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"S0STORE1"
+_HEADER = struct.Struct("<8sQ")
+_COUNT = struct.Struct("<I")
+_OFFSET = struct.Struct("<Q")
+_ENTRY = struct.Struct("<QQ")
+_SLOT = struct.Struct("<II")
+_INT = struct.Struct("<q")
+_FLOAT = struct.Struct("<d")
+_INT_RANGE = (-(2 ** 63), 2 ** 63 - 1)
+
+
+def _scalar_bytes(value: Any) -> bytes:
+    """Encode a scalar node."""
+    if value is None:
+        return b"N"
+    if value is True:
+        return b"T"
+    if value is False:
+        return b"F"
+    if type(value) is int and _INT_RANGE[0] <= value <= _INT_RANGE[1]:
+        return b"i" + _INT.pack(value)
+    if type(value) is float:
+        return b"f" + _FLOAT.pack(value)
+    if type(value) is str:
+        data = value.encode("utf-8", "surrogatepass")
+        return b"s" + _COUNT.pack(len(data)) + data
+    data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    return b"p" + _COUNT.pack(len(data)) + data
+
+
+def _key_bytes(key: Any) -> bytes:
+    """
+    Encoding a mapping key is hashed by. Keys a dict treats as the same key,
+    such as True, 1 and 1.0, encode alike.
+    """
+    if type(key) is str:
+        return _scalar_bytes(key)
+    if isinstance(key, (bool, int)) or (isinstance(key, float) and key.is_integer()):
+        return _scalar_bytes(int(key))
+    return _scalar_bytes(key)
+
+
+def _key_hash(encoded: bytes) -> int:
+    return zlib.crc32(encoded)
+
+
+class _StoreWriter:
+    """Appends nodes to a buffer, sharing identical scalars and repeated containers."""
+
+    def __init__(self) -> None:
+        self.buffer = bytearray(_HEADER.size)
+        self._scalars: Dict[bytes, int] = {}
+        # id -> (offset, container); holding the container keeps its id from being reused
+        self._containers: Dict[int, Tuple[int, Any]] = {}
+        # Containers being written, and the keys leading to the current one
+        self._open: Set[int] = set()
+        self._path: List[str] = ["specifications"]
+
+    def _append(self, data: bytes) -> int:
+        offset = len(self.buffer)
+        self.buffer += data
+        return offset
+
+    def _scalar(self, encoded: bytes) -> int:
+        offset = self._scalars.get(encoded)
+        if offset is None:
+            offset = self._scalars[encoded] = self._append(encoded)
+        return offset
+
+    def add(self, value: Any) -> int:
+        """Write value and everything below it; return its offset."""
+        if isinstance(value, (StoreMapping, StoreList)):
+            value = to_plain(value)
+        is_mapping = isinstance(value, Mapping)
+        if not is_mapping and not isinstance(value, (list, tuple)):
+            return self._scalar(_scalar_bytes(value))
+        known = self._containers.get(id(value))
+        if known is not None:
+            return known[0]
+        if id(value) in self._open:
+            raise ValueError(f"Specifications contain a recursive reference at '{'.'.join(self._path)}'")
+
+        self._open.add(id(value))
+        if is_mapping:
+            entries = []
+            slots = []
+            for position, (key, child) in enumerate(value.items()):
+                self._path.append(str(key))
+                entries.append(_ENTRY.pack(self._scalar(_scalar_bytes(key)), self.add(child)))
+                self._path.pop()
+                slots.append((_key_hash(_key_bytes(key)), position))
+            slots.sort()
+            data = b"".join([b"m", _COUNT.pack(len(entries)), *entries, *(_SLOT.pack(*slot) for slot in slots)])
+        else:
+            children = []
+            for index, child in enumerate(value):
+                self._path.append(str(index))
+                children.append(_OFFSET.pack(self.add(child)))
+                self._path.pop()
+            data = b"".join([b"l", _COUNT.pack(len(children)), *children])
+        self._open.discard(id(value))
+        offset = self._append(data)
+        self._containers[id(value)] = (offset, value)
+        return offset
+
+
+def write_store(tree: Any, path: str) -> int:
+    """Serialize tree to path, atomically; return the file size in bytes."""
+    writer = _StoreWriter()
+    root = writer.add(tree)
+    _HEADER.pack_into(writer.buffer, 0, MAGIC, root)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(writer.buffer)
+    os.replace(tmp_path, path)
+    return len(writer.buffer)
+
+
+class SpecificationStore:
+    """
+    A memory-mapped store file. Container views are created once per offset,
+    so repeated lookups return the same object and identity based memos (the
+    serializer cache, selector indexes) keep working.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._root = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a specification store")
+        self._views: Dict[int, Any] = {}
+
+    @property
+    def root(self) -> Any:
+        return self.value(self._root)
+
+    def value(self, offset: int) -> Any:
+        """Decode the node at offset; mappings and lists come back as views."""
+        buffer = self._mmap
+        tag = buffer[offset]
+        if tag == 0x73:  # s
+            (length,) = _COUNT.unpack_from(buffer, offset + 1)
+            return str(buffer[offset + 5:offset + 5 + length], "utf-8", "surrogatepass")
+        if tag == 0x69:  # i
+            return _INT.unpack_from(buffer, offset + 1)[0]
+        if tag == 0x6D or tag == 0x6C:  # m, l
+            view = self._views.get(offset)
+            if view is None:
+                (count,) = _COUNT.unpack_from(buffer, offset + 1)
+                view_type = StoreMapping if tag == 0x6D else StoreList
+                view = self._views[offset] = view_type(self, offset, count)
+            return view
+        if tag == 0x4E:  # N
+            return None
+        if tag == 0x54:  # T
+            return True
+        if tag == 0x46:  # F
+            return False
+        if tag == 0x66:  # f
+            return _FLOAT.unpack_from(buffer, offset + 1)[0]
+        if tag == 0x70:  # p
+            (length,) = _COUNT.unpack_from(buffer, offset + 1)
+            return pickle.loads(buffer[offset + 5:offset + 5 + length])
+        raise ValueError(f"Corrupt specification store {self.path} at offset {offset}")
+
+    def entry(self, offset: int, position: int) -> Tuple[int, int]:
+        """(key offset, value offset) of a mapping entry."""
+        return _ENTRY.unpack_from(self._mmap, offset + 5 + position * _ENTRY.size)
+
+    def find(self, offset: int, count: int, key: Any) -> int:
+        """Value offset for key in the mapping at offset, or -1. Keys match as they would in a dict."""
+        # Unhashable keys raise TypeError, as with a dict
+        hash(key)
+        try:
+            encoded = _key_bytes(key)
+        except Exception:
+            return -1
+        key_hash = _key_hash(encoded)
+        buffer = self._mmap
+        slots = offset + 5 + count * _ENTRY.size
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if _SLOT.unpack_from(buffer, slots + middle * _SLOT.size)[0] < key_hash:
+                low = middle + 1
+            else:
+                high = middle
+        while low < count:
+            slot_hash, position = _SLOT.unpack_from(buffer, slots + low * _SLOT.size)
+            if slot_hash != key_hash:
+                break
+            key_offset, value_offset = self.entry(offset, position)
+            if type(key) is str:
+                if buffer[key_offset:key_offset + len(encoded)] == encoded:
+                    return value_offset
+            elif self.value(key_offset) == key:
+                return value_offset
+            low += 1
+        return -1
+
+    def item(self, offset: int, index: int) -> Any:
+        """Element index of the list at offset."""
+        return self.value(_OFFSET.unpack_from(self._mmap, offset + 5 + index * _OFFSET.size)[0])
+
+
+# Stores opened by this process, by path
+_stores: Dict[str, SpecificationStore] = {}
+
+
+def open_store(path: str) -> SpecificationStore:
+    """Open a store file once per process."""
+    store = _stores.get(path)
+    if store is None:
+        store = _stores[path] = SpecificationStore(path)
+    return store
+
+
+def _open_view(path: str, offset: int) -> Any:
+    return open_store(path).value(offset)
+
+
+class StoreMapping(Mapping):
+    """Read-only mapping view of a store node, behaving like the dict it was built from."""
+
+    __slots__ = ("_store", "_offset", "_count")
+
+    def __init__(self, store: SpecificationStore, offset: int, count: int) -> None:
+        self._store = store
+        self._offset = offset
+        self._count = count
+
+    def __getitem__(self, key: Any) -> Any:
+        value_offset = self._store.find(self._offset, self._count, key)
+        if value_offset < 0:
+            raise KeyError(key)
+        return self._store.value(value_offset)
+
+    def __contains__(self, key: object) -> bool:
+        return self._store.find(self._offset, self._count, key) >= 0
+
+    def __iter__(self) -> Iterator[Any]:
+        for position in range(self._count):
+            yield self._store.value(self._store.entry(self._offset, position)[0])
+
+    def items(self) -> Iterator[Tuple[Any, Any]]:  # type: ignore[override]
+        for position in range(self._count):
+            key_offset, value_offset = self._store.entry(self._offset, position)
+            yield self._store.value(key_offset), self._store.value(value_offset)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __repr__(self) -> str:
+        return repr(to_plain(self))
+
+    def __reduce__(self) -> Any:
+        return _open_view, (self._store.path, self._offset)
+
+
+class StoreList(Sequence):
+    """Read-only list view of a store node, comparing equal to the list it was built from."""
+
+    __slots__ = ("_store", "_offset", "_count")
+
+    def __init__(self, store: SpecificationStore, offset: int, count: int) -> None:
+        self._store = store
+        self._offset = offset
+        self._count = count
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("list index out of range")
+        return self._store.item(self._offset, index)
+
+    def __iter__(self) -> Iterator[Any]:
+        for index in range(self._count):
+            yield self._store.item(self._offset, index)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, (list, StoreList)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __add__(self, other: Any) -> List[Any]:
+        return list(self) + list(other)
+
+    def __radd__(self, other: Any) -> List[Any]:
+        return list(other) + list(self)
+
+    def __repr__(self) -> str:
+        return repr(to_plain(self))
+
+    def __reduce__(self) -> Any:
+        return _open_view, (self._store.path, self._offset)
+
+
+def to_plain(value: Any, _copies: Optional[Dict[int, Any]] = None) -> Any:
+    """
+    Copy store views (at any depth) into plain dicts and lists. A view reached
+    more than once is copied once, so nodes shared by YAML aliases stay shared
+    (and dump as anchors) like in the tree the store was built from.
+    """
+    if not isinstance(value, (StoreMapping, StoreList)):
+        return value
+    if _copies is None:
+        _copies = {}
+    # Views are created once per offset, so identity marks a shared node
+    copy = _copies.get(id(value))
+    if copy is None:
+        if isinstance(value, StoreMapping):
+            copy = _copies[id(value)] = {}
+            for key, child in value.items():
+                copy[key] = to_plain(child, _copies)
+        else:
+            copy = _copies[id(value)] = [to_plain(child, _copies) for child in value]
+    return copy
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def build_store(tree: Any, folder: Optional[str] = None) -> Any:
+    """
+    Write tree to a new store file in folder (the system temp folder by
+    default) and return the root view. The file is removed when this
+    process exits; worker processes only map it.
+    """
+    handle, path = tempfile.mkstemp(prefix="stage0_specifications_", suffix=".store", dir=folder)
+    os.close(handle)
+    size = write_store(tree, path)
+    store = open_store(path)
+    weakref.finalize(store, _remove, path)
+    logger.info(f"Specification store {path} holds {size / 2 ** 20:.1f} MiB")
+    return store.root
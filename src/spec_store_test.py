@@ -0,0 +1,144 @@
+import datetime
+import filecmp
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+import yaml
+from jinja2 import UndefinedError
+
+from main import Processor
+from rendering import TemplateCache, dump_json, dump_yaml
+from spec_loader import find_yaml_files, load_specification_tree
+from spec_store import StoreList, StoreMapping, build_store, to_plain
+
+
+def _read_in_worker(specifications):
+    """Read a value from a view sent to another process."""
+    return len(specifications["personas"]), specifications["enumerators"] == specifications["enumerators"]
+
+
+class TestSpecificationStore(unittest.TestCase):
+    TEST_SPECIFICATIONS = "./test/repo/.stage0_template/test_data"
+    TEST_REPO = "./test/repo"
+    TEST_EXPECTED = "./test/repo/.stage0_template/test_expected"
+
+    def setUp(self):
+        os.environ["SERVICE_NAME"] = "user"
+        os.environ["DATA_SOURCE"] = "organization"
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.tree = load_specification_tree(
+            self.TEST_SPECIFICATIONS, find_yaml_files(self.TEST_SPECIFICATIONS)
+        )
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+        del os.environ["SERVICE_NAME"]
+        del os.environ["DATA_SOURCE"]
+
+    def test_round_trip(self):
+        """Test that a stored tree reads back equal, in order, with the same repr and dumps."""
+        store = build_store(self.tree, self.tmpdir.name)
+        self.assertIsInstance(store, StoreMapping)
+        self.assertEqual(self.tree, to_plain(store))
+        self.assertEqual(list(self.tree), list(store))
+        self.assertEqual(repr(self.tree), repr(store))
+        self.assertEqual(dump_yaml(self.tree), dump_yaml(store))
+        self.assertEqual(dump_json(self.tree), dump_json(store))
+        # Views nested in plain data serialize like the data
+        self.assertEqual(dump_yaml({"specs": self.tree}), dump_yaml({"specs": store}))
+        self.assertEqual(dump_json([self.tree]), dump_json([store]))
+
+    def test_scalars_and_lookups(self):
+        """Test every scalar kind, missing keys, negative indexes and view identity."""
+        data = {
+            "text": "héllo",
+            "empty": "",
+            "int": -7,
+            "big": 2 ** 70,
+            "float": 1.5,
+            "none": None,
+            "flags": [True, False],
+            "date": datetime.date(2024, 1, 2),
+            1: "int key",
+            "nested": {"list": [{"a": 1}, {"a": 2}]},
+        }
+        store = build_store(data, self.tmpdir.name)
+        self.assertEqual(data, to_plain(store))
+        self.assertEqual("int key", store[1])
+        self.assertNotIn("missing", store)
+        self.assertIsNone(store.get("missing"))
+        with self.assertRaises(KeyError):
+            store["missing"]
+        items = store["nested"]["list"]
+        self.assertIsInstance(items, StoreList)
+        self.assertEqual([{"a": 1}, {"a": 2}], items)
+        self.assertEqual({"a": 2}, items[-1])
+        self.assertIs(items, store["nested"]["list"])
+        with self.assertRaises(IndexError):
+            items[2]
+
+    def test_views_behave_like_dicts(self):
+        """Test dict key semantics, Jinja's tojson and undefined messages on store views."""
+        store = build_store({"flags": {1: "one", 2.5: "half"}, "names": ["a"]}, self.tmpdir.name)
+        flags = store["flags"]
+        self.assertEqual("one", flags[True])
+        self.assertEqual("one", flags[1.0])
+        self.assertEqual("half", flags[2.5])
+        self.assertNotIn("1", flags)
+        with self.assertRaises(TypeError):
+            flags[["unhashable"]]
+        env = TemplateCache().env
+        self.assertEqual(
+            env.from_string("{{ store | tojson }}").render(store={"flags": {1: "one"}, "names": ["a"]}),
+            env.from_string("{{ store | tojson }}").render(store=build_store({"flags": {1: "one"}, "names": ["a"]})),
+        )
+        with self.assertRaises(UndefinedError) as ctx:
+            env.from_string("{{ store.nope.name }}").render(store=store)
+        self.assertEqual("'dict object' has no attribute 'nope'", str(ctx.exception))
+
+    def test_aliases_stay_shared(self):
+        """Test that nodes shared by YAML aliases dump with anchors, as the eager tree does."""
+        tree = yaml.safe_load("base: &b {x: 1}\na: *b\nlist: &l [1, 2]\nitems: [*l, *b]\n")
+        store = build_store(tree, self.tmpdir.name)
+        plain = to_plain(store)
+        self.assertIs(plain["a"], plain["base"])
+        self.assertIs(plain["items"][1], plain["base"])
+        self.assertIs(plain["items"][0], plain["list"])
+        self.assertIn("&id", dump_yaml(store))
+        self.assertEqual(dump_yaml(tree), dump_yaml(store))
+
+    def test_recursive_specifications_are_rejected(self):
+        """Test that a recursive YAML alias fails with the path of the loop."""
+        tree = yaml.safe_load("a: &loop\n  b:\n    - *loop\n")
+        with self.assertRaises(ValueError) as ctx:
+            build_store(tree, self.tmpdir.name)
+        self.assertIn("recursive reference at 'specifications.a.b.0'", str(ctx.exception))
+
+    def test_views_pickle_by_reference(self):
+        """Test that a pickled view names the store file instead of copying the data."""
+        store = build_store(self.tree, self.tmpdir.name)
+        self.assertLess(len(pickle.dumps(store)), 200)
+        self.assertIs(store["enumerators"], pickle.loads(pickle.dumps(store["enumerators"])))
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            result = executor.submit(_read_in_worker, store).result()
+        self.assertEqual((len(self.tree["personas"]), True), result)
+
+    def test_merge_from_store_matches_expected(self):
+        """Test that merges reading the store, in process and across workers, match the expected output."""
+        for workers in (1, 2):
+            repo = os.path.join(self.tmpdir.name, f"repo{workers}")
+            shutil.copytree(self.TEST_REPO, repo)
+            processor = Processor(self.TEST_SPECIFICATIONS, repo, merge_workers=workers, specification_store=True)
+            self.assertIsInstance(processor.context_data["specifications"], StoreMapping)
+            processor.run()
+            names = os.listdir(self.TEST_EXPECTED)
+            _, mismatch, errors = filecmp.cmpfiles(self.TEST_EXPECTED, repo, names, shallow=False)
+            self.assertEqual(([], []), (mismatch, errors))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,238 @@
+import logging
+import os
+import shutil
+import time
+from typing import Any, Dict, List, Mapping, Optional, Set, Tuple
+
+from main import Processor
+from rendering import TemplateCache
+from spec_loader import (
+    Override,
+    assemble_tree,
+    find_specification_layers,
+    load_yaml_file,
+    log_overrides,
+    overlay_specifications,
+    spec_keys,
+    specification_roots,
+)
+
+logger = logging.getLogger(__name__)
+
+# Folders never copied to or watched in the scratch repo
+SKIP_FOLDERS = (".git",)
+
+Stamp = Tuple[int, int]
+
+
+def _stamp(path: str) -> Stamp:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def snapshot(folder: str) -> Dict[str, Stamp]:
+    """Map each file below folder (relative path) to its mtime and size."""
+    files = {}
+    for root, folders, names in os.walk(folder):
+        folders[:] = [name for name in folders if name not in SKIP_FOLDERS]
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                files[os.path.relpath(path, folder)] = _stamp(path)
+            except OSError:
+                # Removed while walking
+                continue
+    return files
+
+
+def _inside(path: str, folder: str) -> bool:
+    path, folder = os.path.realpath(path), os.path.realpath(folder)
+    return path == folder or path.startswith(folder + os.sep)
+
+
+class SpecificationMemo:
+    """
+    Parsed specification documents kept between runs. Each run re-parses
+    only files whose mtime or size changed and reassembles the tree, so
+    unchanged documents keep their identity (and their memoized filter output).
+    folders may list several specification folders, overlaid in order.
+    Changed files are parsed through cache (a SpecificationCache) when one
+    is given.
+    """
+
+    def __init__(self, folders: str, cache: Any = None) -> None:
+        self.folders = folders
+        self.cache = cache
+        self._documents: Dict[str, Tuple[Stamp, Any]] = {}
+
+    def load(self) -> Tuple[Dict[str, Any], int]:
+        """Return the specifications tree and the number of files parsed."""
+        tree: Dict[str, Any] = {}
+        parsed = 0
+        seen: Set[str] = set()
+        for index, (folder, paths) in enumerate(find_specification_layers(self.folders)):
+            layer: Dict[str, Any] = {}
+            for path in paths:
+                stamp = _stamp(path)
+                entry = self._documents.get(path)
+                if entry is None or entry[0] != stamp:
+                    data = self.cache.load_document(path) if self.cache is not None else load_yaml_file(path)
+                    entry = self._documents[path] = (stamp, data)
+                    parsed += 1
+                assemble_tree(layer, spec_keys(path, folder), entry[1])
+            seen.update(paths)
+            if not index:
+                tree = layer
+                continue
+            overrides: List[Override] = []
+            tree = overlay_specifications(tree, layer, "specifications", overrides)
+            log_overrides(folder, overrides)
+        for path in set(self._documents) - seen:
+            del self._documents[path]
+        return tree, parsed
+
+
+class Watcher:
+    """
+    Re-merge a template repo into a scratch folder whenever the repo or the
+    specifications change.
+
+    The scratch folder is an incremental merge (see INCREMENTAL_MERGE), so a
+    run only renders outputs whose template or specification inputs changed
+    and removes outputs that are no longer produced. Parsed specifications
+    and compiled templates stay warm between runs. Edits to in-place merge
+    templates are copied to the saved source under .stage0_template/sources,
+    since the scratch copy of the template holds the merged output.
+
+    options are Processor options (see processor_options). Specification
+    loading is managed by the watcher, so the worker, lazy and prefetch
+    options do not apply; spec_cache parses changed files and
+    specification_store rebuilds the store after specifications change.
+    """
+
+    def __init__(
+        self,
+        specifications_folder: str,
+        repo_folder: str,
+        output_folder: str,
+        environment: Optional[Mapping] = None,
+        **options: Any,
+    ) -> None:
+        for folder in (repo_folder, *specification_roots(specifications_folder)):
+            if _inside(output_folder, folder):
+                raise ValueError(f"Watch output folder {output_folder} must be outside {folder}")
+        self.specifications_folder = specifications_folder
+        self.repo_folder = repo_folder
+        self.output_folder = output_folder
+        self.environment = environment
+        options = dict(options)
+        # Scratch merges are always incremental, from specifications parsed here
+        for name in ("incremental", "spec_workers", "lazy_specifications", "prefetch_specifications"):
+            options.pop(name, None)
+        self.specification_store = options.pop("specification_store", False)
+        self.options = options
+        self.template_cache = TemplateCache()
+        self.specifications = SpecificationMemo(specifications_folder, options.pop("spec_cache", None))
+        self._store: Any = None
+        self._repo_files: Dict[str, Stamp] = {}
+        self._spec_files: Dict[str, Dict[str, Stamp]] = {}
+        # Repo changes not yet copied to the scratch repo, kept until a merge gets to copy them
+        self._changed: Set[str] = set()
+        self._removed: Set[str] = set()
+        self.runs = 0
+
+    def _start(self) -> None:
+        # A manifest or saved sources from an earlier session may not match the repo
+        shutil.rmtree(os.path.join(self.output_folder, ".stage0_template"), ignore_errors=True)
+        shutil.copytree(
+            self.repo_folder, self.output_folder, dirs_exist_ok=True, ignore=shutil.ignore_patterns(*SKIP_FOLDERS)
+        )
+
+    def _sync(self, changed: Set[str], removed: Set[str], in_place: Set[str]) -> None:
+        """Copy changed repo files to the scratch repo and delete removed ones."""
+        for relative in changed | removed:
+            target = os.path.join(self.output_folder, relative)
+            saved = os.path.join(self.output_folder, ".stage0_template", "sources", relative)
+            if relative in in_place and os.path.exists(saved):
+                target = saved
+            if relative in removed:
+                if os.path.exists(target):
+                    os.remove(target)
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(os.path.join(self.repo_folder, relative), target)
+
+    def poll(self) -> bool:
+        """Merge if anything changed since the last run; return True when a merge ran."""
+        repo_files = snapshot(self.repo_folder)
+        spec_files = {folder: snapshot(folder) for folder in specification_roots(self.specifications_folder)}
+        if self.runs and repo_files == self._repo_files and spec_files == self._spec_files:
+            return False
+
+        start = time.perf_counter()
+        first_run = not self.runs
+        changed = {path for path, stamp in repo_files.items() if self._repo_files.get(path) != stamp}
+        removed = set(self._repo_files) - set(repo_files)
+        if not first_run:
+            changed, removed = (self._changed | changed) - removed, (self._removed - changed) | removed
+            self._changed, self._removed = changed, removed
+        self._repo_files, self._spec_files = repo_files, spec_files
+        self.runs += 1
+        try:
+            if first_run:
+                self._start()
+            process_file = os.path.join(".stage0_template", "process.yaml")
+            if not first_run and process_file in changed:
+                self._sync({process_file}, set(), set())
+                self._changed = changed - {process_file}
+            specifications, parsed = self.specifications.load()
+            if self.specification_store:
+                if parsed or self._store is None:
+                    from spec_store import build_store
+
+                    self._store = build_store(specifications)
+                specifications = self._store
+            processor = Processor(
+                self.specifications_folder,
+                self.output_folder,
+                template_cache=self.template_cache,
+                specifications=specifications,
+                incremental=True,
+                **self.options,
+            )
+            if not first_run:
+                in_place = {
+                    os.path.normpath(template["path"])
+                    for template in processor.templates
+                    if template.get("merge") and not template.get("output")
+                }
+                self._sync(changed - {process_file}, removed, in_place)
+                self._changed, self._removed = set(), set()
+            processor.run(self.environment)
+        except Exception as e:
+            logger.error(f"Merge failed: {e}")
+            return True
+        repo_changes = "initial copy" if first_run else f"{len(changed) + len(removed)} repo files changed"
+        logger.info(
+            f"Merged into {self.output_folder} in {time.perf_counter() - start:.2f}s "
+            f"({parsed} specification files parsed, {repo_changes})"
+        )
+        return True
+
+
+def watch(
+    specifications_folder: str,
+    repo_folder: str,
+    output_folder: str,
+    interval: float = 0.5,
+    **options: Any,
+) -> None:
+    """Poll for changes every interval seconds and re-merge until interrupted."""
+    watcher = Watcher(specifications_folder, repo_folder, output_folder, **options)
+    logger.info(f"Watching {repo_folder} and {specifications_folder}, merging into {output_folder}")
+    try:
+        while True:
+            watcher.poll()
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        logger.info(f"Stopped watching after {watcher.runs} merges")
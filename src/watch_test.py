@@ -0,0 +1,129 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import yaml
+
+import main
+from limits import RenderLimits
+from spec_store import StoreMapping
+from watch import Watcher
+
+
+class TestWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        base = Path(self.tmpdir.name)
+        self.repo = base / "repo"
+        self.specs = base / "specs"
+        self.output = base / "output"
+        (self.repo / ".stage0_template").mkdir(parents=True)
+        self.specs.mkdir()
+        (self.repo / ".stage0_template" / "process.yaml").write_text(yaml.dump({
+            "context": [{"key": "types", "type": "path", "path": "specifications.types"}],
+            "templates": [
+                {"path": "./readme.md", "merge": True},
+                {"path": "./type.j2", "mergeFrom": {"items": "types", "output": "./{{ item.name }}.txt"}},
+            ],
+        }))
+        (self.repo / "readme.md").write_text("{{ specifications.product.name }}")
+        (self.repo / "type.j2").write_text("{{ item.name }}={{ item.content }}")
+        (self.specs / "product.yaml").write_text("name: Widget\n")
+        (self.specs / "types.yaml").write_text("a: one\nb: two\n")
+        self.watcher = Watcher(str(self.specs), str(self.repo), str(self.output))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _edit(self, path, text):
+        path.write_text(text)
+        # Make the change visible even on file systems with coarse mtimes
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def test_first_poll_merges_into_scratch_copy(self):
+        """Test that the first poll merges a copy and leaves the repo untouched."""
+        self.assertTrue(self.watcher.poll())
+        self.assertEqual("Widget", (self.output / "readme.md").read_text())
+        self.assertEqual("a=one", (self.output / "a.txt").read_text())
+        self.assertEqual("{{ specifications.product.name }}", (self.repo / "readme.md").read_text())
+        self.assertFalse((self.repo / "a.txt").exists())
+        self.assertFalse(self.watcher.poll())
+
+    def test_specification_edit_reparses_only_changed_file(self):
+        """Test that a specification edit re-parses one file and removes outputs no longer produced."""
+        self.watcher.poll()
+        a_mtime = os.stat(self.output / "a.txt").st_mtime_ns
+        self._edit(self.specs / "types.yaml", "a: one\nc: three\n")
+        with self.assertLogs("watch", level="INFO") as logs:
+            self.assertTrue(self.watcher.poll())
+        self.assertIn("1 specification files parsed", logs.output[-1])
+        self.assertEqual("c=three", (self.output / "c.txt").read_text())
+        self.assertFalse((self.output / "b.txt").exists())
+        self.assertEqual(a_mtime, os.stat(self.output / "a.txt").st_mtime_ns)
+
+    def test_in_place_template_edit_is_merged(self):
+        """Test that editing an in-place merge template re-renders it from the new source."""
+        self.watcher.poll()
+        self._edit(self.repo / "readme.md", "# {{ specifications.product.name }}")
+        self.assertTrue(self.watcher.poll())
+        self.assertEqual("# Widget", (self.output / "readme.md").read_text())
+
+    def test_template_edit_survives_a_failed_merge(self):
+        """Test that a template edited alongside a broken process.yaml is merged once the process is fixed."""
+        self.watcher.poll()
+        process_file = self.repo / ".stage0_template" / "process.yaml"
+        process = process_file.read_text()
+        self._edit(self.repo / "type.j2", "{{ item.name }}: {{ item.content }}")
+        self._edit(process_file, "templates: [")
+        with self.assertLogs("watch", level="ERROR"):
+            self.watcher.poll()
+        self._edit(process_file, process)
+        self.assertTrue(self.watcher.poll())
+        self.assertEqual("a: one", (self.output / "a.txt").read_text())
+
+    def test_output_folder_inside_repo_is_rejected(self):
+        """Test that a scratch folder inside the watched repo is refused."""
+        with self.assertRaises(ValueError):
+            Watcher(str(self.specs), str(self.repo), str(self.repo / "out"))
+
+    def test_processor_options_apply_to_merges(self):
+        """Test that render limits and the specification store reach each watched merge."""
+        watcher = Watcher(
+            str(self.specs), str(self.repo), str(self.output),
+            render_limits=RenderLimits(output_bytes=3), specification_store=True, incremental=False,
+        )
+        with self.assertLogs("watch", level="ERROR") as logs:
+            self.assertTrue(watcher.poll())
+        self.assertIn("render limit exceeded", logs.output[0])
+        watcher.options["render_limits"] = RenderLimits()
+        self._edit(self.specs / "product.yaml", "name: Gadget\n")
+        self.assertTrue(watcher.poll())
+        self.assertEqual("Gadget", (self.output / "readme.md").read_text())
+        self.assertIsInstance(watcher._store, StoreMapping)
+
+    def test_main_passes_processor_options_to_watch(self):
+        """Test that MERGE_WATCH runs with every processor option from the environment."""
+        environment = {
+            "MERGE_WATCH": "true",
+            "MERGE_WATCH_FOLDER": str(self.output),
+            "SPECIFICATIONS_FOLDER": str(self.specs),
+            "REPO_FOLDER": str(self.repo),
+            "MERGE_MAX_OUTPUT_MB": "1",
+            "WRITER_THREADS": "3",
+            "SPECIFICATIONS_STORE": "true",
+        }
+        with patch.dict(os.environ, environment), patch("watch.watch") as watch:
+            main.main()
+        options = watch.call_args.kwargs
+        self.assertEqual(RenderLimits(output_bytes=1024 * 1024), options["render_limits"])
+        self.assertEqual(3, options["writer_threads"])
+        self.assertTrue(options["specification_store"])
+        self.assertEqual(set(main.processor_options()) | {"report", "interval"}, set(options))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,224 @@
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+WRITE_BUFFER_SIZE = 64 * 1024
+
+
+def temp_path_for(output_path: str) -> str:
+    """Hidden temp file beside output_path, unique per process and thread."""
+    folder, name = os.path.split(output_path)
+    return os.path.join(folder, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def file_digest(path: str) -> str:
+    """sha256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(WRITE_BUFFER_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def holds_content(path: str, size: int, digest: str) -> bool:
+    """True when path exists and holds size bytes with the sha256 digest."""
+    try:
+        return os.stat(path).st_size == size and file_digest(path) == digest
+    except OSError:
+        return False
+
+
+def write_file(output_path: str, chunks: Iterable[str]) -> Tuple[bool, int]:
+    """
+    Stream chunks, UTF-8 encoded, through a temp file and rename it over
+    output_path, unless the content matches the existing file. The content
+    is hashed as it is written, so only the existing file is read back.
+    Returns whether the file was written and the size of the content in bytes.
+    """
+    tmp_path = temp_path_for(output_path)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, "wb", buffering=WRITE_BUFFER_SIZE) as file:
+            for chunk in chunks:
+                data = chunk.encode("utf-8")
+                digest.update(data)
+                size += len(data)
+                file.write(data)
+        if holds_content(output_path, size, digest.hexdigest()):
+            os.remove(tmp_path)
+            logger.debug(f"Unchanged {output_path}")
+            return False, size
+        if os.path.exists(output_path):
+            try:
+                shutil.copymode(output_path, tmp_path)
+            except OSError as e:
+                logger.debug(f"Unable to keep file mode of {output_path}: {e}")
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return True, size
+
+
+class OutputWriter:
+    """
+    Writes generated files atomically and leaves identical files untouched.
+
+    Output is streamed through a buffered temp file beside the target. When
+    the result matches the existing file the temp file is discarded, so the
+    target's mtime is preserved; otherwise it is renamed over the target.
+    """
+
+    def __init__(self) -> None:
+        self.written = 0
+        self.unchanged = 0
+        self.skipped = 0
+        self.bytes_written = 0
+        # Size in bytes of the most recent output, written or not
+        self.last_size = 0
+
+    def write(self, output_path: str, chunks: Iterable[str]) -> bool:
+        """Write chunks to output_path, returning False when the content was unchanged."""
+        written, self.last_size = write_file(output_path, chunks)
+        self.record(written, self.last_size)
+        return written
+
+    def record(self, written: bool, size: int) -> None:
+        """Count an output written (or found unchanged) by write_file."""
+        if written:
+            self.written += 1
+            self.bytes_written += size
+        else:
+            self.unchanged += 1
+
+    def summary(self) -> str:
+        return f"wrote {self.written} files, {self.unchanged} unchanged, {self.skipped} skipped"
+
+
+# Called with (written, size, seconds) once an output is written
+WriteDone = Callable[[bool, int, float], None]
+
+
+class OutputPipeline:
+    """
+    Writes outputs on a pool of threads while the caller renders the next ones.
+
+    With threads set to 0 every output is written on the calling thread as
+    it is rendered, exactly like OutputWriter.write. Otherwise submit() joins
+    the rendered chunks on the calling thread and hands the text to a writer
+    thread. At most max_bytes of rendered text waits to be written; beyond
+    that submit() blocks on the oldest write. Writes to one path keep their
+    order, callbacks run on the calling thread in submission order (so the
+    writer's counters need no lock), and the first write error is raised
+    from submit() or close(). Consumed templates are removed after the
+    writes, in one pass.
+
+    Use as a context manager: leaving the block normally waits for every
+    write and removal; leaving it with an error cancels queued writes and
+    waits only for those already running.
+    """
+
+    def __init__(self, writer: OutputWriter, threads: int = 0, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.writer = writer
+        self.max_bytes = max_bytes
+        self._executor = ThreadPoolExecutor(threads, thread_name_prefix="writer") if threads > 0 else None
+        # (path, future, size, render seconds, callback) in submission order
+        self._pending: Deque[Tuple[str, Future, int, float, WriteDone]] = deque()
+        self._pending_bytes = 0
+        # The pending write of each path
+        self._latest: Dict[str, Future] = {}
+        # Consumed templates to remove, in removal order
+        self._removals: Dict[str, None] = {}
+
+    def __enter__(self) -> "OutputPipeline":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        elif self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    @staticmethod
+    def _timed_write(output_path: str, text: str) -> Tuple[bool, int, float]:
+        start = time.perf_counter()
+        written, size = write_file(output_path, (text,))
+        return written, size, time.perf_counter() - start
+
+    def _finish_oldest(self) -> None:
+        path, future, size, render_seconds, done = self._pending.popleft()
+        self._pending_bytes -= size
+        if self._latest.get(path) is future:
+            del self._latest[path]
+        written, output_size, write_seconds = future.result()
+        self.writer.record(written, output_size)
+        done(written, output_size, render_seconds + write_seconds)
+
+    def _finish_done(self) -> None:
+        while self._pending and self._pending[0][1].done():
+            self._finish_oldest()
+
+    def submit(self, output_path: str, chunks: Iterable[str], done: WriteDone) -> None:
+        """Render chunks and write them to output_path, calling done once written."""
+        # A consumed template later overwritten by an output stays
+        self._removals.pop(output_path, None)
+        if self._executor is None:
+            start = time.perf_counter()
+            written, size = write_file(output_path, chunks)
+            self.writer.record(written, size)
+            done(written, size, time.perf_counter() - start)
+            return
+
+        start = time.perf_counter()
+        text = "".join(chunks)
+        render_seconds = time.perf_counter() - start
+        # Characters, close enough to bytes to bound memory
+        size = len(text)
+        self._finish_done()
+        while self._pending and self._pending_bytes + size > self.max_bytes:
+            self._finish_oldest()
+        self.settle(output_path)
+        future = self._executor.submit(self._timed_write, output_path, text)
+        self._latest[output_path] = future
+        self._pending.append((output_path, future, size, render_seconds, done))
+        self._pending_bytes += size
+
+    def settle(self, path: str) -> None:
+        """Finish the writes and removal pending for path, before it is read or written again."""
+        while path in self._latest:
+            self._finish_oldest()
+        if path in self._removals:
+            del self._removals[path]
+            os.remove(path)
+
+    def remove(self, path: str) -> None:
+        """Remove a consumed template once the writes submitted so far are finished."""
+        if self._executor is None:
+            os.remove(path)
+        else:
+            self._removals[path] = None
+
+    def close(self) -> None:
+        """Wait for every write, then remove the consumed templates."""
+        try:
+            while self._pending:
+                self._finish_oldest()
+            if self._removals:
+                # list() raises the first failed removal
+                list(self._executor.map(os.remove, self._removals))
+                self._removals.clear()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
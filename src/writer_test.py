@@ -0,0 +1,155 @@
+import filecmp
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from main import Processor
+from writer import OutputPipeline, OutputWriter, file_digest
+
+
+class TestOutputWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.output_path = os.path.join(self.tmpdir.name, "out.txt")
+        self.writer = OutputWriter()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_chunks_are_written_and_renamed_into_place(self):
+        """Test that streamed chunks end up in the output file."""
+        self.assertTrue(self.writer.write(self.output_path, (f"line {i}\n" for i in range(1000))))
+        with open(self.output_path) as f:
+            self.assertEqual("".join(f"line {i}\n" for i in range(1000)), f.read())
+        self.assertEqual(["out.txt"], os.listdir(self.tmpdir.name))
+        self.assertEqual(1, self.writer.written)
+
+    def test_failure_keeps_previous_file_and_removes_temp(self):
+        """Test that a failing render neither truncates the output nor leaves a temp file."""
+        with open(self.output_path, "w") as f:
+            f.write("previous")
+
+        def chunks():
+            yield "partial"
+            raise ValueError("render failed")
+
+        with self.assertRaises(ValueError):
+            self.writer.write(self.output_path, chunks())
+        with open(self.output_path) as f:
+            self.assertEqual("previous", f.read())
+        self.assertEqual(["out.txt"], os.listdir(self.tmpdir.name))
+
+    def test_identical_content_is_not_rewritten(self):
+        """Test that an identical file is left alone, keeping its mtime, and only it is read back."""
+        with open(self.output_path, "w", encoding="utf-8") as f:
+            f.write("sämé")
+        past = time.time() - 1000
+        os.utime(self.output_path, (past, past))
+
+        with patch("writer.file_digest", wraps=file_digest) as digest:
+            self.assertFalse(self.writer.write(self.output_path, ["sä", "mé"]))
+        digest.assert_called_once_with(self.output_path)
+        self.assertEqual(6, self.writer.last_size)
+        self.assertEqual(int(past), int(os.stat(self.output_path).st_mtime))
+        self.assertEqual(["out.txt"], os.listdir(self.tmpdir.name))
+        self.assertEqual(1, self.writer.unchanged)
+        self.assertEqual(0, self.writer.written)
+
+    def test_rewrite_keeps_file_mode(self):
+        """Test that replacing a file keeps its permissions."""
+        with open(self.output_path, "w") as f:
+            f.write("#!/bin/sh\n")
+        os.chmod(self.output_path, 0o755)
+        self.writer.write(self.output_path, ["#!/bin/sh\necho hi\n"])
+        self.assertEqual(0o755, os.stat(self.output_path).st_mode & 0o777)
+
+
+
+class TestOutputPipeline(unittest.TestCase):
+    TEST_REPO = "./test/repo"
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.writer = OutputWriter()
+        self.done = []
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def _record(self, name):
+        return lambda written, size, seconds: self.done.append((name, written, size))
+
+    def test_outputs_are_written_in_order_within_the_queue_limit(self):
+        """Test that threaded writes report every output in submission order, with backpressure."""
+        with open(self._path("same.txt"), "w") as f:
+            f.write("same")
+        with OutputPipeline(self.writer, threads=3, max_bytes=10) as pipeline:
+            for i in range(20):
+                pipeline.submit(self._path(f"out{i}.txt"), ["line ", str(i)], self._record(f"out{i}.txt"))
+                self.assertLessEqual(pipeline._pending_bytes, 10)
+            pipeline.submit(self._path("same.txt"), ["same"], self._record("same.txt"))
+        expected = [(f"out{i}.txt", True, len(f"line {i}")) for i in range(20)] + [("same.txt", False, 4)]
+        self.assertEqual(expected, self.done)
+        self.assertEqual((20, 1), (self.writer.written, self.writer.unchanged))
+        with open(self._path("out7.txt")) as f:
+            self.assertEqual("line 7", f.read())
+
+    def test_writes_and_removals_of_one_path_keep_their_order(self):
+        """Test that the last write to a path wins and a removed template overwritten later is kept."""
+        template = self._path("template.md")
+        with open(template, "w") as f:
+            f.write("template")
+        with OutputPipeline(self.writer, threads=2) as pipeline:
+            pipeline.submit(self._path("out.txt"), ["first"], self._record("first"))
+            pipeline.submit(self._path("out.txt"), ["second"], self._record("second"))
+            pipeline.remove(template)
+            self.assertTrue(os.path.exists(template))
+            pipeline.submit(template, ["output"], self._record("template"))
+            pipeline.remove(self._path("out.txt"))
+        self.assertEqual(["template.md"], os.listdir(self.tmpdir.name))
+        with open(template) as f:
+            self.assertEqual("output", f.read())
+
+    def test_write_error_is_raised(self):
+        """Test that a failed write raises from the pipeline and cancels the rest."""
+        with self.assertRaises(FileNotFoundError):
+            with OutputPipeline(self.writer, threads=2) as pipeline:
+                pipeline.submit(self._path("missing/out.txt"), ["text"], self._record("missing"))
+                pipeline.submit(self._path("out.txt"), ["text"], self._record("out"))
+        self.assertNotIn("missing", [name for name, _, _ in self.done])
+        self.assertFalse([name for name in os.listdir(self.tmpdir.name) if name.endswith(".tmp")])
+
+    def test_threaded_merge_matches_expected(self):
+        """Test that a merge with writer threads produces the expected files and counts."""
+        os.environ["SERVICE_NAME"] = "user"
+        os.environ["DATA_SOURCE"] = "organization"
+        try:
+            repo = self._path("repo")
+            shutil.copytree(self.TEST_REPO, repo)
+            expected = self._path("expected")
+            shutil.copytree(os.path.join(repo, ".stage0_template", "test_expected"), expected)
+
+            processor = Processor(
+                os.path.join(repo, ".stage0_template", "test_data"), repo, writer_threads=4, writer_queue_bytes=512
+            )
+            processor.run()
+
+            names = sorted(os.listdir(expected))
+            _, mismatch, errors = filecmp.cmpfiles(expected, repo, names, shallow=False)
+            self.assertEqual(([], []), (mismatch, errors))
+            self.assertFalse(os.path.exists(os.path.join(repo, "source.ts")))
+            self.assertEqual(13, processor.report.counters["files_written"])
+        finally:
+            del os.environ["SERVICE_NAME"]
+            del os.environ["DATA_SOURCE"]
+
+
+if __name__ == "__main__":
+    unittest.main()